@@ -0,0 +1,85 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from flask import Response, current_app, request
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# cache key digest -> (mimetype, rendered bytes), least recently used first
+_artifacts = OrderedDict()
+_artifact_bytes = 0
+_lock = threading.Lock()
+
+
+def artifact_digest(key_parts):
+    """
+    Hashes the parts identifying a rendered artifact (kind, column or image id, plot parameters and
+    data version stamp) into a stable hex digest. It doubles as the ETag of the artifact.
+    """
+    payload = json.dumps(key_parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_artifact(digest):
+    """
+    Looks a rendered artifact up in the in-process LRU.
+    """
+    with _lock:
+        if digest in _artifacts:
+            _artifacts.move_to_end(digest)
+            return _artifacts[digest][1]
+    return None
+
+
+def store_artifact(digest, mimetype, body):
+    """
+    Adds an artifact to the in-process LRU and evicts the least recently used ones past CHART_CACHE_MAX_BYTES.
+    """
+    global _artifact_bytes
+    max_bytes = current_app.config.get('CHART_CACHE_MAX_BYTES', DEFAULT_CACHE_BYTES)
+    if len(body) > max_bytes:
+        return
+    with _lock:
+        if digest in _artifacts:
+            return
+        _artifacts[digest] = (mimetype, body)
+        _artifact_bytes += len(body)
+        while _artifact_bytes > max_bytes:
+            _, (_, evicted) = _artifacts.popitem(last=False)
+            _artifact_bytes -= len(evicted)
+
+
+def cached_artifact(key_parts, render, mimetype='image/png'):
+    """
+    Serves a rendered chart from the cache, rendering and storing it on a miss.
+
+    The ETag is derived from the cache key, which includes the data version stamp, so a matching
+    If-None-Match header is answered with 304 Not Modified before any lookup or rendering.
+
+    Input:
+        key_parts (list): Kind of artifact, column or image id, plot parameters and data version stamp.
+        render (callable): Returns the rendered bytes, or an (error dict, status code) tuple.
+        mimetype (str): Content type of the rendered bytes.
+    Output:
+        Response: The artifact or a 304 response, or the error tuple returned by render.
+    """
+    digest = artifact_digest(key_parts)
+    etag = digest[:32]
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        body = get_artifact(digest)
+        if body is None:
+            body = render()
+            if isinstance(body, tuple):
+                return body
+            store_artifact(digest, mimetype, body)
+        response = Response(body, mimetype=mimetype)
+
+    response.set_etag(etag)
+    # Clients may keep the artifact but must revalidate it, the ETag makes that a cheap 304
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
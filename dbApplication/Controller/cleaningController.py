@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Column schemas of the CSV datasets: column name -> target dtype ('int', 'float', 'str' or 'category')
+LOAN_SCHEMA = {
+    'loan_id': 'int',
+    'income': 'float',
+    'loan_amount': 'float',
+    'credit_score': 'int',
+    'loan_status': 'category',
+    'asset_value': 'float',
+}
+
+MOVIE_SCHEMA = {
+    'title': 'str',
+    'director': 'str',
+    'release_year': 'int',
+    'runtime': 'int',
+    'genre': 'str',
+    'rating': 'float',
+    'gross': 'float',
+}
+
+PANDAS_DTYPES = {'int': 'int64', 'float': 'float64', 'str': 'object', 'category': 'category'}
+
+MAX_REJECTED_SAMPLE = 20
+
+
+def strip_string_columns(data):
+    """
+    Strip surrounding whitespace from the string cells of a DataFrame, column by column.
+
+    Only object/string columns are touched. Each column is factorized first so .str.strip()
+    runs once per distinct value instead of once per cell, and the stripped values are
+    scattered back with a vectorized take.
+
+    Args:
+        data (pandas.DataFrame): The frame to clean. It is modified in place.
+
+    Returns:
+        pandas.DataFrame: The same frame.
+    """
+    for col in data.select_dtypes(include=['object', 'string']).columns:
+        codes, uniques = pd.factorize(data[col])
+        uniques = pd.Index(uniques, dtype=object)
+        if pd.api.types.infer_dtype(uniques, skipna=True) not in ('string', 'mixed', 'mixed-integer'):
+            # Object column without any string (numbers or all missing), .str would raise
+            continue
+        stripped = uniques.str.strip()
+        # .str.strip() yields NaN for non-string values of mixed columns, keep those as they were
+        stripped = np.where(stripped.isna(), uniques, stripped)
+        # code -1 marks missing cells, it picks the trailing NaN
+        data[col] = np.append(stripped, np.nan)[codes]
+    return data
+
+
+def clean_frame(data, schema, round_columns=None, decimals=1):
+    """
+    Cleaning pipeline stage shared by the CSV ingestion paths.
+
+    Strips string columns, coerces every schema column to its dtype, rounds the requested
+    columns and rejects the rows that are missing a value or fail the coercion.
+
+    Args:
+        data (pandas.DataFrame): Raw frame read from a CSV.
+        schema (dict): Column name -> dtype ('int', 'float', 'str' or 'category').
+        round_columns (list[str], optional): Numeric columns rounded before integer coercion.
+        decimals (int): Number of decimals used for rounding.
+
+    Returns:
+        tuple: Cleaned DataFrame and a report dictionary with the number of rejected rows,
+        a sample of their row indices and the rejection count per column.
+    """
+    data = strip_string_columns(data.copy())
+    columns = list(schema)
+    invalid = pd.DataFrame(False, index=data.index, columns=columns)
+
+    for col, dtype in schema.items():
+        if dtype in ('int', 'float'):
+            values = pd.to_numeric(data[col], errors='coerce')
+            if round_columns and col in round_columns:
+                values = values.round(decimals)
+            if dtype == 'int':
+                # Values with a fractional part do not fit an integer column
+                values = values.where(values == values.round(0))
+            data[col] = values
+        elif data[col].dtype == object or pd.api.types.is_string_dtype(data[col]):
+            # Blank strings count as missing values
+            data[col] = data[col].where(data[col] != '')
+        invalid[col] = data[col].isna()
+
+    rejected = invalid.any(axis=1)
+    data = data.loc[~rejected].astype({col: PANDAS_DTYPES[dtype] for col, dtype in schema.items()})
+
+    rejected_index = rejected[rejected].index
+    report = {
+        'rows_rejected': int(rejected.sum()),
+        'rejected_rows_sample': [int(i) for i in rejected_index[:MAX_REJECTED_SAMPLE]],
+        'rejected_by_column': {col: int(count) for col, count in invalid.sum().items() if count}
+    }
+    return data, report
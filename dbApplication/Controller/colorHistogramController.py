@@ -0,0 +1,206 @@
+import cv2
+import numpy as np
+from flask import current_app
+from sqlalchemy.orm import undefer
+from Models.dbModel import db
+from Models.image_model import Image
+from Controller.imageCacheController import get_decoded_image
+
+MAX_BINS = 256
+DEFAULT_APPROX_PIXELS = 512 * 512
+MAX_STORED_HISTOGRAMS = 8
+# Pixels counted per np.bincount call, its int64 copy of a chunk (512KB) stays in the CPU cache
+CHUNK_PIXELS = 1 << 16
+
+# Colorspace -> (OpenCV conversion from BGR, channel names in array order, value range of every channel).
+# 8-bit OpenCV HSV stores the hue as 0-179.
+COLORSPACES = {
+    'rgb': (None, ('b', 'g', 'r'), (256, 256, 256)),
+    'hsv': (cv2.COLOR_BGR2HSV, ('h', 's', 'v'), (180, 256, 256)),
+    'lab': (cv2.COLOR_BGR2LAB, ('l', 'a', 'b'), (256, 256, 256)),
+}
+OUTPUT_ORDER = {
+    'rgb': ('r', 'g', 'b'),
+    'hsv': ('h', 's', 'v'),
+    'lab': ('l', 'a', 'b'),
+}
+
+
+def validate_histogram_params(bins, colorspaces):
+    """
+    Returns the bin count and the list of colorspaces in canonical form. Raises ValueError when invalid.
+    """
+    try:
+        bins = int(bins)
+    except (TypeError, ValueError):
+        raise ValueError('bins must be an integer')
+    if not 1 <= bins <= MAX_BINS:
+        raise ValueError(f'bins must be between 1 and {MAX_BINS}')
+
+    if isinstance(colorspaces, str):
+        colorspaces = colorspaces.split(',')
+    colorspaces = [str(name).strip().lower() for name in colorspaces or ['rgb']]
+    unknown = [name for name in colorspaces if name not in COLORSPACES]
+    if unknown or not colorspaces:
+        raise ValueError(f"Unsupported colorspace: {', '.join(unknown)}, expected one of {', '.join(COLORSPACES)}")
+    return bins, sorted(set(colorspaces), key=list(COLORSPACES).index)
+
+
+def bin_lookup(bins, value_range):
+    """
+    Table mapping every 8-bit value of a channel to its bin.
+    """
+    return np.minimum(np.arange(256) * bins // value_range, bins - 1)
+
+
+def channel_counts(image, bins, ranges):
+    """
+    Histograms of the three channels of an 8-bit image.
+
+    Every channel is counted per 8-bit value with np.bincount on strided uint8 views, CHUNK_PIXELS pixels at a
+    time: bincount casts its input to int64, whole-image temporaries would be 8 bytes per pixel and channel.
+    The 256 value counts are then folded into the requested bins. cv2.calcHist is faster but returns float32
+    counts, exact only up to 2**24 pixels per bin (benchmarks/bench_color_histogram.py).
+
+    Output:
+        numpy.ndarray: Counts of shape (3, bins), one row per channel in array order.
+    """
+    pixels = image.reshape(-1, 3)
+    value_counts = np.zeros((3, 256), dtype=np.int64)
+    for start in range(0, len(pixels), CHUNK_PIXELS):
+        chunk = pixels[start:start + CHUNK_PIXELS]
+        for channel in range(3):
+            value_counts[channel] += np.bincount(chunk[:, channel], minlength=256)
+
+    counts = np.zeros((3, bins), dtype=np.int64)
+    for channel, value_range in enumerate(ranges):
+        np.add.at(counts[channel], bin_lookup(bins, value_range), value_counts[channel])
+    return counts
+
+
+def sample_pixels(image, max_pixels):
+    """
+    Downscales an image by an integer stride (nearest neighbour) until it has at most max_pixels.
+    Averaging interpolation would blend colors and shift the distribution, a strided sample keeps real pixels.
+    """
+    height, width = image.shape[:2]
+    stride = int(np.ceil(np.sqrt(height * width / max_pixels))) if height * width > max_pixels else 1
+    return image[::stride, ::stride] if stride > 1 else image
+
+
+def compute_color_histograms(image, bins=256, colorspaces=('rgb',), approximate=False, max_pixels=DEFAULT_APPROX_PIXELS):
+    """
+    Color histograms of a decoded image for one or more colorspaces.
+
+    Input:
+        image (numpy.ndarray): 8-bit BGR image, as decoded by OpenCV.
+        bins (int): Bins per channel, each covering an equal part of the channel range.
+        colorspaces (iterable): Any of 'rgb', 'hsv' and 'lab'.
+        approximate (bool): Count a strided sample of at most max_pixels pixels instead of every pixel.
+        max_pixels (int): Sample size of approximate histograms.
+    Output:
+        dict: Per colorspace, {'channels': {name: counts}, 'pixels': number of pixels counted, 'approximate'}.
+    """
+    total_pixels = int(image.shape[0] * image.shape[1])
+    if approximate:
+        image = sample_pixels(image, max_pixels)
+    pixels = int(image.shape[0] * image.shape[1])
+
+    histograms = {}
+    for name in colorspaces:
+        conversion, channel_names, ranges = COLORSPACES[name]
+        converted = image if conversion is None else cv2.cvtColor(image, conversion)
+        counts = dict(zip(channel_names, channel_counts(np.ascontiguousarray(converted), bins, ranges).tolist()))
+        histograms[name] = {
+            'channels': {channel: counts[channel] for channel in OUTPUT_ORDER[name]},
+            'pixels': pixels,
+            'approximate': pixels < total_pixels
+        }
+    return histograms
+
+
+def histogram_key(colorspace, bins, approximate):
+    return f"{colorspace}:{bins}:{'approximate' if approximate else 'exact'}"
+
+
+def stored_histograms(image, bins, colorspaces, approximate):
+    """
+    Returns the histograms already stored on an Image row and the colorspaces still missing.
+    Stored entries keep the URL they were computed from and are ignored once the image has a new version.
+    """
+    stored = image.histograms or {}
+    found, missing = {}, []
+    for name in colorspaces:
+        entry = stored.get(histogram_key(name, bins, approximate))
+        if entry and entry.get('source') == image.url:
+            found[name] = {key: value for key, value in entry.items() if key != 'source'}
+        else:
+            missing.append(name)
+    return found, missing
+
+
+def store_histograms(image, bins, approximate, histograms):
+    """
+    Records computed histograms on an Image row (the caller commits). Only the MAX_STORED_HISTOGRAMS most
+    recent (colorspace, bins, approximate) combinations are kept per image.
+    """
+    stored = dict(image.histograms or {})
+    for name, histogram in histograms.items():
+        key = histogram_key(name, bins, approximate)
+        stored.pop(key, None)
+        stored[key] = {**histogram, 'source': image.url}
+    while len(stored) > MAX_STORED_HISTOGRAMS:
+        stored.pop(next(iter(stored)))
+    # Assign a new dict, in-place changes of a JSON column are not tracked
+    image.histograms = stored
+
+
+def get_color_histograms(image, bins=256, colorspaces=('rgb',), approximate=False):
+    """
+    Returns the color histograms of an Image row, computing and storing only the ones it does not hold yet.
+
+    Output:
+        tuple: Histograms per colorspace (see compute_color_histograms) and the list of colorspaces computed now.
+    """
+    histograms, missing = stored_histograms(image, bins, colorspaces, approximate)
+    if missing:
+        max_pixels = current_app.config.get('IMAGE_HISTOGRAM_APPROX_PIXELS', DEFAULT_APPROX_PIXELS)
+        computed = compute_color_histograms(get_decoded_image(image.public_id, image.url),
+                                            bins, missing, approximate, max_pixels)
+        store_histograms(image, bins, approximate, computed)
+        db.session.commit()
+        histograms.update(computed)
+    return {name: histograms[name] for name in colorspaces}, missing
+
+
+def image_color_histograms(image_id, bins=256, colorspaces=None, approximate=False):
+    """
+    Color histogram counts of an image as JSON.
+
+    Input:
+        image_id (int): ID of the image record in the database.
+        bins (int): Bins per channel, 1 to 256.
+        colorspaces (str or list, optional): Any of 'rgb' (default), 'hsv' and 'lab'.
+        approximate (bool): Count a sample of at most IMAGE_HISTOGRAM_APPROX_PIXELS pixels of large images.
+    Output:
+        dict: Image id, bins, histograms per colorspace and whether they were stored already, or an error message.
+        int: HTTP status code.
+    """
+    try:
+        bins, colorspaces = validate_histogram_params(bins, colorspaces)
+        image = db.session.get(Image, image_id, options=[undefer(Image.histograms)])
+        if not image:
+            return {'error': 'Image not found'}, 404
+
+        histograms, computed = get_color_histograms(image, bins, colorspaces, approximate)
+        return {
+            'image_id': image.id,
+            'bins': bins,
+            'histograms': histograms,
+            'cached': not computed
+        }, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 500
@@ -0,0 +1,66 @@
+import threading
+import uuid
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# In-process version counter per table, bumped after every commit that changed the table.
+# Caches of derived data (counts, statistics, rendered charts) key their entries by it.
+_versions = {}
+_lock = threading.Lock()
+# Versions restart at 0 with the process, the epoch keeps stamps from two process lifetimes apart
+VERSION_EPOCH = uuid.uuid4().hex[:12]
+
+CHANGED_TABLES_KEY = 'changed_tables'
+
+
+def get_table_version(table_name):
+    """
+    Returns the current version stamp of a table.
+    """
+    return _versions.get(table_name, 0)
+
+
+def get_version_stamp(table_name):
+    """
+    Returns a data version stamp of a table that is unique across process restarts,
+    for validators that outlive the process (ETags kept by clients).
+    """
+    return f"{VERSION_EPOCH}:{get_table_version(table_name)}"
+
+
+def bump_table_version(table_name):
+    """
+    Increments the version stamp of a table, invalidating the cached data derived from it.
+    """
+    with _lock:
+        _versions[table_name] = _versions.get(table_name, 0) + 1
+        return _versions[table_name]
+
+
+def mark_table_changed(session, table_name):
+    """
+    Records that the current transaction of the session changed a table. The version is bumped
+    once the transaction commits, so readers never cache data under a version they cannot see yet.
+
+    Core statements (bulk inserts, upserts) must call this explicitly, ORM changes are picked up on flush.
+    """
+    session.info.setdefault(CHANGED_TABLES_KEY, set()).add(table_name)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_tables(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(instance, '__tablename__', None)
+        if table:
+            mark_table_changed(session, table)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed_tables(session):
+    for table_name in session.info.pop(CHANGED_TABLES_KEY, ()):
+        bump_table_version(table_name)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_tables(session):
+    session.info.pop(CHANGED_TABLES_KEY, None)
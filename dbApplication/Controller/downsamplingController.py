@@ -0,0 +1,51 @@
+import numpy as np
+from sqlalchemy import func, select
+from Models.dbModel import db
+from Controller.paginationController import cached_count
+
+DEFAULT_MAX_POINTS = 1000
+
+
+def sample_ranks(total, points):
+    """
+    Evenly spaced 1-based ranks from the first to the last of `total` sorted values, at most `points` of them.
+    """
+    if total <= points:
+        return np.arange(1, total + 1)
+    return np.unique(np.round(np.linspace(1, total, points)).astype(np.int64))
+
+
+def sample_sorted_column(model, column_name, points=DEFAULT_MAX_POINTS):
+    """
+    Quantile samples the sorted values of a column inside the database.
+
+    Every value gets its rank with ROW_NUMBER() OVER (ORDER BY column) and only the values at evenly
+    spaced ranks (always including the minimum and the maximum) are returned, so the number of rows
+    read by the application and the size of the plotted path are bounded by `points`.
+
+    Input:
+        model (db.Model): The model owning the column.
+        column_name (str): Column to sample.
+        points (int): Maximum number of samples, in practice the pixel width of the chart.
+    Output:
+        tuple: 0-based positions of the samples in the sorted column, their values, and the total number of values.
+    """
+    column = getattr(model, column_name)
+    total = cached_count(model.query.filter(column.isnot(None)), model.__tablename__)
+    if not total:
+        return np.empty(0), np.empty(0), 0
+
+    ranks = sample_ranks(total, points)
+    ranked = (
+        select(column.label('value'), func.row_number().over(order_by=column).label('rank'))
+        .where(column.isnot(None))
+        .subquery()
+    )
+    statement = select(ranked.c.rank, ranked.c.value).order_by(ranked.c.rank)
+    if len(ranks) < total:
+        statement = statement.where(ranked.c.rank.in_(ranks.tolist()))
+
+    rows = db.session.execute(statement).all()
+    positions = np.array([row[0] - 1 for row in rows], dtype=np.int64)
+    values = np.array([row[1] for row in rows], dtype=float)
+    return positions, values, total
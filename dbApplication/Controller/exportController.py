@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+from flask import Response, current_app, stream_with_context
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_rows(query, columns, batch_size):
+    """
+    Yields the rows of a query as tuples, fetched from a server-side cursor batch by batch (yield_per)
+    so only one batch is held in memory at a time.
+    """
+    result = query.with_entities(*columns).execution_options(yield_per=batch_size)
+    for row in result:
+        yield tuple(row)
+
+
+def generate_ndjson(rows, names, batch_size):
+    """
+    Serializes rows as newline delimited JSON, one object per line, emitting one chunk per batch of rows.
+    """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(names, row))))
+        if len(lines) == batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def generate_csv(rows, names, batch_size):
+    """
+    Serializes rows as CSV with a header line, emitting one chunk per batch of rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def stream_export(query, columns, export_format, filename):
+    """
+    Streams every row of a filtered query as NDJSON or CSV through a generator response.
+    Memory stays constant whatever the size of the result.
+
+    Input:
+        query (SQLAlchemy query object): The filtered query to export.
+        columns (list): Model columns to export, in order.
+        export_format (str): 'ndjson' or 'csv'.
+        filename (str): Base name of the attachment.
+    Output:
+        Response: A streamed response, or an error message with a status code.
+    """
+    if export_format not in EXPORT_FORMATS:
+        return {'error': f'Unsupported export format: {export_format}'}, 400
+
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    names = [column.key for column in columns]
+    rows = iter_rows(query, columns, batch_size)
+
+    if export_format == 'csv':
+        body = generate_csv(rows, names, batch_size)
+    else:
+        body = generate_ndjson(rows, names, batch_size)
+
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+    )
@@ -0,0 +1,421 @@
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+import cv2
+import numpy as np
+from flask import current_app
+from Models.image_model import Image
+from Controller.colorHistogramController import DEFAULT_APPROX_PIXELS, compute_color_histograms
+from Controller.imageCacheController import decode_image, get_image_bytes
+
+DEFAULT_INDEX_DIR = os.path.join('uploads', 'feature_index')
+HASH_BITS = 64
+COLOR_BINS = 8
+VECTOR_DIM = 3 * COLOR_BINS
+MIN_CAPACITY = 1024
+MAX_K = 100
+
+# Index file -> (attribute of FeatureIndex, dtype, shape of one row)
+INDEX_ARRAYS = {
+    'ids': ('ids', np.int64, ()),
+    'phash': ('hashes', np.uint64, ()),
+    'color': ('vectors', np.float32, (VECTOR_DIM,)),
+}
+
+# Rows a search reads, taken together under the index lock so that an append never shows a row without its norm
+IndexSnapshot = namedtuple('IndexSnapshot', ['count', 'ids', 'hashes', 'vectors', 'norms'])
+
+# Ranking of /images/similar: perceptual hash distance, color distance or the mean of both (each scaled to 0-1)
+SIMILARITY_MEASURES = ('combined', 'phash', 'color')
+
+
+def perceptual_hash(image):
+    """
+    64-bit DCT perceptual hash of a BGR image: the 8x8 lowest frequencies of the 32x32 grayscale
+    image, one bit per coefficient above their median. Near-identical images differ by a few bits.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    # The DC coefficient is the mean brightness, it would dominate the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def color_vector(image):
+    """
+    Normalized HSV color histogram of a BGR image, COLOR_BINS bins per channel. Every channel sums to 1/3,
+    so the L2 distance of two vectors is between 0 and sqrt(2)/sqrt(3).
+    """
+    histogram = compute_color_histograms(image, COLOR_BINS, ['hsv'], approximate=True,
+                                         max_pixels=DEFAULT_APPROX_PIXELS)['hsv']
+    counts = np.array([histogram['channels'][name] for name in ('h', 's', 'v')], dtype=np.float32).ravel()
+    return counts / (3 * histogram['pixels'])
+
+
+def extract_features(content):
+    """
+    Compact descriptors of encoded image bytes.
+
+    Output:
+        dict: 'phash' (int, 64 bits) and 'color' (numpy.ndarray of VECTOR_DIM float32).
+    """
+    image = decode_image(content)
+    return {'phash': perceptual_hash(image), 'color': color_vector(image)}
+
+
+def try_extract_features(content):
+    """
+    Features of uploaded bytes, None when they cannot be decoded as an image (such files are stored unindexed).
+    """
+    try:
+        return extract_features(content)
+    except Exception:
+        return None
+
+
+class FeatureIndex:
+    """
+    Array-backed index of the image descriptors, for similarity search without a table scan.
+
+    Three .npy files hold one row per image: ids (int64), phash (uint64) and color (float32, VECTOR_DIM).
+    They are preallocated with spare capacity and memory-mapped, an append writes one row in place and then
+    the row count in meta.json, so readers never see a partial row. When full, the files are copied into ones
+    twice as large. Appends from several processes are serialized with a lock file, and every process reopens
+    the files when meta.json changes.
+
+    In memory, the squared norms of the color vectors share the capacity of the files and a dict maps the
+    indexed ids to their rows. Appends fill every column before they publish the new count, and searches work
+    on a snapshot of the count and the arrays taken under the lock.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.meta_path = os.path.join(directory, 'meta.json')
+        self.lock_path = os.path.join(directory, 'index.lock')
+        self._lock = threading.RLock()
+        self._meta_version = None
+        self.count = 0
+        self.ids = self.hashes = self.vectors = self.norms = None
+        self.rows = {}
+        self.refresh()
+
+    def path(self, name):
+        return os.path.join(self.directory, f'{name}.npy')
+
+    def refresh(self):
+        """
+        Reopens the index files when another process (or a growth) changed them.
+        """
+        with self._lock:
+            try:
+                meta = os.stat(self.meta_path)
+            except FileNotFoundError:
+                return
+            # meta.json is replaced on every append, a new inode or mtime means new rows
+            version = (meta.st_ino, meta.st_mtime_ns)
+            if version == self._meta_version:
+                return
+            with open(self.meta_path) as meta_file:
+                count = json.load(meta_file)['count']
+            for name, (attribute, _, _) in INDEX_ARRAYS.items():
+                setattr(self, attribute, np.load(self.path(name), mmap_mode='r+'))
+            # Rows are only ever appended, the ones this process knows already are unchanged
+            known = self.count if count >= self.count else 0
+            norms = np.zeros(len(self.ids), dtype=np.float32)
+            if known:
+                norms[:known] = self.norms[:known]
+            norms[known:count] = np.einsum('ij,ij->i', self.vectors[known:count], self.vectors[known:count])
+            if not known:
+                self.rows = {}
+            self.rows.update((int(image_id), row) for row, image_id in enumerate(self.ids[known:count], known))
+            self.norms = norms
+            self.count = count
+            self._meta_version = version
+
+    def snapshot(self):
+        """
+        The current rows of the index, consistent with each other. Later appends do not change them.
+        """
+        self.refresh()
+        with self._lock:
+            return IndexSnapshot(self.count, self.ids, self.hashes, self.vectors, self.norms)
+
+    def grow(self, capacity):
+        """
+        Moves the rows into new files of the given capacity, replacing the old ones atomically.
+        """
+        for name, (attribute, dtype, row_shape) in INDEX_ARRAYS.items():
+            temporary_path = f'{self.path(name)}.{uuid.uuid4().hex}.tmp'
+            array = np.lib.format.open_memmap(temporary_path, mode='w+', dtype=dtype, shape=(capacity, *row_shape))
+            old = getattr(self, attribute)
+            if old is not None and self.count:
+                array[:self.count] = old[:self.count]
+            array.flush()
+            del array
+            os.replace(temporary_path, self.path(name))
+            setattr(self, attribute, np.load(self.path(name), mmap_mode='r+'))
+        norms = np.zeros(capacity, dtype=np.float32)
+        if self.count:
+            norms[:self.count] = self.norms[:self.count]
+        self.norms = norms
+
+    def write_meta(self):
+        temporary_path = f'{self.meta_path}.{uuid.uuid4().hex}.tmp'
+        with open(temporary_path, 'w') as meta_file:
+            json.dump({'count': self.count, 'dim': VECTOR_DIM}, meta_file)
+        os.replace(temporary_path, self.meta_path)
+        meta = os.stat(self.meta_path)
+        self._meta_version = (meta.st_ino, meta.st_mtime_ns)
+
+    def add(self, entries):
+        """
+        Appends descriptors to the index, skipping ids it holds already (or given twice).
+
+        Input:
+            entries (list[tuple]): (image_id, features) pairs, features as returned by extract_features.
+        """
+        with self._lock, open(self.lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self.refresh()
+            new_entries = {}
+            for image_id, features in entries:
+                if image_id not in self.rows and image_id not in new_entries:
+                    new_entries[image_id] = features
+            entries = list(new_entries.items())
+            if not entries:
+                return 0
+
+            needed = self.count + len(entries)
+            capacity = 0 if self.ids is None else len(self.ids)
+            if needed > capacity:
+                self.grow(max(MIN_CAPACITY, 2 * capacity, needed))
+
+            start = self.count
+            rows = slice(start, needed)
+            self.ids[rows] = [image_id for image_id, _ in entries]
+            self.hashes[rows] = [features['phash'] for _, features in entries]
+            self.vectors[rows] = np.stack([features['color'] for _, features in entries])
+            for array in (self.ids, self.hashes, self.vectors):
+                array.flush()
+            self.norms[rows] = np.einsum('ij,ij->i', self.vectors[rows], self.vectors[rows])
+            self.rows.update((image_id, row) for row, (image_id, _) in enumerate(entries, start))
+
+            # Published last, every column holds the new rows by now
+            self.count = needed
+            self.write_meta()
+            return len(entries)
+
+    def row_of(self, image_id):
+        """
+        Row of an image in the index, or None.
+        """
+        self.refresh()
+        return self.rows.get(image_id)
+
+    def missing_ids(self, image_ids):
+        """
+        The ids of the list that are not indexed, in list order.
+        """
+        self.refresh()
+        return [image_id for image_id in image_ids if image_id not in self.rows]
+
+    @staticmethod
+    def hamming_distances(snapshot, phash, rows=slice(None)):
+        return np.bitwise_count(snapshot.hashes[:snapshot.count][rows] ^ np.uint64(phash))
+
+    @staticmethod
+    def color_distances(snapshot, vector, rows=slice(None)):
+        """
+        L2 distances as sqrt(||v||^2 - 2 v.q + ||q||^2), one matrix-vector product over the color column
+        with the norms kept in memory. Computed in place in float32, the product is the only full pass.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        distances = snapshot.vectors[:snapshot.count][rows] @ vector
+        distances *= -2
+        distances += snapshot.norms[:snapshot.count][rows]
+        distances += vector @ vector
+        np.maximum(distances, 0, out=distances)
+        return np.sqrt(distances, out=distances)
+
+    def duplicates(self, phash, max_distance):
+        """
+        Indexed images whose perceptual hash is at most max_distance bits away, closest first.
+        """
+        snapshot = self.snapshot()
+        if not snapshot.count:
+            return []
+        distances = self.hamming_distances(snapshot, phash)
+        rows = np.flatnonzero(distances <= max_distance)
+        rows = rows[np.argsort(distances[rows], kind='stable')]
+        return [{'image_id': int(snapshot.ids[row]), 'distance': int(distances[row])} for row in rows]
+
+    def search(self, features, k=10, by='combined', exclude_id=None):
+        """
+        The k nearest indexed images to the given descriptors.
+
+        Only the distance the ranking needs is computed for every row, the other one for the k results.
+        Hash distances are small integers, their k best are cut at a threshold found with one bincount.
+        Float scores go through argpartition, only the best k are sorted.
+        """
+        snapshot = self.snapshot()
+        if not snapshot.count:
+            return []
+        # One extra candidate stands in for the excluded image, it is dropped below
+        limit = min(k + (exclude_id is not None), snapshot.count)
+
+        if by == 'phash':
+            scores = self.hamming_distances(snapshot, features['phash'])
+            counts = np.cumsum(np.bincount(scores, minlength=HASH_BITS + 1))
+            threshold = int(np.searchsorted(counts, limit))
+            best = np.flatnonzero(scores <= threshold)
+        else:
+            scores = self.color_distances(snapshot, features['color'])
+            if by == 'combined':
+                scores *= 0.5 / np.sqrt(2 / 3)
+                scores += self.hamming_distances(snapshot, features['phash']) * np.float32(0.5 / HASH_BITS)
+            best = np.argpartition(scores, limit - 1)[:limit]
+        best = best[np.argsort(scores[best], kind='stable')][:limit]
+
+        hamming = self.hamming_distances(snapshot, features['phash'], best)
+        color = self.color_distances(snapshot, features['color'], best)
+        results = [{
+            'image_id': int(snapshot.ids[row]),
+            'phash_distance': int(hamming[i]),
+            'color_distance': round(float(color[i]), 6),
+            'score': round(float(scores[row]), 6)
+        } for i, row in enumerate(best)]
+        return [result for result in results if result['image_id'] != exclude_id][:k]
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_feature_index():
+    """
+    Returns the process-wide feature index stored in IMAGE_FEATURE_INDEX_DIR (app config).
+    """
+    directory = current_app.config.get('IMAGE_FEATURE_INDEX_DIR', DEFAULT_INDEX_DIR)
+    with _indexes_lock:
+        if directory not in _indexes:
+            _indexes[directory] = FeatureIndex(directory)
+        return _indexes[directory]
+
+
+def find_duplicates(features):
+    """
+    Indexed images within IMAGE_DUPLICATE_MAX_DISTANCE bits (app config) of the perceptual hash of new features.
+    """
+    if features is None:
+        return []
+    max_distance = current_app.config.get('IMAGE_DUPLICATE_MAX_DISTANCE', 4)
+    return get_feature_index().duplicates(features['phash'], max_distance)
+
+
+def index_image_features(entries):
+    """
+    Adds (image_id, features) pairs to the index, ignoring images whose features could not be extracted.
+    """
+    entries = [(image_id, features) for image_id, features in entries if features is not None]
+    return get_feature_index().add(entries) if entries else 0
+
+
+def index_missing_images(limit=1000, after=0):
+    """
+    Extracts and indexes the features of images uploaded before the index existed (or lost with it),
+    at most `limit` images per call in id order.
+
+    Input:
+        limit (int): Maximum number of missing images indexed by this call.
+        after (int): Only consider images with a larger id, the next_after of the previous call.
+    Output:
+        dict: Size of the index, failures and the cursor of the next call (None once no images are left).
+        int: HTTP status code.
+    """
+    if limit < 1:
+        return {'error': 'limit must be positive'}, 400
+    index = get_feature_index()
+
+    entries, failed, attempted = [], [], 0
+    last_id, next_after = after, None
+    while next_after is None:
+        rows = (Image.query.with_entities(Image.id, Image.public_id, Image.url)
+                .filter(Image.id > last_id).order_by(Image.id).limit(1000).all())
+        if not rows:
+            break
+        last_id = rows[-1].id
+        unknown_ids = set(index.missing_ids([row.id for row in rows]))
+        for row in rows:
+            if row.id not in unknown_ids:
+                continue
+            attempted += 1
+            try:
+                entries.append((row.id, extract_features(get_image_bytes(row.public_id, row.url))))
+            except Exception as e:
+                failed.append({'image_id': row.id, 'error': str(e)})
+            if len(entries) >= 100:
+                index.add(entries)
+                entries = []
+            if attempted >= limit:
+                next_after = row.id
+                break
+    if entries:
+        index.add(entries)
+
+    # Only hand out a cursor when images are left after it
+    if next_after is not None and not Image.query.with_entities(Image.id).filter(Image.id > next_after).first():
+        next_after = None
+    return {'indexed': index.count, 'failed': failed, 'next_after': next_after}, 200
+
+
+def find_similar_images(image_id, k=10, by='combined'):
+    """
+    Top-k most similar images to an image.
+
+    Input:
+        image_id (int): ID of the query image. It is indexed first when it was uploaded before the index existed.
+        k (int): Number of results, at most 100.
+        by (str): 'combined' (default), 'phash' or 'color'.
+    Output:
+        dict: The ranked images with their distances, or an error message.
+        int: HTTP status code.
+    """
+    if by not in SIMILARITY_MEASURES:
+        return {'error': f"Unsupported measure: {by}, expected one of {', '.join(SIMILARITY_MEASURES)}"}, 400
+    try:
+        k = int(k)
+    except (TypeError, ValueError):
+        return {'error': 'k must be an integer'}, 400
+    if not 1 <= k <= MAX_K:
+        return {'error': f'k must be between 1 and {MAX_K}'}, 400
+
+    image = Image.query.get(image_id)
+    if not image:
+        return {'error': 'Image not found'}, 404
+
+    index = get_feature_index()
+    row = index.row_of(image.id)
+    if row is None:
+        try:
+            features = extract_features(get_image_bytes(image.public_id, image.url))
+        except Exception as e:
+            return {'error': f'Image features could not be extracted: {str(e)}'}, 422
+        index.add([(image.id, features)])
+    else:
+        features = {'phash': int(index.hashes[row]), 'color': np.array(index.vectors[row])}
+
+    start = time.perf_counter()
+    results = index.search(features, k, by, exclude_id=image.id)
+    return {
+        'image_id': image.id,
+        'phash': f"{features['phash']:016x}",
+        'by': by,
+        'results': results,
+        'indexed': index.count,
+        'search_ms': round((time.perf_counter() - start) * 1000, 3)
+    }, 200
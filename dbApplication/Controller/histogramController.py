@@ -0,0 +1,93 @@
+import threading
+import numpy as np
+from sqlalchemy import Integer, case, cast, func
+from Models.dbModel import db
+from Controller.dataVersionController import get_table_version
+
+DEFAULT_BINS = 10
+MAX_BINS = 1000
+
+# (table, column, table version) -> (min, max)
+_ranges = {}
+_lock = threading.Lock()
+MAX_CACHED_RANGES = 256
+
+
+def get_column_range(model, column_name):
+    """
+    Returns the minimum and maximum of a column (None when it has no values), cached per table version.
+    MIN/MAX on an indexed column are answered from the index without reading the table.
+    """
+    table_name = model.__tablename__
+    key = (table_name, column_name, get_table_version(table_name))
+    cached = _ranges.get(key)
+    if cached is not None:
+        return cached
+
+    column = getattr(model, column_name)
+    # Two single aggregate queries, SQLite only reads the index end for a lone MIN() or MAX()
+    result = (db.session.query(func.min(column)).scalar(), db.session.query(func.max(column)).scalar())
+    with _lock:
+        if len(_ranges) >= MAX_CACHED_RANGES:
+            _ranges.clear()
+        _ranges[key] = result
+    return result
+
+
+def bin_edges(low, high, bins):
+    """
+    Evenly spaced bin edges over [low, high], widened by 0.5 on both sides when every value is equal,
+    like numpy.histogram.
+    """
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def compute_histogram(model, column_name, bins=DEFAULT_BINS, query=None):
+    """
+    Computes a histogram of a numeric column inside the database.
+
+    The edges come from the cached min/max of the column, each row is mapped to its bin with
+    CAST((value - min) / width AS INTEGER) (the maximum falls in the last, closed bin like numpy.histogram)
+    and a GROUP BY returns one count per non empty bin, so only `bins` rows leave the database.
+
+    Input:
+        model (db.Model): The model owning the column.
+        column_name (str): Numeric column to bin.
+        bins (int): Number of bins.
+        query (SQLAlchemy query object, optional): Filtered query on the model, the whole table by default.
+    Output:
+        dict: Bin edges, counts per bin and total number of values, or None when the column has no values.
+    """
+    low, high = get_column_range(model, column_name)
+    if low is None:
+        return None
+
+    edges = bin_edges(float(low), float(high), bins)
+    width = (edges[-1] - edges[0]) / bins
+    column = getattr(model, column_name)
+    bucket = case(
+        (column >= edges[-1], bins - 1),
+        else_=cast((column - edges[0]) / width, Integer)
+    ).label('bucket')
+
+    query = query if query is not None else model.query
+    rows = (
+        query.with_entities(bucket, func.count(column))
+        .filter(column.isnot(None))
+        .group_by(bucket)
+        .all()
+    )
+
+    counts = np.zeros(bins, dtype=np.int64)
+    for index, bucket_count in rows:
+        counts[min(max(int(index), 0), bins - 1)] += bucket_count
+
+    return {
+        'column': column_name,
+        'bins': bins,
+        'edges': [float(edge) for edge in edges],
+        'counts': [int(value) for value in counts],
+        'total': int(counts.sum())
+    }
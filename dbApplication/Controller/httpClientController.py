@@ -0,0 +1,89 @@
+import threading
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+class DownloadTooLarge(ValueError):
+    """
+    Raised when a download exceeds the allowed number of bytes.
+    """
+
+
+def client_settings():
+    """
+    Reads the HTTP client settings from the app config.
+    """
+    config = current_app.config
+    return {
+        'pool_connections': config.get('HTTP_POOL_CONNECTIONS', 10),
+        'pool_maxsize': config.get('HTTP_POOL_MAXSIZE', 16),
+        'retries': config.get('HTTP_RETRIES', 3),
+        'backoff_factor': config.get('HTTP_RETRY_BACKOFF', 0.3),
+    }
+
+
+def get_session():
+    """
+    Returns the process-wide pooled HTTP session.
+
+    Connections are kept alive and reused per host (HTTP_POOL_CONNECTIONS hosts, HTTP_POOL_MAXSIZE
+    connections each). Idempotent requests failing to connect or answered with 429/5xx are retried
+    HTTP_RETRIES times with exponential backoff.
+    """
+    settings = client_settings()
+    key = tuple(sorted(settings.items()))
+    with _lock:
+        if key not in _sessions:
+            retry = Retry(
+                total=settings['retries'],
+                backoff_factor=settings['backoff_factor'],
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=settings['pool_connections'],
+                                  pool_maxsize=settings['pool_maxsize'], max_retries=retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+        return _sessions[key]
+
+
+def download(url, max_bytes=None):
+    """
+    Downloads a URL through the pooled session as a stream, with connect/read timeouts
+    (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT) and a size guard.
+
+    Input:
+        url (str): URL to download.
+        max_bytes (int, optional): Largest accepted body, defaults to the MAX_DOWNLOAD_BYTES app config.
+    Output:
+        bytes: The response body. Raises requests.HTTPError for an error status and DownloadTooLarge
+        as soon as the body (announced or received) exceeds max_bytes.
+    """
+    config = current_app.config
+    max_bytes = max_bytes or config.get('MAX_DOWNLOAD_BYTES', 25 * 1024 * 1024)
+    timeout = (config.get('HTTP_CONNECT_TIMEOUT', 3.05), config.get('HTTP_READ_TIMEOUT', 10))
+
+    with get_session().get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        announced = response.headers.get('Content-Length')
+        if announced and announced.isdigit() and int(announced) > max_bytes:
+            raise DownloadTooLarge(f'{url} is {announced} bytes, the limit is {max_bytes}')
+
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            received += len(chunk)
+            if received > max_bytes:
+                raise DownloadTooLarge(f'{url} is larger than the limit of {max_bytes} bytes')
+            chunks.append(chunk)
+        return b''.join(chunks)
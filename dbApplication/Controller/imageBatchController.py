@@ -0,0 +1,451 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from flask import Response, current_app, stream_with_context
+from sqlalchemy.orm import undefer
+from Models.dbModel import db
+from Models.image_model import Image, ImageVariant
+from Controller.imageCacheController import get_image_bytes, peek_decoded_image
+from Controller.sharedBufferController import BufferHandle, get_buffer_manager
+from Controller.colorHistogramController import (DEFAULT_APPROX_PIXELS, store_histograms, stored_histograms,
+                                                  validate_histogram_params)
+from Controller.imageVariantController import DEFAULT_MAX_SIDE, store_variant, variant_hash
+from Controller.imageWorkerController import run_histograms, run_pipeline
+
+DEFAULT_MAX_IDS = 10000
+MAX_OPERATIONS = 16
+ID_QUERY_CHUNK = 500
+
+# Output formats of the batch pipeline -> (OpenCV encoder extension, PIL format name recorded on the variant)
+BATCH_FORMATS = {
+    'png': ('.png', 'PNG'),
+    'jpeg': ('.jpg', 'JPEG'),
+    'jpg': ('.jpg', 'JPEG'),
+    'webp': ('.webp', 'WEBP'),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_workers():
+    return current_app.config.get('IMAGE_PROCESS_WORKERS') or os.cpu_count() or 1
+
+
+def get_process_pool():
+    """
+    Returns the process pool running the image pipelines, creating it on first use with
+    IMAGE_PROCESS_WORKERS processes (app config, every core when unset).
+
+    Workers are forked from a fork server, a single threaded process that only preloaded imageWorkerController,
+    never from the multithreaded web server whose locks and connections could be held by a request thread.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['Controller.imageWorkerController'])
+            _pool = ProcessPoolExecutor(max_workers=pool_workers(), mp_context=context)
+        return _pool
+
+
+def discard_process_pool():
+    """
+    Drops a pool whose worker died, the next batch starts a new one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def read_int(step, name, minimum, maximum, default=None):
+    value = step.get(name, default)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or not minimum <= value <= maximum:
+        raise ValueError(f"'{name}' of the {step['op']} operation must be an integer between {minimum} and {maximum}")
+    return value
+
+
+def read_hsv_bound(step, name):
+    bound = step.get(name)
+    if (not isinstance(bound, list) or len(bound) != 3
+            or not all(isinstance(value, int) and 0 <= value <= 255 for value in bound)):
+        raise ValueError(f"'{name}' of the segment operation must be three integers [H, S, V]")
+    return bound
+
+
+def normalize_operations(operations):
+    """
+    Validates a pipeline and puts every step into its canonical form.
+
+    Input:
+        operations (list[dict]): Steps applied in order, each with an 'op':
+            - resize: 'width' and/or 'height' (the aspect ratio is kept when only one is given).
+            - crop: 'x', 'y', 'width', 'height'.
+            - segment: 'lower_bound' and 'upper_bound' HSV thresholds, pixels outside are blacked out.
+            - histogram: optional 'bins' (default 256), records the RGB histogram of the image at that step.
+    Output:
+        list[dict]: The canonical steps. Raises ValueError for an invalid pipeline.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty list')
+    if len(operations) > MAX_OPERATIONS:
+        raise ValueError(f'A pipeline has at most {MAX_OPERATIONS} operations')
+
+    max_side = current_app.config.get('IMAGE_VARIANT_MAX_SIDE', DEFAULT_MAX_SIDE)
+    steps = []
+    for step in operations:
+        if not isinstance(step, dict):
+            raise ValueError('Every operation must be an object with an "op"')
+        op = step.get('op')
+        if op == 'resize':
+            width = read_int(step, 'width', 1, max_side)
+            height = read_int(step, 'height', 1, max_side)
+            if width is None and height is None:
+                raise ValueError('resize needs a width or a height')
+            steps.append({'op': op, 'width': width, 'height': height})
+        elif op == 'crop':
+            box = {name: read_int(step, name, 0 if name in ('x', 'y') else 1, 1 << 20)
+                   for name in ('x', 'y', 'width', 'height')}
+            if None in box.values():
+                raise ValueError('crop needs x, y, width and height')
+            steps.append({'op': op, **box})
+        elif op == 'segment':
+            steps.append({'op': op, 'lower_bound': read_hsv_bound(step, 'lower_bound'),
+                          'upper_bound': read_hsv_bound(step, 'upper_bound')})
+        elif op == 'histogram':
+            steps.append({'op': op, 'bins': read_int(step, 'bins', 1, 256, 256)})
+        else:
+            raise ValueError(f"Unsupported operation: {op}, expected resize, crop, segment or histogram")
+    return steps
+
+
+def image_source(buffers, image, content=None):
+    """
+    What a worker receives for an image: the handle of a shared copy of its decoded array when the image
+    cache holds it, its encoded bytes otherwise (content when they were prefetched). Buffers are released
+    by the caller once the worker is done.
+    """
+    decoded = peek_decoded_image(image.public_id, image.url)
+    if decoded is not None:
+        return buffers.share(decoded)
+    return content if content is not None else get_image_bytes(image.public_id, image.url)
+
+
+def prefetch_sources(entries, image_of, workers=None):
+    """
+    Fetches the encoded bytes of the images of a batch on a thread pool, ahead of the loop dispatching them.
+
+    Images missing from the decoded image cache are read by IMAGE_PREFETCH_WORKERS threads (app config), through
+    the disk tier of the image cache and the pooled HTTP session of remote stores, at most twice as many
+    entries ahead of the consumer. Cold downloads overlap each other instead of running one by one.
+
+    Input:
+        entries (iterable): Entries of the batch, consumed lazily and in order.
+        image_of (callable): Returns the image row of an entry whose bytes are needed, or None.
+        workers (int, optional): Download threads, defaults to IMAGE_PREFETCH_WORKERS.
+    Output:
+        generator: (entry, future of the bytes or None) in the order of the entries. None when nothing was
+        prefetched, the decoded image is in the cache or the entry needs no image.
+    """
+    workers = workers or current_app.config.get('IMAGE_PREFETCH_WORKERS', 8)
+    app = current_app._get_current_object()
+
+    def fetch(image):
+        with app.app_context():
+            return get_image_bytes(image.public_id, image.url)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    ahead = deque()
+    try:
+        for entry in entries:
+            image = image_of(entry)
+            future = None
+            if image is not None and peek_decoded_image(image.public_id, image.url) is None:
+                future = executor.submit(fetch, image)
+            ahead.append((entry, future))
+            if len(ahead) > 2 * workers:
+                yield ahead.popleft()
+        while ahead:
+            yield ahead.popleft()
+    finally:
+        # The consumer stopped early (client gone), do not wait for downloads nobody will read
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def prefetched_source(buffers, image, future):
+    """
+    The source of an image for its worker, from its prefetched bytes when there are some.
+    """
+    return image_source(buffers, image, future.result() if future is not None else None)
+
+
+def validate_image_ids(image_ids):
+    """
+    Raises ValueError unless image_ids is a non-empty list of at most IMAGE_BATCH_MAX_IDS (app config) integers.
+    """
+    max_ids = current_app.config.get('IMAGE_BATCH_MAX_IDS', DEFAULT_MAX_IDS)
+    if not isinstance(image_ids, list) or not image_ids:
+        raise ValueError('image_ids must be a non-empty list')
+    if len(image_ids) > max_ids:
+        raise ValueError(f'A batch has at most {max_ids} images')
+    if not all(isinstance(image_id, int) and not isinstance(image_id, bool) for image_id in image_ids):
+        raise ValueError('image_ids must be integers')
+
+
+def load_images(image_ids):
+    """
+    Loads id, public_id and URL of the requested images, chunked to stay below the bound parameter limit.
+    Plain rows stay valid across the commits of the batch, ORM instances would be expired by every commit.
+    """
+    images = {}
+    for offset in range(0, len(image_ids), ID_QUERY_CHUNK):
+        chunk = image_ids[offset:offset + ID_QUERY_CHUNK]
+        rows = Image.query.with_entities(Image.id, Image.public_id, Image.url).filter(Image.id.in_(chunk)).all()
+        images.update((row.id, row) for row in rows)
+    return images
+
+
+def process_image_batch(data):
+    """
+    Runs an operation pipeline on many images across a process pool and streams one NDJSON line per image
+    as soon as its pipeline finishes, followed by a summary line.
+
+    Images are processed by at most IMAGE_PROCESS_WORKERS processes, with twice as many images in flight.
+    An image already decoded in the image cache is handed to its worker as a shared buffer handle, the worker
+    maps the pixels instead of receiving a pickled copy or decoding again. Other images are sent encoded
+    (much smaller than decoded) and decoded in parallel by the workers. Output images are stored as variants
+    of their original, so re-running a pipeline without histogram steps returns the stored variants without
+    processing them again.
+
+    Input:
+        data (dict): 'image_ids' (list[int]), 'operations' (see normalize_operations) and an optional
+            output 'format' ('png' by default, 'jpeg' or 'webp').
+    Output:
+        Response: Streamed NDJSON, or an error message with a status code.
+    """
+    image_ids = data.get('image_ids')
+    try:
+        validate_image_ids(image_ids)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    output_format = str(data.get('format', 'png')).lower()
+    if output_format not in BATCH_FORMATS:
+        return {'error': f"Unsupported format: {output_format}, expected one of {', '.join(BATCH_FORMATS)}"}, 400
+    extension, img_format = BATCH_FORMATS[output_format]
+
+    try:
+        steps = normalize_operations(data.get('operations'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    image_steps = [step for step in steps if step['op'] != 'histogram']
+    variant_params = {'pipeline': image_steps, 'fmt': img_format} if image_steps else None
+    # Histograms are not stored, pipelines recording them always run
+    memoized = variant_params is not None and len(image_steps) == len(steps)
+
+    images = load_images(image_ids)
+    pool = get_process_pool()
+    buffers = get_buffer_manager()
+    window = 2 * pool_workers()
+
+    def finish(image, source, future):
+        if isinstance(source, BufferHandle):
+            buffers.release(source)
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            discard_process_pool()
+            raise
+        except Exception as e:
+            return {'image_id': image.id, 'status': 'failed', 'error': str(e)}
+
+        line = {
+            'image_id': image.id,
+            'status': 'processed',
+            'width': result['width'],
+            'height': result['height'],
+            'elapsed_seconds': result['elapsed_seconds']
+        }
+        if result['histograms']:
+            line['histograms'] = result['histograms']
+        if result['content'] is not None:
+            try:
+                variant = store_variant(image, variant_hash(image, variant_params), variant_params,
+                                        result['content'], img_format, result['width'], result['height'])
+            except Exception as e:
+                db.session.rollback()
+                return {'image_id': image.id, 'status': 'failed', 'error': f'Result could not be stored: {str(e)}'}
+            line['url'] = variant.url
+            line['variant_id'] = variant.id
+        return line
+
+    def generate():
+        start = time.perf_counter()
+        counts = {'processed': 0, 'cached': 0, 'failed': 0, 'not_found': 0}
+        pending = {}
+
+        def drain(limit):
+            while len(pending) > limit:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    line = finish(*pending.pop(future), future)
+                    counts[line['status']] += 1
+                    yield json.dumps(line) + '\n'
+
+        def entries():
+            for image_id in image_ids:
+                image = images.get(image_id)
+                variant = None
+                if image is not None and memoized:
+                    variant = ImageVariant.query.filter_by(
+                        image_id=image.id, params_hash=variant_hash(image, variant_params)).first()
+                yield image_id, image, variant
+
+        try:
+            for (image_id, image, variant), future in prefetch_sources(
+                    entries(), lambda entry: entry[1] if entry[2] is None else None):
+                if image is None:
+                    counts['not_found'] += 1
+                    yield json.dumps({'image_id': image_id, 'status': 'not_found'}) + '\n'
+                    continue
+
+                if variant:
+                    counts['cached'] += 1
+                    yield json.dumps({'image_id': image.id, 'status': 'cached', 'width': variant.width,
+                                      'height': variant.height, 'url': variant.url, 'variant_id': variant.id}) + '\n'
+                    continue
+
+                try:
+                    source = prefetched_source(buffers, image, future)
+                except Exception as e:
+                    counts['failed'] += 1
+                    yield json.dumps({'image_id': image.id, 'status': 'failed', 'error': str(e)}) + '\n'
+                    continue
+
+                pending[pool.submit(run_pipeline, source, steps, extension)] = (image, source)
+                yield from drain(window - 1)
+
+            yield from drain(0)
+        finally:
+            # The client went away mid-stream, drop the buffers of the images still in flight
+            for _, source in pending.values():
+                if isinstance(source, BufferHandle):
+                    buffers.release(source)
+
+        yield json.dumps({'summary': {**counts, 'elapsed_seconds': round(time.perf_counter() - start, 3)}}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def batch_color_histograms(data):
+    """
+    Color histogram counts of many images as JSON.
+
+    Histograms already stored on the Image rows are returned as is, the missing ones are computed across
+    the process pool (with shared buffers for images in the decoded image cache) and stored with one commit.
+    As in process_image_batch, at most twice as many images as workers are in flight at a time.
+
+    Input:
+        data (dict): 'image_ids' (list[int]), optional 'bins' (default 256), 'colorspaces' (any of 'rgb',
+            'hsv' and 'lab', default ['rgb']) and 'approximate' (bool).
+    Output:
+        dict: Histograms per image in request order, ids not found, failures and counts.
+        int: HTTP status code.
+    """
+    image_ids = data.get('image_ids')
+    try:
+        validate_image_ids(image_ids)
+        bins, colorspaces = validate_histogram_params(data.get('bins', 256), data.get('colorspaces'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    approximate = data.get('approximate', False)
+    if not isinstance(approximate, bool):
+        return {'error': 'approximate must be true or false'}, 400
+    max_pixels = current_app.config.get('IMAGE_HISTOGRAM_APPROX_PIXELS', DEFAULT_APPROX_PIXELS)
+
+    start = time.perf_counter()
+    images = {}
+    for offset in range(0, len(image_ids), ID_QUERY_CHUNK):
+        chunk = image_ids[offset:offset + ID_QUERY_CHUNK]
+        query = Image.query.options(undefer(Image.histograms)).filter(Image.id.in_(chunk))
+        images.update((image.id, image) for image in query.all())
+
+    results, failed = {}, []
+    pool = get_process_pool()
+    buffers = get_buffer_manager()
+    window = 2 * pool_workers()
+    pending = {}
+    computed = 0
+
+    def collect(limit):
+        nonlocal computed
+        while len(pending) > limit:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                image, source = pending.pop(future)
+                if isinstance(source, BufferHandle):
+                    buffers.release(source)
+                try:
+                    histograms = future.result()
+                except BrokenProcessPool:
+                    discard_process_pool()
+                    raise
+                except Exception as e:
+                    failed.append({'image_id': image.id, 'error': str(e)})
+                    continue
+                store_histograms(image, bins, approximate, histograms)
+                results[image.id]['histograms'].update(histograms)
+                computed += 1
+
+    try:
+        to_compute = []
+        for image in images.values():
+            histograms, missing = stored_histograms(image, bins, colorspaces, approximate)
+            results[image.id] = {'image_id': image.id, 'histograms': histograms, 'cached': not missing}
+            if missing:
+                to_compute.append((image, missing))
+
+        for (image, missing), prefetched in prefetch_sources(to_compute, lambda entry: entry[0]):
+            try:
+                source = prefetched_source(buffers, image, prefetched)
+            except Exception as e:
+                failed.append({'image_id': image.id, 'error': str(e)})
+                continue
+            future = pool.submit(run_histograms, source, bins, missing, approximate, max_pixels)
+            pending[future] = (image, source)
+            collect(window - 1)
+
+        collect(0)
+        if computed:
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 500
+    finally:
+        for _, source in pending.values():
+            if isinstance(source, BufferHandle):
+                buffers.release(source)
+
+    failed_ids = {failure['image_id'] for failure in failed}
+    return {
+        'bins': bins,
+        'colorspaces': colorspaces,
+        'results': [
+            {**results[image_id], 'histograms': {name: results[image_id]['histograms'][name] for name in colorspaces}}
+            for image_id in dict.fromkeys(image_ids) if image_id in results and image_id not in failed_ids
+        ],
+        'not_found': [image_id for image_id in dict.fromkeys(image_ids) if image_id not in images],
+        'failed': failed,
+        'computed': computed,
+        'elapsed_seconds': round(time.perf_counter() - start, 3)
+    }, 200
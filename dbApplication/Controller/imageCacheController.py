@@ -0,0 +1,175 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from io import BytesIO
+import cv2
+import numpy as np
+from flask import current_app
+from PIL import Image as PILImage
+from Controller.storageController import get_storage
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_DISK_CACHE_BYTES = 1024 * 1024 * 1024
+# Eviction trims the disk tier down to this share of its budget, so it does not run on every write
+DISK_CACHE_LOW_WATERMARK = 0.9
+
+# OpenCV conversion from BGR for every colorspace kept in the decoded image cache
+COLORSPACES = {
+    'BGR': None,
+    'HSV': cv2.COLOR_BGR2HSV,
+    'RGB': cv2.COLOR_BGR2RGB,
+}
+
+# (public_id, url, colorspace) -> read-only ndarray, least recently used first
+_decoded = OrderedDict()
+_decoded_bytes = 0
+_lock = threading.Lock()
+# disk tier directory -> bytes of its files, counted on first write and then kept up to date
+_disk_bytes = {}
+_disk_lock = threading.Lock()
+
+
+def disk_cache_path(public_id, image_url):
+    """
+    Path of the cached original bytes of an image version, None when the disk tier is disabled
+    (IMAGE_CACHE_DIR unset) or pointless because the storage backend is local.
+    """
+    cache_dir = current_app.config.get('IMAGE_CACHE_DIR')
+    if not cache_dir or get_storage().name == 'local':
+        return None
+    digest = hashlib.sha256(f'{public_id}\n{image_url}'.encode()).hexdigest()
+    return os.path.join(cache_dir, digest[:2], digest)
+
+
+def evict_disk_cache(cache_dir, max_bytes):
+    """
+    Deletes the least recently used files of the disk tier (oldest modification time first, reads
+    refresh it) until it holds at most DISK_CACHE_LOW_WATERMARK of max_bytes.
+
+    Returns the number of bytes left in the directory.
+    """
+    entries = []
+    for directory, _, names in os.walk(cache_dir):
+        for name in names:
+            if name.endswith('.tmp'):
+                continue  # Being written by another request
+            path = os.path.join(directory, name)
+            try:
+                status = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return total
+    for _, size, path in sorted(entries):
+        if total <= max_bytes * DISK_CACHE_LOW_WATERMARK:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    return total
+
+
+def record_disk_write(cache_dir, size):
+    """
+    Counts bytes written to the disk tier and evicts files once it exceeds IMAGE_CACHE_DIR_MAX_BYTES (app config).
+    The first write of the process counts the files already there, other processes sharing the directory
+    are accounted for at the next eviction.
+    """
+    max_bytes = current_app.config.get('IMAGE_CACHE_DIR_MAX_BYTES', DEFAULT_DISK_CACHE_BYTES)
+    with _disk_lock:
+        if cache_dir not in _disk_bytes:
+            _disk_bytes[cache_dir] = evict_disk_cache(cache_dir, max_bytes)
+        _disk_bytes[cache_dir] += size
+        if _disk_bytes[cache_dir] > max_bytes:
+            _disk_bytes[cache_dir] = evict_disk_cache(cache_dir, max_bytes)
+
+
+def get_image_bytes(public_id, image_url):
+    """
+    Returns the original bytes of an image version. The URL changes with every new version of the image,
+    so (public_id, URL) entries of the disk tier never go stale, they are only evicted to stay within its budget.
+    """
+    path = disk_cache_path(public_id, image_url)
+    if path:
+        try:
+            with open(path, 'rb') as cached_file:
+                content = cached_file.read()
+            os.utime(path)  # Recently read files are evicted last
+            return content
+        except FileNotFoundError:
+            pass
+
+    content = get_storage().get(public_id, image_url)
+    max_bytes = current_app.config.get('IMAGE_CACHE_DIR_MAX_BYTES', DEFAULT_DISK_CACHE_BYTES)
+    if path and len(content) <= max_bytes:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temporary_path, 'wb') as cached_file:
+            cached_file.write(content)
+        os.replace(temporary_path, path)
+        record_disk_write(current_app.config['IMAGE_CACHE_DIR'], len(content))
+    return content
+
+
+def decode_image(content):
+    """
+    Decode image bytes into a BGR NumPy array for OpenCV.
+    """
+    img = PILImage.open(BytesIO(content)).convert('RGB')
+    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)  # Convert RGB to BGR for OpenCV
+
+
+def store_decoded(key, array):
+    global _decoded_bytes
+    max_bytes = current_app.config.get('IMAGE_CACHE_MAX_BYTES', DEFAULT_CACHE_BYTES)
+    if array.nbytes > max_bytes:
+        return
+    with _lock:
+        if key in _decoded:
+            return
+        _decoded[key] = array
+        _decoded_bytes += array.nbytes
+        while _decoded_bytes > max_bytes:
+            _, evicted = _decoded.popitem(last=False)
+            _decoded_bytes -= evicted.nbytes
+
+
+def peek_decoded_image(public_id, image_url, colorspace='BGR'):
+    """
+    Returns a decoded image array when it is in the in-process cache, None otherwise. Never downloads or decodes.
+    """
+    key = (public_id, image_url, colorspace)
+    with _lock:
+        if key in _decoded:
+            _decoded.move_to_end(key)
+            return _decoded[key]
+    return None
+
+
+def get_decoded_image(public_id, image_url, colorspace='BGR'):
+    """
+    Returns an image version decoded into a NumPy array of the given colorspace ('BGR', 'HSV' or 'RGB').
+
+    Decoded arrays are kept in an in-process LRU bounded by IMAGE_CACHE_MAX_BYTES (app config), in front of
+    the disk tier of original bytes, so repeated requests on the same image skip both the download and the decode.
+    The arrays are shared between requests and therefore read-only, copy before modifying one.
+    """
+    array = peek_decoded_image(public_id, image_url, colorspace)
+    if array is not None:
+        return array
+
+    key = (public_id, image_url, colorspace)
+    if colorspace == 'BGR':
+        array = decode_image(get_image_bytes(public_id, image_url))
+    else:
+        array = cv2.cvtColor(get_decoded_image(public_id, image_url, 'BGR'), COLORSPACES[colorspace])
+    array.flags.writeable = False
+    store_decoded(key, array)
+    return array
@@ -1,19 +1,27 @@
 import io
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import cloudinary
-import cloudinary.api
-from cloudinary.uploader import upload, destroy
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 from Models.image_model import Image
 from Models.dbModel import db 
-import requests
+from Controller.paginationController import keyset_paginate
+from Controller.dataVersionController import mark_table_changed
+from Controller.storageController import get_storage
+from Controller.imageCacheController import get_decoded_image
+from Controller.colorHistogramController import get_color_histograms
+from Controller.featureIndexController import find_duplicates, index_image_features, try_extract_features
+from Controller.imageVariantController import get_or_create_variant, get_variant_bytes, normalize_variant_params
+from Controller.chartCacheController import cached_artifact
+from Controller.plottingController import CHART_FORMATS, encode_series, render_lines, validate_chart_format
 import cv2
 import numpy as np
 from io import BytesIO
 from PIL import Image as PILImage
-import matplotlib.pyplot as plt
-from flask import Response
+from flask import Response, current_app
+from sqlalchemy import insert
 
 
 load_dotenv()
@@ -23,62 +31,164 @@ cloudinary.config(
     cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"), 
     api_key=os.getenv("CLOUDINARY_API_KEY"), 
     api_secret=os.getenv("CLOUDINARY_API_SECRET"), 
-    secure=True
+    secure=True,
+    # Base URL of the upload API, point it at a local stand-in server to run uploads offline
+    upload_prefix=os.getenv("CLOUDINARY_UPLOAD_PREFIX")
 )
 
 
-def upload_image_to_cloudinary(file):
+def upload_image_to_cloudinary(file, reject_duplicates=False):
     """
-    Upload a single image to Cloudinary and save its details to the database.
+    Upload a single image to the image storage backend (Cloudinary by default) and save its details to the database.
+    The perceptual hash and color vector of the image are added to the feature index of /images/similar, and indexed
+    images whose hash is within IMAGE_DUPLICATE_MAX_DISTANCE bits are reported as duplicates.
 
     Input: 
         file (FileStorage): The image file to upload.
+        reject_duplicates (bool, optional): Do not upload an image that has duplicates.
     Output: 
-        dict: Success message with image URL, or an error message.
-        int: HTTP status code.
+        dict: Success message with image URL and the duplicates found, or an error message.
+        int: HTTP status code, 409 for a rejected duplicate.
     """
     try:
         filename = secure_filename(file.filename)
-        upload_result = cloudinary.uploader.upload(file)
-        image_url = upload_result['secure_url']
-        public_id = upload_result['public_id']
+        content = file.read()
+        features = try_extract_features(content)
+        duplicates = find_duplicates(features)
+        if duplicates and reject_duplicates:
+            return {'error': 'The image is a duplicate of an uploaded image', 'duplicates': duplicates}, 409
+
+        upload_result = get_storage().put(content, filename)
+        image_url = upload_result['url']
+        public_id = upload_result['key']
 
         image = Image(filename=filename, url=image_url, public_id=public_id)
         db.session.add(image)
         db.session.commit()
 
-        return {'message': 'Image uploaded successfully', 'image_url': image_url}, 200
+        result = {'message': 'Image uploaded successfully', 'image_url': image_url, 'image_id': image.id,
+                  'duplicates': duplicates}
+        try:
+            index_image_features([(image.id, features)])
+        except Exception as e:
+            result['feature_index_error'] = str(e)
+        return result, 200
     except Exception as e:
         db.session.rollback()
         return {'error': str(e)}, 500
 
-def upload_images_to_cloudinary(files):
+def upload_one_image(storage, filename, content, reject_duplicates=False):
+    """
+    Extracts the features of one file, checks them for duplicates, uploads the bytes and times it.
+    Runs in a worker thread of the batch uploader, with the app context of the request.
     """
-    Upload multiple images to Cloudinary and save their details to the database.
+    start = time.perf_counter()
+    try:
+        features = try_extract_features(content)
+        duplicates = find_duplicates(features)
+        if duplicates and reject_duplicates:
+            return {
+                'filename': filename,
+                'status': 'duplicate',
+                'duplicates': duplicates,
+                'elapsed_seconds': round(time.perf_counter() - start, 3)
+            }
+
+        upload_result = storage.put(content, filename)
+        return {
+            'filename': filename,
+            'status': 'uploaded',
+            'image_url': upload_result['url'],
+            'public_id': upload_result['key'],
+            'duplicates': duplicates,
+            'features': features,
+            'elapsed_seconds': round(time.perf_counter() - start, 3)
+        }
+    except Exception as e:
+        return {
+            'filename': filename,
+            'status': 'failed',
+            'error': str(e),
+            'elapsed_seconds': round(time.perf_counter() - start, 3)
+        }
+
+def upload_images_to_cloudinary(files, storage=None, concurrency=None, reject_duplicates=False):
+    """
+    Upload multiple images to the image storage backend in parallel and save their details to the database.
+
+    The uploads run on a thread pool of at most IMAGE_UPLOAD_CONCURRENCY workers (app config).
+    The Image rows of every successful upload are written with one bulk insert at the end, and their features
+    are added to the feature index. Duplicates are checked against the images indexed before the batch.
 
     Input:
         files (list): List of FileStorage objects representing the images.
+        storage (StorageBackend, optional): Store receiving the files, defaults to the configured backend.
+            A local stand-in can be injected for tests.
+        concurrency (int, optional): Maximum number of parallel uploads.
+        reject_duplicates (bool, optional): Skip the files that have duplicates.
     Output:
-        dict: Success message with details of uploaded images, or an error message.
-        int: HTTP status code.
+        dict: Per-file results (uploaded with its duplicates, duplicate, or failed with its error), counts and timing.
+        int: HTTP status code, 200 when every file was uploaded or skipped as a duplicate, 207 on partial failure,
+        502 when every upload failed.
     """
-    uploaded_images = []
-    try:
-        for file in files:
-            filename = secure_filename(file.filename)
-            upload_result = cloudinary.uploader.upload(file)
-            image_url = upload_result['secure_url']
-            public_id = upload_result['public_id']
-
-            image = Image(filename=filename, url=image_url, public_id=public_id)
-            db.session.add(image)
-            uploaded_images.append({'filename': filename, 'image_url': image_url, 'public_id': public_id})
-
-        db.session.commit()
-        return {'message': 'Images uploaded successfully', 'uploaded_images': uploaded_images}, 200
-    except Exception as e:
-        db.session.rollback()
-        return {'error': str(e)}, 500
+    storage = storage or get_storage()
+    concurrency = concurrency or current_app.config.get('IMAGE_UPLOAD_CONCURRENCY', 8)
+    # Read the request files here, FileStorage streams are not shared with the worker threads
+    contents = [(secure_filename(file.filename), file.read()) for file in files]
+
+    app = current_app._get_current_object()
+
+    def upload(item):
+        with app.app_context():
+            return upload_one_image(storage, *item, reject_duplicates=reject_duplicates)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(contents)))) as executor:
+        results = list(executor.map(upload, contents))
+    upload_seconds = round(time.perf_counter() - start, 3)
+
+    uploaded = [result for result in results if result['status'] == 'uploaded']
+    features = {result['public_id']: result.pop('features') for result in uploaded}
+    skipped = sum(result['status'] == 'duplicate' for result in results)
+    summary = {
+        'uploaded': len(uploaded),
+        'duplicates': skipped,
+        'failed': len(results) - len(uploaded) - skipped,
+        'upload_seconds': upload_seconds,
+        'results': results
+    }
+
+    if uploaded:
+        try:
+            db.session.execute(insert(Image), [
+                {'filename': result['filename'], 'url': result['image_url'], 'public_id': result['public_id']}
+                for result in uploaded
+            ])
+            mark_table_changed(db.session, Image.__tablename__)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            summary['error'] = f'Images were uploaded but could not be saved: {str(e)}'
+            return summary, 500
+
+        try:
+            rows = Image.query.with_entities(Image.id, Image.public_id).filter(Image.public_id.in_(features)).all()
+            index_image_features([(row.id, features[row.public_id]) for row in rows])
+        except Exception as e:
+            summary['feature_index_error'] = str(e)
+
+    summary['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+    if not uploaded and not skipped:
+        summary['message'] = 'No image could be uploaded'
+        return summary, 502
+    if summary['failed']:
+        summary['message'] = f"{summary['uploaded']} of {len(results)} images uploaded successfully"
+        return summary, 207
+    if skipped:
+        summary['message'] = f"{summary['uploaded']} images uploaded, {skipped} duplicates skipped"
+        return summary, 200
+    summary['message'] = 'Images uploaded successfully'
+    return summary, 200
 
 def fetch_image_from_db(db_id):
     """
@@ -93,22 +203,31 @@ def fetch_image_from_db(db_id):
     try:
         image = Image.query.get(db_id)
         if image:
-            return {'filename': image.filename, 'url': image.url}, 200
+            return {'filename': image.filename, 'url': image.url, 'public_id': image.public_id}, 200
         else:
             return {'error': 'Image not found in database'}, 404
     except Exception as e:
         return {'error': str(e)}, 500
 
-def fetch_images_with_pagination(page, per_page):
+def fetch_images_with_pagination(page, per_page, after=None, limit=None, with_total=False):
     """
     Fetch paginated images from the database.
+    When a cursor ('after') or a 'limit' is given, keyset pagination on the id is used instead of page/per_page.
 
     Input:
         page (int): Current page number.
         per_page (int): Number of images per page.
+        after (str, optional): Cursor returned as next_cursor by the previous page.
+        limit (int, optional): Number of images per page in keyset mode.
+        with_total (bool, optional): Include the (cached) total count in keyset mode.
     Output:
         dict: Paginated image details or an error message.
     """
+    if after is not None or limit is not None:
+        result = keyset_paginate(Image.query, Image.id, after, limit, with_total)
+        result['images'] = [image.to_dict() for image in result.pop('items')]
+        return result
+
     try:
         images = Image.query.paginate(page=page, per_page=per_page, error_out=False)
         return {
@@ -120,61 +239,64 @@ def fetch_images_with_pagination(page, per_page):
     except Exception as e:
         raise Exception(f"Error fetching images: {str(e)}")
 
-def fetch_image_from_url(image_url):
+def fetch_image(public_id, image_url=None, colorspace='BGR'):
     """
-    Fetch an image from a given URL and return it as a NumPy array.
+    Read an image through the decoded image cache and return it as a NumPy array.
 
     Input:
-        image_url (str): URL of the image to fetch.
+        public_id (str): Storage key of the image.
+        image_url (str, optional): Current URL of the image, it versions the cache entries.
+        colorspace (str, optional): 'BGR' (default), 'HSV' or 'RGB'.
     Output:
-        numpy.ndarray: Image as an array or None on failure.
+        numpy.ndarray: Read-only image array or None on failure.
     """
     try:
-        response = requests.get(image_url)
-        img = PILImage.open(BytesIO(response.content))
-        img = np.array(img)
-        return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)  # Convert RGB to BGR for OpenCV
+        return get_decoded_image(public_id, image_url, colorspace)
     except Exception:
         return None
 
-def generate_color_histogram(db_id):
+def render_color_histogram(image, chart_format='png'):
+    """
+    Renders the per channel color histogram of a stored image as PNG or SVG bytes,
+    or returns the 256 counts of every channel as JSON for the json format.
+    The counts are computed once and stored with the image.
+    """
+    try:
+        histograms, _ = get_color_histograms(image, 256, ['rgb'])
+    except Exception:
+        db.session.rollback()
+        return {'error': 'Image could not be retrieved from the URL'}, 404
+
+    channels = histograms['rgb']['channels']
+    if chart_format == 'json':
+        return encode_series({'bins': 256, 'channels': channels})
+
+    series = [{'y': channels[col], 'color': col, 'label': f'{col.upper()} channel'} for col in ('r', 'g', 'b')]
+    return render_lines(series, 'Color Histogram', 'Pixel Intensity', 'Frequency', image_format=chart_format)
+
+def generate_color_histogram(db_id, chart_format='png'):
     """
     Generate a color histogram for an image in the database.
+    The chart is cached per image id, URL (a new upload changes the URL) and format and served with an ETag.
 
     Input:
         db_id (int): The ID of the image in the database.
+        chart_format (str): 'png', 'svg', or 'json' for the channel counts without rendering.
     Output:
-        Response: Graph image as a PNG response or an error message.
+        Response: Graph image or channel counts, or an error message.
     """
     try:
-        image_data, status_code = fetch_image_from_db(db_id)
-        if status_code != 200:
+        error = validate_chart_format(chart_format)
+        if error:
+            return error
+
+        image = Image.query.get(db_id)
+        if not image:
             return {'error': 'Image not found'}, 404
 
-        image_url = image_data['url']
-        image = fetch_image_from_url(image_url)
-        if image is None:
-            return {'error': 'Image could not be retrieved from the URL'}, 404
-
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        color_channels = ('r', 'g', 'b')
-
-        plt.figure(figsize=(10, 6))
-        for i, col in enumerate(color_channels):
-            hist = cv2.calcHist([image], [i], None, [256], [0, 256])
-            plt.plot(hist, color=col, label=f'{col.upper()} channel')
-        
-        plt.title('Color Histogram')
-        plt.xlabel('Pixel Intensity')
-        plt.ylabel('Frequency')
-        plt.legend()
-
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png')
-        buffer.seek(0)
-        plt.close()
-
-        return Response(buffer, mimetype='image/png')
+        return cached_artifact(['color_histogram', db_id, image.url, chart_format],
+                               lambda: render_color_histogram(image, chart_format),
+                               mimetype=CHART_FORMATS[chart_format])
     except Exception as e:
         return {'error': str(e)}, 500
 
@@ -199,11 +321,11 @@ def generate_segmentation_mask(db_id, lower_bound, upper_bound):
         return image_data  
 
     image_url = image_data['url']  
-    image = fetch_image_from_url(image_url)
-    if image is None:
+    image = fetch_image(image_data['public_id'], image_url)
+    hsv_image = fetch_image(image_data['public_id'], image_url, 'HSV')
+    if image is None or hsv_image is None:
         return {'error': 'Image could not be retrieved from the URL'}, 404
 
-    hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
     mask = cv2.inRange(hsv_image, np.array(lower_bound), np.array(upper_bound))
     segmented_image = cv2.bitwise_and(image, image, mask=mask)
 
@@ -215,54 +337,42 @@ def generate_segmentation_mask(db_id, lower_bound, upper_bound):
 def transform_image(image_id, width, height, format_type=None):
     """
     Transform an image by resizing it to the specified dimensions and optionally converting its format.
-    The transformed image is uploaded back to Cloudinary, and its URL is updated in the database.
+    The result is stored as a derived variant of the image, the original is left untouched and
+    an identical request returns the stored variant without processing the image again.
 
     Input:
         image_id (int): ID of the image record in the database.
         width (int): New width for the image.
         height (int): New height for the image.
-        format_type (str, optional): Target image format (e.g., 'JPEG', 'PNG'). Defaults to None.
+        format_type (str, optional): Target image format (e.g., 'JPEG', 'PNG'). Defaults to the format of the original.
 
     Output:
-        dict: Success message with the new image URL, or an error message with a status code.
+        dict: Success message with the variant URL and details, or an error message with a status code.
     """
     try:
         image = Image.query.get(image_id)
         if not image:
             return {'error': 'Image not found'}, 404
 
-        image_url = image.url
-        image_file = BytesIO(requests.get(image_url).content)
-        img = PILImage.open(image_file)
-        img = img.resize((width, height))
+        params = normalize_variant_params(width, height, format_type=format_type)
+        variant, _ = get_or_create_variant(image, params)
 
-        if format_type:
-            format_type = format_type.upper()
-            if format_type == 'JPG':
-                format_type = 'JPEG'
-            img_format = format_type
-        else:
-            img_format = img.format if img.format else 'PNG'
-
-        new_image_stream = BytesIO()
-        img.save(new_image_stream, format=img_format)
-        new_image_stream.seek(0)
-
-        upload_result = upload(new_image_stream, public_id=image.public_id, overwrite=True)
-        new_url = upload_result['secure_url']
-
-        image.url = new_url
-        db.session.commit()
-
-        return {'message': 'Image resized and transformed successfully', 'image_url': new_url}, 200
+        return {
+            'message': 'Image resized and transformed successfully',
+            'image_url': variant.url,
+            'variant': variant.to_dict()
+        }, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
     except Exception as e:
+        db.session.rollback()
         return {'error': str(e)}, 500
 
 
 def crop_image(image_id, x, y, width, height):
     """
-    Crop an image to the specified dimensions and upload the cropped result to Cloudinary.
-    The image URL in the database is updated after the crop.
+    Crop an image to the specified dimensions.
+    The cropped image is stored as a derived variant of the image, the original is left untouched.
 
     Input:
         image_id (int): ID of the image record in the database.
@@ -272,35 +382,78 @@ def crop_image(image_id, x, y, width, height):
         height (int): Height of the crop box.
 
     Output:
-        dict: Success message with the new image URL, or an error message with a status code.
+        dict: Success message with the variant URL and details, or an error message with a status code.
     """
     try:
         image = Image.query.get(image_id)
         if not image:
             return {'error': 'Image not found'}, 404
 
-        image_data = cloudinary.api.resource(image.public_id)
-        image_url = image_data['secure_url']
+        params = normalize_variant_params(crop=[x, y, width, height])
+        variant, _ = get_or_create_variant(image, params)
 
-        image_file = BytesIO(requests.get(image_url).content)
-        img = PILImage.open(image_file)
+        return {
+            'message': 'Image cropped successfully',
+            'image_url': variant.url,
+            'variant': variant.to_dict()
+        }, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 500
 
-        image_width, image_height = img.size
-        if x + width > image_width or y + height > image_height:
-            return {'error': "Crop area exceeds image bounds"}, 400
 
-        cropped_image = img.crop((x, y, x + width, y + height))
+def render_image(image_id, width=None, height=None, crop=None, format_type=None):
+    """
+    Render a variant of an image on the fly: crop, then resize, then convert.
+    Variants are created once and then served from the image store and the artifact cache, with an ETag.
 
-        new_image_stream = BytesIO()
-        cropped_image.save(new_image_stream, format=img.format)
-        new_image_stream.seek(0)
+    Input:
+        image_id (int): ID of the image record in the database.
+        width, height (int, optional): Output size, the aspect ratio is kept when only one is given.
+        crop (str, optional): Crop box "x,y,w,h".
+        format_type (str, optional): Output format, defaults to the format of the original.
 
-        upload_result = upload(new_image_stream, public_id=image.public_id, overwrite=True)
-        new_url = upload_result['secure_url']
+    Output:
+        Response: The variant bytes or a 304 response, or an error message with a status code.
+    """
+    try:
+        image = Image.query.get(image_id)
+        if not image:
+            return {'error': 'Image not found'}, 404
 
-        image.url = new_url
-        db.session.commit()
+        params = normalize_variant_params(width, height, crop, format_type)
+        variant, content = get_or_create_variant(image, params)
+
+        return cached_artifact(['image_variant', variant.params_hash, variant.storage_key],
+                               lambda: content or get_variant_bytes(variant),
+                               mimetype=PILImage.MIME.get(variant.format, 'application/octet-stream'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 500
+
+
+def serve_stored_file(key):
+    """
+    Serve the bytes of a stored image, the URLs of the local storage backend point here.
 
-        return {'message': 'Image cropped successfully', 'image_url': new_url}, 200
+    Input:
+        key (str): Storage key of the image.
+    Output:
+        Response: The image bytes, or an error message with a status code.
+    """
+    try:
+        try:
+            content = get_storage().get(key)
+        except FileNotFoundError:
+            return {'error': 'Image not found in storage'}, 404
+        # Keys do not reliably carry the format (variant keys have no extension), read it from the bytes
+        mimetype = PILImage.MIME.get(PILImage.open(BytesIO(content)).format, 'application/octet-stream')
+        return Response(content, mimetype=mimetype)
+    except ValueError as e:
+        return {'error': str(e)}, 400
     except Exception as e:
         return {'error': str(e)}, 500
@@ -0,0 +1,177 @@
+import hashlib
+import json
+from io import BytesIO
+from flask import current_app
+from PIL import Image as PILImage
+from sqlalchemy.exc import IntegrityError
+from Models.dbModel import db
+from Models.image_model import ImageVariant
+from Controller.storageController import get_storage
+from Controller.imageCacheController import get_image_bytes
+
+DEFAULT_MAX_SIDE = 4096
+
+# Output formats of the variants, as accepted in requests -> PIL format name
+VARIANT_FORMATS = {
+    'png': 'PNG',
+    'jpeg': 'JPEG',
+    'jpg': 'JPEG',
+    'webp': 'WEBP',
+    'gif': 'GIF',
+    'bmp': 'BMP',
+}
+
+
+def parse_crop(crop):
+    """
+    Parses a crop box given as an "x,y,w,h" string or a sequence of four integers.
+    """
+    if crop is None or crop == '':
+        return None
+    if isinstance(crop, str):
+        crop = crop.split(',')
+    try:
+        box = [int(value) for value in crop]
+    except (TypeError, ValueError):
+        raise ValueError('crop must be four integers: x,y,w,h')
+    if len(box) != 4:
+        raise ValueError('crop must be four integers: x,y,w,h')
+    return box
+
+
+def normalize_variant_params(width=None, height=None, crop=None, format_type=None):
+    """
+    Validates the parameters of a variant and puts them into their canonical form.
+
+    Input:
+        width, height (int, optional): Output size. When only one is given the other keeps the aspect ratio.
+        crop (str or list, optional): Crop box "x,y,w,h" applied before the resize.
+        format_type (str, optional): Output format, defaults to the format of the original.
+    Output:
+        dict: {'w', 'h', 'crop', 'fmt'}, absent parameters are None. Raises ValueError for invalid parameters.
+    """
+    max_side = current_app.config.get('IMAGE_VARIANT_MAX_SIDE', DEFAULT_MAX_SIDE)
+    params = {'w': None, 'h': None, 'crop': parse_crop(crop), 'fmt': None}
+
+    for name, value in (('w', width), ('h', height)):
+        if value is None or value == '':
+            continue
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be an integer')
+        if not 0 < value <= max_side:
+            raise ValueError(f'{name} must be between 1 and {max_side}')
+        params[name] = value
+
+    if params['crop']:
+        x, y, crop_width, crop_height = params['crop']
+        if x < 0 or y < 0 or crop_width <= 0 or crop_height <= 0:
+            raise ValueError('crop must have a non-negative origin and a positive size')
+
+    if format_type:
+        fmt = VARIANT_FORMATS.get(str(format_type).lower())
+        if fmt is None:
+            raise ValueError(f"Unsupported format: {format_type}, expected one of {', '.join(VARIANT_FORMATS)}")
+        params['fmt'] = fmt
+
+    if params['w'] is None and params['h'] is None and params['crop'] is None and params['fmt'] is None:
+        raise ValueError('At least one of w, h, crop or fmt is required')
+    return params
+
+
+def variant_hash(image, params):
+    """
+    Identifies a variant by the version of its original (the URL changes with every new upload) and its parameters.
+    """
+    payload = json.dumps({'source': image.url, **params}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_variant(content, params):
+    """
+    Applies the crop, then the resize, then the format conversion of a variant to the original bytes.
+
+    Output:
+        tuple: Encoded bytes, PIL format name, width and height. Raises ValueError when the crop
+        box exceeds the image bounds.
+    """
+    img = PILImage.open(BytesIO(content))
+    img_format = params['fmt'] or img.format or 'PNG'
+
+    if params['crop']:
+        x, y, width, height = params['crop']
+        if x + width > img.width or y + height > img.height:
+            raise ValueError('Crop area exceeds image bounds')
+        img = img.crop((x, y, x + width, y + height))
+
+    if params['w'] or params['h']:
+        width = params['w'] or max(1, round(img.width * params['h'] / img.height))
+        height = params['h'] or max(1, round(img.height * params['w'] / img.width))
+        img = img.resize((width, height))
+
+    if img_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    stream = BytesIO()
+    img.save(stream, format=img_format)
+    return stream.getvalue(), img_format, img.width, img.height
+
+
+def get_or_create_variant(image, params):
+    """
+    Returns the variant of an image for normalized parameters, rendering and storing it on the first request only.
+
+    The variant is stored under a content-addressed key of the image store (identical outputs share one object)
+    and recorded with a unique (image_id, params_hash), so the original is never touched and a repeated request
+    is a single indexed lookup. Two requests racing on a new variant both render it, the second insert loses on
+    the unique constraint and the stored row is returned.
+
+    Input:
+        image (Image): The original image.
+        params (dict): Parameters returned by normalize_variant_params.
+    Output:
+        tuple: The ImageVariant and its bytes when they were just rendered (None for a cached variant).
+    """
+    params_hash = variant_hash(image, params)
+    variant = ImageVariant.query.filter_by(image_id=image.id, params_hash=params_hash).first()
+    if variant:
+        return variant, None
+
+    content, img_format, width, height = render_variant(get_image_bytes(image.public_id, image.url), params)
+    return store_variant(image, params_hash, params, content, img_format, width, height), content
+
+
+def store_variant(image, params_hash, params, content, img_format, width, height):
+    """
+    Stores rendered variant bytes under their content-addressed key and records the variant of the image.
+    Returns the stored row when a concurrent request recorded the same variant first.
+    """
+    storage_key = f'variant_{hashlib.sha256(content).hexdigest()[:32]}'
+    stored = get_storage().put(content, key=storage_key)
+
+    variant = ImageVariant(
+        image_id=image.id,
+        params_hash=params_hash,
+        params=json.dumps(params, sort_keys=True, separators=(',', ':')),
+        storage_key=stored['key'],
+        url=stored['url'],
+        format=img_format,
+        width=width,
+        height=height,
+        size=stored['size']
+    )
+    db.session.add(variant)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        variant = ImageVariant.query.filter_by(image_id=image.id, params_hash=params_hash).one()
+    return variant
+
+
+def get_variant_bytes(variant):
+    """
+    Returns the bytes of a stored variant, through the disk tier of the image cache for remote stores.
+    """
+    return get_image_bytes(variant.storage_key, variant.url)
@@ -0,0 +1,90 @@
+"""
+Entry points of the image pipeline worker processes.
+
+Workers are started by a fork server that only preloads this module, which must never import the Flask app.
+Its functions only depend on their arguments, they never touch the database or the image stores.
+"""
+import time
+import cv2
+import numpy as np
+from Controller.sharedBufferController import BufferHandle, attach_buffer
+from Controller.colorHistogramController import compute_color_histograms
+
+
+def load_source(source):
+    """
+    Turns what image_source() sent into a BGR array inside the worker.
+    """
+    if isinstance(source, BufferHandle):
+        # Read-only view of the pages shared by the web process
+        return np.asarray(attach_buffer(source))
+    image = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError('Image could not be decoded')
+    return image
+
+
+def run_pipeline(source, steps, extension):
+    """
+    Runs a pipeline on one image. Executed in the worker processes, it only depends on its arguments.
+
+    Input:
+        source (bytes or BufferHandle): Encoded original image, or the handle of its decoded BGR
+            array in a shared buffer, mapped without copying.
+        steps (list[dict]): Canonical steps from normalize_operations.
+        extension (str): OpenCV encoder extension of the output image.
+    Output:
+        dict: 'width' and 'height' of the result, the 'histograms' recorded along the way, and the
+        encoded result as 'content' (None when no step changed the image).
+    """
+    start = time.perf_counter()
+    # The array may be a read-only shared buffer, every step below creates new arrays
+    image = load_source(source)
+
+    histograms = []
+    changed = False
+    for step in steps:
+        op = step['op']
+        if op == 'resize':
+            height, width = image.shape[:2]
+            new_width = step['width'] or max(1, round(width * step['height'] / height))
+            new_height = step['height'] or max(1, round(height * step['width'] / width))
+            image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+            changed = True
+        elif op == 'crop':
+            x, y, width, height = step['x'], step['y'], step['width'], step['height']
+            if x + width > image.shape[1] or y + height > image.shape[0]:
+                raise ValueError('Crop area exceeds image bounds')
+            image = image[y:y + height, x:x + width]
+            changed = True
+        elif op == 'segment':
+            hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            mask = cv2.inRange(hsv_image, np.array(step['lower_bound']), np.array(step['upper_bound']))
+            image = cv2.bitwise_and(image, image, mask=mask)
+            changed = True
+        elif op == 'histogram':
+            histograms.append({
+                'bins': step['bins'],
+                'channels': compute_color_histograms(image, step['bins'])['rgb']['channels']
+            })
+
+    encoded = None
+    if changed:
+        ok, buffer = cv2.imencode(extension, image)
+        if not ok:
+            raise ValueError(f'Image could not be encoded as {extension}')
+        encoded = buffer.tobytes()
+    return {
+        'width': image.shape[1],
+        'height': image.shape[0],
+        'histograms': histograms,
+        'content': encoded,
+        'elapsed_seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def run_histograms(source, bins, colorspaces, approximate, max_pixels):
+    """
+    Computes the color histograms of one image in a worker process.
+    """
+    return compute_color_histograms(load_source(source), bins, colorspaces, approximate, max_pixels)
@@ -0,0 +1,296 @@
+import csv
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+from flask import current_app
+from sqlalchemy import func, insert, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from Models.dbModel import db
+from Controller.cleaningController import MAX_REJECTED_SAMPLE
+from Controller.dataVersionController import mark_table_changed
+from Controller.statsCacheController import record_bulk_insert, record_bulk_change
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Stay below SQLite's default limit of 32766 bound parameters per statement
+MAX_BIND_PARAMETERS = 30000
+
+
+def resolve_chunk_size(chunk_size=None):
+    """
+    Resolve the batch size used for bulk inserts.
+
+    Input: chunk_size (int, optional) requested by the caller.
+    Expected Output: A positive integer, falling back to the INGEST_CHUNK_SIZE app config.
+    """
+    if chunk_size is None:
+        chunk_size = current_app.config.get('INGEST_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    chunk_size = int(chunk_size)
+    if chunk_size <= 0:
+        raise ValueError('chunk_size must be a positive integer')
+    return chunk_size
+
+
+# tracemalloc is process-wide: concurrent ingests share one tracing session, started by the first
+# and stopped by the last of them
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+@contextmanager
+def track_ingest():
+    """
+    Measure wall time and peak Python memory of an ingestion run.
+
+    Yields a metrics dictionary that is filled in with 'elapsed_seconds' and
+    'peak_memory_mb' once the block exits. Memory tracking is off unless the INGEST_TRACK_MEMORY
+    app config is set, tracemalloc slows down every allocation of every thread while it runs.
+    When ingests overlap, the peak covers all of them.
+    """
+    global _tracing_users
+    metrics = {}
+    track_memory = current_app.config.get('INGEST_TRACK_MEMORY', False)
+    if track_memory:
+        with _tracing_lock:
+            if _tracing_users == 0:
+                if tracemalloc.is_tracing():
+                    tracemalloc.reset_peak()
+                else:
+                    tracemalloc.start()
+            _tracing_users += 1
+
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+        if track_memory:
+            with _tracing_lock:
+                _, peak = tracemalloc.get_traced_memory()
+                _tracing_users -= 1
+                if _tracing_users == 0:
+                    tracemalloc.stop()
+            metrics['peak_memory_mb'] = round(peak / (1024 * 1024), 2)
+        else:
+            metrics['peak_memory_mb'] = None
+
+
+def validate_csv_file(file):
+    """
+    Checks the name of an uploaded CSV file before anything is read from it.
+
+    Input: file (werkzeug FileStorage of the "file" form part)
+    Expected Output: None when valid, otherwise an error message with a status code.
+    """
+    if file.filename == '':
+        return {'error': 'No selected file'}, 400
+    if not file.filename.endswith('.csv'):
+        return {'error': 'Invalid file format, please upload a CSV file'}, 400
+    return None
+
+
+def bulk_insert_dataframe(model, data, columns, chunk_size=None):
+    """
+    Insert a cleaned DataFrame into the table of the given model using batched
+    Core insert() statements (executemany) instead of one ORM object per row.
+
+    Args:
+        model (db.Model): The model whose table receives the rows.
+        data (pandas.DataFrame): The cleaned data to insert.
+        columns (list[str]): DataFrame columns to write, named after the table columns.
+        chunk_size (int, optional): Number of rows sent per executemany batch.
+
+    Returns:
+        dict: Number of inserted rows and batches.
+    """
+    chunk_size = resolve_chunk_size(chunk_size)
+    table = model.__table__
+    statement = insert(table)
+
+    # Select the columns once, slicing the selection of every batch would copy the frame again each time
+    frame = data[columns]
+    rows_inserted = 0
+    batches = 0
+    for start in range(0, len(frame), chunk_size):
+        records = frame.iloc[start:start + chunk_size].to_dict('records')
+        db.session.execute(statement, records)
+        rows_inserted += len(records)
+        batches += 1
+
+    if rows_inserted:
+        mark_table_changed(db.session, table.name)
+        record_bulk_insert(db.session, table.name, frame)
+
+    return {'rows_inserted': rows_inserted, 'batches': batches}
+
+
+def dialect_insert(table):
+    """
+    Returns the dialect specific insert() construct that supports ON CONFLICT clauses.
+    Upserts are available on SQLite and PostgreSQL.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return sqlite_insert(table)
+    if dialect == 'postgresql':
+        return postgresql_insert(table)
+    raise ValueError(f'Upsert mode is not supported on the {dialect} database')
+
+
+def upsert_dataframe(model, data, columns, key_columns, chunk_size=None):
+    """
+    Insert or update a cleaned DataFrame in the table of the given model with batched
+    INSERT ... ON CONFLICT DO UPDATE statements, so re-uploading a corrected file re-syncs
+    existing rows instead of failing on the primary key.
+
+    Rows whose values are identical to the stored ones are left untouched. When a key appears
+    several times in the frame, the last occurrence wins.
+
+    Args:
+        model (db.Model): The model whose table receives the rows.
+        data (pandas.DataFrame): The cleaned data to upsert.
+        columns (list[str]): DataFrame columns to write, named after the table columns.
+        key_columns (list[str]): Columns of the unique key used to detect conflicts.
+        chunk_size (int, optional): Number of rows sent per statement.
+
+    Returns:
+        dict: Number of inserted, updated and unchanged rows, duplicate keys skipped and batches.
+    """
+    chunk_size = resolve_chunk_size(chunk_size)
+    # Every row is sent as bound parameters of one multi-row VALUES statement
+    chunk_size = max(1, min(chunk_size, MAX_BIND_PARAMETERS // len(columns)))
+    table = model.__table__
+    value_columns = [col for col in columns if col not in key_columns]
+
+    deduplicated = data.drop_duplicates(subset=key_columns, keep='last')[columns]
+    counts = {'rows_inserted': 0, 'rows_updated': 0, 'rows_unchanged': 0,
+              'duplicate_keys_skipped': len(data) - len(deduplicated), 'batches': 0}
+
+    for start in range(0, len(deduplicated), chunk_size):
+        batch = deduplicated.iloc[start:start + chunk_size]
+        records = batch.to_dict('records')
+
+        if len(key_columns) == 1:
+            key_filter = table.c[key_columns[0]].in_(batch[key_columns[0]].tolist())
+        else:
+            key_filter = tuple_(*[table.c[col] for col in key_columns]).in_(
+                list(batch[key_columns].itertuples(index=False, name=None))
+            )
+        existing = db.session.execute(select(func.count()).select_from(table).where(key_filter)).scalar()
+
+        statement = dialect_insert(table).values(records)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c[col] for col in key_columns],
+            set_={col: statement.excluded[col] for col in value_columns},
+            where=or_(*[table.c[col].is_distinct_from(statement.excluded[col]) for col in value_columns])
+        )
+        # rowcount counts inserted rows plus updated rows, rows filtered out by the WHERE clause are not counted
+        changed = db.session.execute(statement).rowcount
+
+        inserted = len(records) - existing
+        updated = changed - inserted
+        counts['rows_inserted'] += inserted
+        counts['rows_updated'] += updated
+        counts['rows_unchanged'] += existing - updated
+        counts['batches'] += 1
+
+    if counts['rows_inserted'] or counts['rows_updated']:
+        mark_table_changed(db.session, table.name)
+        record_bulk_change(db.session, table.name)
+    return counts
+
+
+def write_dataframe(model, data, columns, chunk_size=None, upsert_keys=None):
+    """
+    Write a cleaned DataFrame with plain bulk inserts, or with upserts when upsert_keys is given.
+    """
+    if upsert_keys:
+        return upsert_dataframe(model, data, columns, upsert_keys, chunk_size)
+    return bulk_insert_dataframe(model, data, columns, chunk_size)
+
+
+def throughput(rows, elapsed_seconds):
+    """
+    Compute rows per second for an ingestion run.
+    """
+    if not elapsed_seconds:
+        return None
+    return round(rows / elapsed_seconds, 1)
+
+
+def merge_rejection_report(progress, report):
+    """
+    Fold the rejected rows report of one chunk into the running progress counters.
+    """
+    sample = progress['rejected_rows_sample']
+    sample.extend(report['rejected_rows_sample'][:MAX_REJECTED_SAMPLE - len(sample)])
+    for col, count in report['rejected_by_column'].items():
+        progress['rejected_by_column'][col] = progress['rejected_by_column'].get(col, 0) + count
+
+
+def read_csv_header(stream):
+    """
+    Read and parse the header line of a CSV byte stream without touching the data rows.
+
+    Input: stream (binary file-like object positioned at the start of the CSV).
+    Expected Output: List of column names.
+    """
+    header_line = stream.readline()
+    if isinstance(header_line, bytes):
+        header_line = header_line.decode('utf-8-sig')
+    header = next(csv.reader([header_line]), [])
+    return [column.strip() for column in header]
+
+
+def stream_csv_into_table(stream, model, columns, clean_frame, chunk_size=None, on_chunk=None, upsert_keys=None):
+    """
+    Stream a CSV into the table of the given model chunk by chunk so that peak memory
+    depends on the chunk size and not on the size of the file.
+
+    The header is validated before any data row is parsed. Every chunk is cleaned,
+    bulk inserted and committed before the next one is read.
+
+    Args:
+        stream (file-like): Binary stream of the CSV (upload stream or raw request body).
+        model (db.Model): The model whose table receives the rows.
+        columns (list[str]): Required columns, written to the table columns of the same name.
+        clean_frame (callable): Takes a raw chunk DataFrame and returns the cleaned DataFrame and its rejected rows report.
+        chunk_size (int, optional): Rows parsed, cleaned and inserted per chunk.
+        on_chunk (callable, optional): Called with the progress counters after every committed chunk.
+        upsert_keys (list[str], optional): Key columns, upserts the rows instead of inserting them.
+
+    Returns:
+        tuple: Progress counters dictionary, and an error message or None.
+    """
+    chunk_size = resolve_chunk_size(chunk_size)
+    progress = {'chunks': 0, 'rows_read': 0, 'rows_inserted': 0, 'rows_dropped': 0,
+                'rejected_rows_sample': [], 'rejected_by_column': {}}
+    if upsert_keys:
+        progress.update({'rows_updated': 0, 'rows_unchanged': 0, 'duplicate_keys_skipped': 0})
+
+    header = read_csv_header(stream)
+    for col in columns:
+        if col not in header:
+            return progress, f'Missing required column: {col}'
+
+    reader = pd.read_csv(stream, header=None, names=header, chunksize=chunk_size)
+    for chunk in reader:
+        rows_read = len(chunk)
+        cleaned, report = clean_frame(chunk)
+        result = write_dataframe(model, cleaned, columns, chunk_size, upsert_keys)
+        db.session.commit()
+
+        progress['chunks'] += 1
+        progress['rows_read'] += rows_read
+        for counter in ('rows_inserted', 'rows_updated', 'rows_unchanged', 'duplicate_keys_skipped'):
+            if counter in result:
+                progress[counter] += result[counter]
+        progress['rows_dropped'] += rows_read - len(cleaned)
+        merge_rejection_report(progress, report)
+        if on_chunk:
+            on_chunk(progress)
+
+    return progress, None
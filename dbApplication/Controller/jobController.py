@@ -0,0 +1,247 @@
+import os
+import shutil
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from Models.dbModel import db
+from Models.job_model import IngestJob
+from Models.loan_models import LoanApproval
+from Models.movies_model import Movies
+from Controller.ingestionController import stream_csv_into_table
+from Controller.loan_approvalController import LOAN_CSV_COLUMNS, LOAN_KEY_COLUMNS, clean_loan_frame
+from Controller.moviesController import MOVIE_CSV_COLUMNS, clean_movie_frame
+
+JOB_UPLOAD_FOLDER = os.path.join('uploads', 'jobs')
+os.makedirs(JOB_UPLOAD_FOLDER, exist_ok=True)
+
+# Target table, required columns, cleaning stage and upsert key (None when upserts are not supported)
+# for every kind of ingestion job
+JOB_KINDS = {
+    'loans': (LoanApproval, LOAN_CSV_COLUMNS, clean_loan_frame, LOAN_KEY_COLUMNS),
+    'movies': (Movies, MOVIE_CSV_COLUMNS, clean_movie_frame, None),
+}
+
+DEFAULT_HEARTBEAT_TIMEOUT = 300
+
+# Part of the owner recorded on the jobs this process runs. It tells a restarted server apart from the
+# previous one when both got the same pid, as the main process of a container always does.
+PROCESS_TOKEN = uuid.uuid4().hex[:8]
+
+_executor = None
+
+
+def get_executor(app):
+    """
+    Returns the process-wide thread pool running ingestion jobs, creating it on first use.
+    The pool size comes from the INGEST_JOB_WORKERS app config.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=app.config.get('INGEST_JOB_WORKERS', 2),
+            thread_name_prefix='ingest-job'
+        )
+    return _executor
+
+
+def submit_ingest_job(kind, stream, filename=None, chunk_size=None, upsert=False):
+    """
+    Spools an uploaded CSV to disk, records a queued job and hands it to the background pool.
+
+    Input:
+        kind (str): 'loans' or 'movies'.
+        stream (file-like): Binary stream of the CSV (upload stream or raw request body).
+        filename (str, optional): Original name of the uploaded file.
+        chunk_size (int, optional): Rows per chunk used by the streaming ingestion.
+        upsert (bool, optional): Update rows whose key already exists instead of inserting them.
+    Output:
+        dict: The job id and its status URL, or an error message.
+        int: HTTP status code (202 when the job is queued).
+    """
+    if kind not in JOB_KINDS:
+        return {'error': f'Unsupported job kind: {kind}'}, 400
+    if filename is not None and not filename.endswith('.csv'):
+        return {'error': 'Invalid file format, please upload a CSV file'}, 400
+    if upsert and JOB_KINDS[kind][3] is None:
+        return {'error': f'Upsert mode is not supported for {kind}'}, 400
+
+    job_id = uuid.uuid4().hex
+    filepath = os.path.join(JOB_UPLOAD_FOLDER, f'{job_id}.csv')
+    try:
+        with open(filepath, 'wb') as spool:
+            shutil.copyfileobj(stream, spool, length=1024 * 1024)
+
+        job = IngestJob(id=job_id, kind=kind, status='queued', mode='upsert' if upsert else 'insert',
+                        filename=filename, filepath=filepath, chunk_size=chunk_size)
+        db.session.add(job)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return {'error': str(e)}, 500
+
+    app = current_app._get_current_object()
+    get_executor(app).submit(run_ingest_job, app, job_id)
+    return {'job_id': job_id, 'status': 'queued', 'status_url': f'/jobs/{job_id}'}, 202
+
+
+def job_owner():
+    """
+    Identifies the calling process as the owner of a job: host, pid and process token.
+    """
+    return f'{socket.gethostname()}:{os.getpid()}:{PROCESS_TOKEN}'
+
+
+def owner_is_alive(owner):
+    """
+    Whether the process that claimed a job may still be running it.
+    Only processes of this host can be checked, owners on other hosts count as alive (their heartbeat decides).
+    """
+    try:
+        host, pid, token = owner.rsplit(':', 2)
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False
+    if host != socket.gethostname():
+        return True
+    if pid == os.getpid():
+        return token == PROCESS_TOKEN
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def is_orphaned(job, timeout):
+    """
+    A running job is orphaned when its owner process is gone or has not reported progress for timeout seconds.
+    """
+    heartbeat = job.heartbeat_at or job.started_at or job.created_at
+    return not owner_is_alive(job.owner) or datetime.utcnow() - heartbeat > timedelta(seconds=timeout)
+
+
+def run_ingest_job(app, job_id):
+    """
+    Executes a queued ingestion job inside its own application context.
+    Progress counters are committed to the job row after every chunk so /jobs/<id> can report them.
+    """
+    with app.app_context():
+        now = datetime.utcnow()
+        # Claim the job in one statement: of all the threads and processes the job was handed to,
+        # only the one whose UPDATE moved it out of 'queued' runs it
+        claimed = db.session.execute(
+            update(IngestJob)
+            .where(IngestJob.id == job_id, IngestJob.status == 'queued')
+            .values(status='running', started_at=now, heartbeat_at=now, owner=job_owner())
+        ).rowcount
+        db.session.commit()
+        if claimed != 1:
+            db.session.remove()
+            return
+
+        job = db.session.get(IngestJob, job_id)
+
+        def record_progress(progress):
+            job.chunks = progress['chunks']
+            job.rows_read = progress['rows_read']
+            job.rows_inserted = progress['rows_inserted']
+            job.rows_dropped = progress['rows_dropped']
+            job.rows_updated = progress.get('rows_updated', 0)
+            job.rows_unchanged = progress.get('rows_unchanged', 0)
+            job.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+
+        model, columns, clean_frame, key_columns = JOB_KINDS[job.kind]
+        upsert_keys = key_columns if job.mode == 'upsert' else None
+        filepath = job.filepath
+        try:
+            with open(filepath, 'rb') as stream:
+                _, error = stream_csv_into_table(stream, model, columns, clean_frame, job.chunk_size,
+                                                 on_chunk=record_progress, upsert_keys=upsert_keys)
+            job.status = 'failed' if error else 'succeeded'
+            job.error = error
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            db.session.remove()
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+
+def get_job(job_id):
+    """
+    Fetch the status and progress of an ingestion job.
+
+    Input: job_id (str)
+    Output:
+        dict: Job status, row counters, throughput and error, or an error message.
+        int: HTTP status code.
+    """
+    job = db.session.get(IngestJob, job_id)
+    if job is None:
+        return {'error': 'Job not found'}, 404
+    return job.to_dict(), 200
+
+
+def recover_jobs(app, run_queued=None):
+    """
+    Picks up the jobs left behind by stopped processes: running jobs whose owner is gone (see is_orphaned)
+    are marked as failed, and queued jobs are handed to run_queued, the background pool by default.
+    Jobs still running in a live process are left alone, and a queued job handed out by several
+    processes still runs once since run_ingest_job claims it atomically.
+    Does nothing when the ingest_jobs table has not been migrated yet.
+
+    Output:
+        dict: Ids of the jobs marked as failed and of the queued jobs resubmitted.
+    """
+    timeout = app.config.get('INGEST_JOB_HEARTBEAT_TIMEOUT', DEFAULT_HEARTBEAT_TIMEOUT)
+    with app.app_context():
+        try:
+            jobs = IngestJob.query.filter(IngestJob.status.in_(['queued', 'running'])).all()
+        except OperationalError:
+            db.session.rollback()
+            return {'failed': [], 'resubmitted': []}
+
+        failed, queued = [], []
+        for job in jobs:
+            if job.status == 'queued':
+                queued.append(job.id)
+            elif is_orphaned(job, timeout):
+                job.status = 'failed'
+                job.error = 'Interrupted by a server restart'
+                job.finished_at = datetime.utcnow()
+                failed.append(job.id)
+        db.session.commit()
+        db.session.remove()
+
+    if run_queued is None:
+        def run_queued(job_id):
+            get_executor(app).submit(run_ingest_job, app, job_id)
+    for job_id in queued:
+        run_queued(job_id)
+    return {'failed': failed, 'resubmitted': queued}
+
+
+@click.command('recover-jobs')
+@with_appcontext
+def recover_jobs_command():
+    """
+    Fail the ingestion jobs orphaned by a stopped server and run the queued ones.
+    """
+    app = current_app._get_current_object()
+    result = recover_jobs(app, run_queued=lambda job_id: run_ingest_job(app, job_id))
+    click.echo(f"{len(result['failed'])} orphaned jobs marked as failed, {len(result['resubmitted'])} queued jobs run")
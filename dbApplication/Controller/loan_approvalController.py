@@ -1,63 +1,131 @@
-from flask import Response, request, jsonify
+from flask import Response, request, jsonify, current_app
 import pandas as pd
 import os
 from Models.loan_models import LoanApproval
 from Models.dbModel import db
-from sqlalchemy import func, or_, and_
+from sqlalchemy import func, or_, and_, cast, true, Integer
+import math
+import json
 import numpy as np
-from scipy import stats
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import io
 import base64
+from Controller.cleaningController import LOAN_SCHEMA, clean_frame
+from Controller.queryPlanController import explain_query
+from Controller.paginationController import keyset_paginate
+from Controller.exportController import stream_export
+from Controller.statsCacheController import approximate_stats, get_cached_stats, store_cached_stats
+from Controller.dataVersionController import get_table_version, get_version_stamp
+from Controller.chartCacheController import cached_artifact
+from Controller.plottingController import (CHART_FORMATS, encode_series, render_category_counts, render_category_steps,
+                                           render_histogram, render_lines, validate_chart_format)
+from Controller.histogramController import DEFAULT_BINS, MAX_BINS, compute_histogram
+from Controller.downsamplingController import DEFAULT_MAX_POINTS, sample_sorted_column
+from Controller.ingestionController import validate_csv_file, write_dataframe, stream_csv_into_table, track_ingest, throughput
 
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def upload_csv(file):
+LOAN_CSV_COLUMNS = list(LOAN_SCHEMA)
+LOAN_KEY_COLUMNS = ['loan_id']
+NUMERIC_COLUMNS = ['income', 'loan_amount', 'credit_score', 'asset_value']
+AGGREGATE_TYPES = ['sum', 'avg', 'min', 'max', 'count', 'stddev']
+HISTOGRAM_COLUMNS = ['loan_id'] + NUMERIC_COLUMNS
+# Charted by counting every distinct value instead of binning
+CATEGORICAL_COLUMNS = ['loan_status']
+
+def clean_loan_frame(data):
     """
-    Uploads a CSV file to the server, validates its content, processes the data using pandas, and inserts the records into the database using SQLAlchemy and pandas.
-    
-    Input: file (CSV file)
-    Expected Output: JSON response with a success message or error details.
+    Strips string columns, rounds the numeric loan columns, coerces every column to its dtype
+    and rejects rows that are missing a value or fail the coercion.
+
+    Input: data (pandas DataFrame read from a loan CSV)
+    Expected Output: Cleaned DataFrame ready to be inserted and the rejected rows report.
     """
-    if file.filename == '':
-        return {'error': 'No selected file'}, 400
+    float_columns = ['income', 'loan_amount', 'credit_score', 'asset_value']
+    return clean_frame(data, LOAN_SCHEMA, round_columns=float_columns)
 
-    if not file.filename.endswith('.csv'):
-        return {'error': 'Invalid file format, please upload a CSV file'}, 400
+def upload_message(counts):
+    """
+    Builds the summary message of a loan upload from its insert (and upsert) counters.
+    """
+    if 'rows_updated' in counts:
+        return (f'{counts["rows_inserted"]} loans added, {counts["rows_updated"]} updated and '
+                f'{counts["rows_unchanged"]} unchanged')
+    return f'{counts["rows_inserted"]} loans successfully added to the database'
+
+def upload_csv(file, chunk_size=None, upsert=False):
+    """
+    Uploads a CSV file to the server, validates its content, processes the data using pandas, and inserts the records
+    into the database with batched Core insert statements.
+    In upsert mode existing loans (matched on loan_id) are updated instead of failing on the primary key.
+    
+    Input: file (CSV file), chunk_size (integer, optional, rows per insert batch), upsert (boolean, optional)
+    Expected Output: JSON response with a success message and ingestion metrics (rows/sec, peak memory) or error details.
+    """
+    error = validate_csv_file(file)
+    if error:
+        return error
 
     filepath = os.path.join(UPLOAD_FOLDER, file.filename)
     file.save(filepath)
 
     try:
-        data = pd.read_csv(filepath)
-        required_columns = ['loan_id', 'income', 'loan_amount', 'credit_score', 'loan_status', 'asset_value']
-        for col in required_columns:
-            if col not in data.columns:
-                return {'error': f'Missing required column: {col}'}, 400
-
-        data = data.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        data.dropna(subset=required_columns, inplace=True)
-        float_columns = ['income', 'loan_amount', 'credit_score', 'asset_value']
-        data[float_columns] = data[float_columns].round(1)
-
-        for _, row in data.iterrows():
-            new_loan = LoanApproval(
-                loan_id=row['loan_id'],
-                income=row['income'],
-                loan_amount=row['loan_amount'],
-                credit_score=row['credit_score'],
-                loan_status=row['loan_status'],
-                asset_value=row['asset_value']
-            )
-            db.session.add(new_loan)
-
-        db.session.commit()
-        return {'message': f'{len(data)} loans successfully added to the database'}, 201
+        with track_ingest() as metrics:
+            data = pd.read_csv(filepath)
+            for col in LOAN_CSV_COLUMNS:
+                if col not in data.columns:
+                    return {'error': f'Missing required column: {col}'}, 400
 
+            data, report = clean_loan_frame(data)
+            result = write_dataframe(LoanApproval, data, LOAN_CSV_COLUMNS, chunk_size,
+                                     LOAN_KEY_COLUMNS if upsert else None)
+            db.session.commit()
+
+        return {
+            'message': upload_message(result),
+            **result,
+            **report,
+            'elapsed_seconds': metrics['elapsed_seconds'],
+            'rows_per_sec': throughput(len(data), metrics['elapsed_seconds']),
+            'peak_memory_mb': metrics['peak_memory_mb']
+        }, 201
+
+    except ValueError as e:
+        db.session.rollback()
+        return {'error': str(e)}, 400
     except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 500
+
+def upload_csv_stream(stream, chunk_size=None, upsert=False):
+    """
+    Streams a loan CSV into the database chunk by chunk without saving it to disk or loading it whole.
+    The header is validated first, then every chunk is cleaned, bulk inserted (or upserted) and committed.
+
+    Input: stream (binary file-like object with the CSV content), chunk_size (integer, optional, rows per chunk),
+           upsert (boolean, optional)
+    Expected Output: JSON response with progress counters and ingestion metrics, or error details.
+    """
+    try:
+        with track_ingest() as metrics:
+            progress, error = stream_csv_into_table(stream, LoanApproval, LOAN_CSV_COLUMNS, clean_loan_frame, chunk_size,
+                                                    upsert_keys=LOAN_KEY_COLUMNS if upsert else None)
+        if error:
+            return {'error': error, **progress}, 400
+
+        return {
+            'message': upload_message(progress),
+            **progress,
+            'elapsed_seconds': metrics['elapsed_seconds'],
+            'rows_per_sec': throughput(progress['rows_read'] - progress['rows_dropped'], metrics['elapsed_seconds']),
+            'peak_memory_mb': metrics['peak_memory_mb']
+        }, 201
+
+    except ValueError as e:
+        db.session.rollback()
+        return {'error': str(e)}, 400
+    except Exception as e:
+        db.session.rollback()
         return {'error': str(e)}, 500
 
 def create_loan(data):
@@ -84,12 +152,20 @@ def create_loan(data):
 
     return {'message': 'Loan approval created', 'loan_id': new_loan.loan_id}, 201
 
-def get_all_loans(page, per_page=20):
+def get_all_loans(page, per_page=20, after=None, limit=None, with_total=False):
     """
     Retrieves a paginated list of all loan approvals from the database using SQLAlchemy.
-    Input: page (integer), per_page (integer, optional, default 20)
-    Expected Output: JSON response with loan details and pagination metadata.
+    When a cursor ('after') or a 'limit' is given, keyset pagination on loan_id is used instead of page/per_page:
+    no OFFSET and no COUNT(*) unless with_total is set (the count is then cached).
+    Input: page (integer), per_page (integer, optional, default 20), after (string, optional, cursor),
+           limit (integer, optional), with_total (boolean, optional)
+    Expected Output: JSON response with loan details and pagination metadata. Raises ValueError for an invalid cursor.
     """
+    if after is not None or limit is not None:
+        result = keyset_paginate(LoanApproval.query, LoanApproval.loan_id, after, limit, with_total)
+        result['data'] = [loan.to_dict() for loan in result.pop('items')]
+        return result
+
     loans = LoanApproval.query.paginate(page=page, per_page=per_page)
 
     loans_list = [{
@@ -194,17 +270,125 @@ def apply_filters(query, filters):
 
     return query
 
-def calculate_aggregate(query, aggregate_type, field):
+def build_group_by(group_by):
     """
-    Calculates aggregate values such as sum, average, count, max, or min for a specified field.
-    Input: query (SQLAlchemy query object), aggregate_type (string), field (string)
-    Expected Output: Aggregate value or error message.
+    Builds the GROUP BY expressions of an aggregation request.
+
+    Input: group_by (list of column names, or dictionaries {"column": ..., "bucket_size": ...} to group a numeric
+           column into buckets of the given width)
+    Expected Output: List of labeled SQLAlchemy expressions or error message.
     """
-    try:
-        result = db.session.query(getattr(func, aggregate_type)(getattr(LoanApproval, field))).scalar()
-        return result
-    except Exception as e:
-        return {"error": str(e)}, 400
+    if not isinstance(group_by, list):
+        return {"error": "group_by must be a list"}, 400
+    expressions = []
+    for item in group_by:
+        if isinstance(item, str):
+            item = {'column': item}
+        if not isinstance(item, dict):
+            return {"error": f"Unsupported group_by entry: {item}"}, 400
+
+        column = item.get('column')
+        bucket_size = item.get('bucket_size')
+        if bucket_size is None:
+            if column != 'loan_status':
+                return {"error": f"Column '{column}' can only be grouped with a bucket_size"}, 400
+            expressions.append(LoanApproval.loan_status.label('loan_status'))
+            continue
+
+        if column not in NUMERIC_COLUMNS:
+            return {"error": f"Unsupported bucket column: {column}"}, 400
+        if isinstance(bucket_size, bool) or not isinstance(bucket_size, (int, float)) or bucket_size <= 0:
+            return {"error": "bucket_size must be a positive number"}, 400
+        # Lower edge of the bucket: CAST(value / size AS INTEGER) * size, portable to SQLite
+        bucket = cast(getattr(LoanApproval, column) / bucket_size, Integer) * bucket_size
+        expressions.append(bucket.label(f'{column}_bucket'))
+
+    return expressions
+
+def build_aggregate_query(query, aggregates, group_by=None):
+    """
+    Builds the single SELECT computing every requested aggregate over the filtered query, optionally grouped.
+
+    Standard deviations take two passes: a subquery computes the mean of every group, joined back to sum
+    the squared deviations around it. SQLite has no stddev, and the one pass Σx² − (Σx)²/n cancels out
+    most digits of large values with a small spread (incomes, loan amounts).
+
+    Input: query (SQLAlchemy query object with the filters applied), aggregates (list of {"type": ..., "field": ...}),
+           group_by (list of labeled group expressions, optional)
+    Expected Output: Aggregate query or error message.
+    """
+    group_by = group_by or []
+    if not isinstance(aggregates, list):
+        return {"error": "aggregates must be a list"}, 400
+    for aggregate in aggregates:
+        if not isinstance(aggregate, dict):
+            return {"error": f"Unsupported aggregate entry: {aggregate}"}, 400
+        aggregate_type = aggregate.get('type')
+        field = aggregate.get('field')
+        if aggregate_type not in AGGREGATE_TYPES:
+            return {"error": f"Unsupported aggregate type: {aggregate_type}"}, 400
+        if field not in NUMERIC_COLUMNS and not (aggregate_type == 'count' and field == 'loan_status'):
+            return {"error": f"Unsupported aggregate field: {field}"}, 400
+
+    stddev_fields = list(dict.fromkeys(aggregate['field'] for aggregate in aggregates
+                                       if aggregate['type'] == 'stddev'))
+    means = None
+    if stddev_fields:
+        means = query.with_entities(*group_by, *[func.avg(getattr(LoanApproval, field)).label(f'mean_{field}')
+                                                 for field in stddev_fields])
+        if group_by:
+            means = means.group_by(*group_by)
+        means = means.subquery()
+
+    columns = []
+    for aggregate in aggregates:
+        column = getattr(LoanApproval, aggregate['field'])
+        if aggregate['type'] == 'stddev':
+            deviation = column - means.c[f"mean_{aggregate['field']}"]
+            columns += [func.count(column), func.sum(deviation * deviation)]
+        else:
+            columns.append(getattr(func, aggregate['type'])(column))
+
+    if means is not None:
+        query = query.join(means, and_(true(), *[expression.element == means.c[expression.name]
+                                                 for expression in group_by]))
+    query = query.with_entities(*group_by, *columns)
+    if group_by:
+        query = query.group_by(*group_by).order_by(*group_by)
+    return query
+
+def calculate_aggregate(query, aggregates, group_by=None):
+    """
+    Calculates aggregate values such as sum, average, count, max, min or standard deviation over the filtered query,
+    optionally grouped, in a single SQL statement.
+    Input: query (SQLAlchemy query object with the filters applied), aggregates (list of {"type": ..., "field": ...}),
+           group_by (list of labeled group expressions, optional)
+    Expected Output: List of result rows (one per group) or error message.
+    """
+    group_by = group_by or []
+    query = build_aggregate_query(query, aggregates, group_by)
+    if isinstance(query, tuple):
+        return query
+
+    results = []
+    for row in query.all():
+        result = {expression.name: row[i] for i, expression in enumerate(group_by)}
+        position = len(group_by)
+        for aggregate in aggregates:
+            label = f"{aggregate['type']}_{aggregate['field']}"
+            if aggregate['type'] == 'stddev':
+                count, squared_deviations = row[position:position + 2]
+                position += 2
+                if count and count > 1:
+                    result[label] = round(math.sqrt(squared_deviations / (count - 1)), 4)
+                else:
+                    result[label] = None
+            else:
+                result[label] = row[position]
+                position += 1
+        results.append(result)
+
+    return results
 
 
 def filter_and_aggregate(data):
@@ -216,8 +400,13 @@ def filter_and_aggregate(data):
             - filters (list): List of filters to apply to the query.
             - aggregate_type (str): Type of aggregation (e.g., 'sum', 'avg').
             - field (str): Field on which to perform the aggregation.
+            - aggregates (list): Several aggregations at once, each as {"type": ..., "field": ...}.
+            - group_by (list): Group the aggregations by 'loan_status' and/or numeric buckets
+              ({"column": "income", "bucket_size": 100000}).
             - page (int): Current page for pagination.
             - per_page (int): Number of items per page.
+            - after (str) / limit (int): Keyset pagination cursor and page size, used instead of page/per_page.
+            - with_total (bool): Include the (cached) total count in keyset pagination mode.
 
     Returns:
         tuple: Response dictionary containing filtered data or aggregate results, and HTTP status code.
@@ -225,6 +414,8 @@ def filter_and_aggregate(data):
     filters = data.get('filters', [])
     aggregate_type = data.get('aggregate_type')
     field = data.get('field')
+    aggregates = data.get('aggregates')
+    group_by = data.get('group_by', [])
     page = data.get('page', 1)
     per_page = data.get('per_page', 20)
 
@@ -232,15 +423,42 @@ def filter_and_aggregate(data):
 
     if filters:
         query = apply_filters(query, filters)
-
-    if aggregate_type and field:
-        aggregate_result = calculate_aggregate(query, aggregate_type, field)
+        if isinstance(query, tuple):
+            return query
+
+    if aggregates or group_by or (aggregate_type and field):
+        if not aggregates:
+            if not (aggregate_type and field):
+                return {"error": "Please provide 'aggregates' or 'aggregate_type' and 'field'"}, 400
+            aggregates = [{"type": aggregate_type, "field": field}]
+
+        group_expressions = build_group_by(group_by)
+        if isinstance(group_expressions, tuple):
+            return group_expressions
+
+        results = calculate_aggregate(query, aggregates, group_expressions)
+        if isinstance(results, tuple):
+            return results
+
+        if group_by:
+            return {"group_by": [expression.name for expression in group_expressions], "groups": results}, 200
+        if data.get('aggregates'):
+            return {"result": results[0]}, 200
         return {
             "aggregate_type": aggregate_type,
             "field": field,
-            "result": aggregate_result
+            "result": results[0][f"{aggregate_type}_{field}"]
         }, 200
 
+    if data.get('after') is not None or data.get('limit') is not None:
+        try:
+            result = keyset_paginate(query, LoanApproval.loan_id, data.get('after'), data.get('limit'),
+                                     data.get('with_total', False))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        result['filtered_loans'] = [loan.to_dict() for loan in result.pop('items')]
+        return result, 200
+
     pagination_query = query.paginate(page=page, per_page=per_page, error_out=False)
     filtered_loans = pagination_query.items
 
@@ -255,46 +473,219 @@ def filter_and_aggregate(data):
     }, 200
 
 
-def compute_advanced_stats(column_name):
+def export_loans(data, export_format='ndjson'):
     """
-    Computes advanced statistical measures for a specified column in the LoanApproval table.
+    Exports every loan matching the filters as NDJSON or CSV, streamed from a server-side cursor.
 
     Args:
-        column_name (str): Name of the column to analyze.
+        data (dict): A dictionary containing 'filters', the same list /loan_approval/filter accepts.
+        export_format (str): 'ndjson' (default) or 'csv'.
 
     Returns:
-        tuple: Response dictionary containing statistical measures or error message, and HTTP status code.
+        Response: Streamed export, or a tuple with an error message and HTTP status code.
     """
+    query = LoanApproval.query
+    filters = data.get('filters', [])
+    if filters:
+        query = apply_filters(query, filters)
+        if isinstance(query, tuple):
+            return query
+
+    query = query.order_by(LoanApproval.loan_id)
+    columns = [LoanApproval.loan_id, LoanApproval.income, LoanApproval.loan_amount,
+               LoanApproval.credit_score, LoanApproval.loan_status, LoanApproval.asset_value]
+    return stream_export(query, columns, export_format, 'loans')
+
+
+def explain_filter(data):
+    """
+    Shows the query plan of a /loan_approval/filter request, i.e. which index serves each filter combination.
+
+    Args:
+        data (dict): The same body as /loan_approval/filter (filters, and optionally aggregates and group_by).
+
+    Returns:
+        tuple: Response dictionary with the SQL, plan lines and indexes used, and HTTP status code.
+    """
+    query = LoanApproval.query
+    filters = data.get('filters', [])
+    if filters:
+        query = apply_filters(query, filters)
+        if isinstance(query, tuple):
+            return query
+
+    aggregates = data.get('aggregates')
+    if not aggregates and data.get('aggregate_type') and data.get('field'):
+        aggregates = [{"type": data['aggregate_type'], "field": data['field']}]
+    if aggregates:
+        group_expressions = build_group_by(data.get('group_by', []))
+        if isinstance(group_expressions, tuple):
+            return group_expressions
+        query = build_aggregate_query(query, aggregates, group_expressions)
+        if isinstance(query, tuple):
+            return query
+
     try:
-        rows = db.session.query(getattr(LoanApproval, column_name)).all()
-        column_values = [row[0] for row in rows if row[0] is not None]
+        return explain_query(query), 200
+    except Exception as e:
+        return {"error": str(e)}, 500
 
-        if len(column_values) < 2:
-            return {"error": "Not enough data points to compute statistics"}, 400
 
-        column_values = np.array(column_values)
-        column_values = column_values[~np.isnan(column_values)]
+def interpolate_group_percentile(values, starts, counts, q):
+    """
+    Linear interpolation percentile (numpy's default method) of every group of a group-sorted array.
+    """
+    position = starts + q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
 
-        mean = round(np.mean(column_values), 1)
-        median = round(np.median(column_values), 1)
-        mode_result = stats.mode(column_values, keepdims=True)
-        mode = round(mode_result.mode[0], 1) if mode_result.count[0] > 0 else None
-        q1 = round(np.percentile(column_values, 25), 1)
-        q3 = round(np.percentile(column_values, 75), 1)
-        iqr = q3 - q1
+def compute_group_stats(values, codes):
+    """
+    Computes mean, median, mode, quartiles and IQR outliers of every group in one vectorized pass.
 
-        lower_bound = q1 - 1.5 * iqr
-        upper_bound = q3 + 1.5 * iqr
-        outliers = column_values[(column_values < lower_bound) | (column_values > upper_bound)]
+    The values are sorted by (group code, value) once, so every group is a contiguous sorted slice.
+    Means come from np.add.reduceat, quartiles from index arithmetic on the slices, the mode from the
+    longest run of equal values of each slice and outliers from the group bounds broadcast back.
 
-        return {
-            "mean": mean,
-            "median": median,
-            "mode": mode,
-            "q1": q1,
-            "q3": q3,
-            "outliers": [round(outlier, 1) for outlier in outliers]
-        }, 200
+    Input: values (float array), codes (int array of the group of each value, 0..n_groups-1)
+    Expected Output: List of statistics dictionaries, one per group code present.
+    """
+    order = np.lexsort((values, codes))
+    values, codes = values[order], codes[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    group_codes = codes[starts]
+
+    means = np.add.reduceat(values, starts) / counts
+    medians = interpolate_group_percentile(values, starts, counts, 0.5)
+    q1 = np.round(interpolate_group_percentile(values, starts, counts, 0.25), 1)
+    q3 = np.round(interpolate_group_percentile(values, starts, counts, 0.75), 1)
+    iqr = q3 - q1
+
+    # Runs of equal values inside each group; the longest run is the mode, the smallest value wins ties
+    run_starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (values[1:] != values[:-1])])
+    run_lengths = np.diff(np.r_[run_starts, len(values)])
+    run_codes = codes[run_starts]
+    best_runs = np.lexsort((values[run_starts], -run_lengths, run_codes))
+    first_of_group = np.r_[True, run_codes[best_runs][1:] != run_codes[best_runs][:-1]]
+    modes = values[run_starts][best_runs][first_of_group]
+
+    lower_bounds = np.repeat(q1 - 1.5 * iqr, counts)
+    upper_bounds = np.repeat(q3 + 1.5 * iqr, counts)
+    is_outlier = (values < lower_bounds) | (values > upper_bounds)
+    outlier_group = np.searchsorted(starts, np.flatnonzero(is_outlier), side='right') - 1
+    outlier_values = values[is_outlier]
+
+    results = []
+    for i, code in enumerate(group_codes):
+        results.append({
+            "code": int(code),
+            "count": int(counts[i]),
+            "mean": round(float(means[i]), 1),
+            "median": round(float(medians[i]), 1),
+            "mode": round(float(modes[i]), 1),
+            "q1": float(q1[i]),
+            "q3": float(q3[i]),
+            "outliers": [round(float(outlier), 1) for outlier in outlier_values[outlier_group == i]]
+        })
+    return results
+
+
+def compute_exact_stats(column_name, filters=None, group_by=None):
+    """
+    Loads the values of a column, optionally filtered and labeled with their group, in one query and
+    computes the statistical measures of every group from the full arrays.
+
+    Input: column_name (str), filters (list of filter conditions), group_by (list accepted by build_group_by)
+    Expected Output: Statistics dictionary, or {"group_by": [...], "groups": [...]} when grouped, or error message.
+    """
+    column = getattr(LoanApproval, column_name)
+    query = db.session.query(column).filter(column.isnot(None))
+    if filters:
+        query = apply_filters(query, filters)
+        if isinstance(query, tuple):
+            return query[0]
+
+    group_expressions = build_group_by(group_by or [])
+    if isinstance(group_expressions, tuple):
+        return group_expressions[0]
+
+    rows = query.with_entities(column, *group_expressions).all()
+    values = np.array([row[0] for row in rows], dtype=float)
+    if group_expressions:
+        # Factorize every group column, then number the distinct combinations
+        labels = [pd.factorize(pd.Series([row[i + 1] for row in rows], dtype=object), sort=True)
+                  for i in range(len(group_expressions))]
+        if rows:
+            combinations, codes = np.unique(np.column_stack([label[0] for label in labels]), axis=0,
+                                            return_inverse=True)
+            codes = codes.reshape(-1)
+        else:
+            combinations, codes = np.empty((0, len(labels)), dtype=np.int64), np.empty(0, dtype=np.int64)
+    else:
+        codes = np.zeros(len(values), dtype=np.int64)
+
+    valid = ~np.isnan(values)
+    if not group_expressions and valid.sum() < 2:
+        return {"error": "Not enough data points to compute statistics"}
+    results = compute_group_stats(values[valid], codes[valid]) if valid.any() else []
+
+    if not group_expressions:
+        result = results[0]
+        del result["code"], result["count"]
+        return result
+
+    groups = []
+    for result in results:
+        combination = combinations[result.pop("code")]
+        group = {expression.name: labels[i][1][combination[i]] for i, expression in enumerate(group_expressions)}
+        group.update(result)
+        groups.append(group)
+    return {"group_by": [expression.name for expression in group_expressions], "groups": groups}
+
+
+def compute_advanced_stats(column_name, exact=False, filters=None, group_by=None):
+    """
+    Computes advanced statistical measures for a specified column in the LoanApproval table.
+
+    Without filters or grouping the mean comes from a running sum and count and the quartiles and median
+    from a streaming quantile sketch, both maintained as loans are written, and the mode from one GROUP BY.
+    Filtered or grouped statistics are computed exactly in one query and one vectorized pass over all groups.
+    Results are cached per request and table version.
+
+    Args:
+        column_name (str): Name of the column to analyze.
+        exact (bool): Load the whole column and compute exact statistics instead of using the sketch.
+        filters (list, optional): Filter conditions, as accepted by apply_filters.
+        group_by (list, optional): Grouping, as accepted by build_group_by.
+
+    Returns:
+        tuple: Response dictionary containing statistical measures or error message, and HTTP status code.
+    """
+    try:
+        if not hasattr(LoanApproval, column_name):
+            raise AttributeError(column_name)
+
+        table_name = LoanApproval.__tablename__
+        key = column_name
+        if filters or group_by:
+            key = json.dumps([column_name, filters, group_by], sort_keys=True, default=str)
+            exact = True
+
+        cached = get_cached_stats(table_name, key, exact)
+        if cached is not None:
+            return cached, 200 if "error" not in cached else 400
+
+        version = get_table_version(table_name)
+        result = None if exact else approximate_stats(table_name, column_name)
+        if result is None:
+            # Columns without a running summary fall back to the exact computation
+            result = compute_exact_stats(column_name, filters, group_by)
+        store_cached_stats(table_name, key, exact, version, result)
+        return result, 200 if "error" not in result else 400
 
     except AttributeError:
         return {"error": f"Column '{column_name}' does not exist in the LoanApproval table"}, 400
@@ -302,73 +693,178 @@ def compute_advanced_stats(column_name):
         return {"error": str(e)}, 500
 
 
-def generate_bar_chart(column_name):
+def validate_histogram_request(column_name, bins, categorical=False):
     """
-    Generates a bar chart (histogram) for a specified column in the LoanApproval table.
+    Checks the column and bin count of a histogram request.
+
+    Input: column_name (str), bins (int), categorical (bool, accept the CATEGORICAL_COLUMNS as well)
+    Expected Output: None when valid, otherwise an error message with a status code.
+    """
+    if getattr(LoanApproval, column_name, None) is None:
+        return {"error": f"Column '{column_name}' does not exist in the LoanApproval table"}, 400
+    if column_name not in HISTOGRAM_COLUMNS and not (categorical and column_name in CATEGORICAL_COLUMNS):
+        return {"error": f"Column '{column_name}' is not numeric"}, 400
+    if isinstance(bins, bool) or not isinstance(bins, int) or not 1 <= bins <= MAX_BINS:
+        return {"error": f"bins must be an integer between 1 and {MAX_BINS}"}, 400
+    return None
+
+
+def get_histogram(column_name, bins=DEFAULT_BINS):
+    """
+    Computes the histogram of a numeric LoanApproval column in the database.
 
     Args:
-        column_name (str): Name of the column to generate the chart for.
+        column_name (str): Name of the column to bin.
+        bins (int): Number of bins.
 
     Returns:
-        Response: A PNG image of the bar chart or error message with HTTP status code.
+        tuple: Dictionary with the bin edges, counts and total, or error message, and HTTP status code.
     """
     try:
-        column = getattr(LoanApproval, column_name, None)
-        if column is None:
-            return {"error": f"Column '{column_name}' does not exist in the LoanApproval table"}, 400
+        error = validate_histogram_request(column_name, bins)
+        if error:
+            return error
+
+        histogram = compute_histogram(LoanApproval, column_name, bins)
+        if histogram is None:
+            return {"error": f"No data available for column '{column_name}'"}, 400
+        return histogram, 200
 
-        data = [row[0] for row in LoanApproval.query.with_entities(column).all()]
-        if not data:
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+def count_categories(column_name):
+    """
+    Number of loans per value of a categorical LoanApproval column, in value order, counted in the database.
+
+    Output: (categories, counts) lists, empty when the column holds no value.
+    """
+    column = getattr(LoanApproval, column_name)
+    rows = (db.session.query(column, func.count()).filter(column.isnot(None))
+            .group_by(column).order_by(column).all())
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+def categorical_series(column_name):
+    categories, counts = count_categories(column_name)
+    return {"column": column_name, "categories": categories, "counts": counts, "total": sum(counts)}
+
+
+def render_bar_chart(column_name, bins=DEFAULT_BINS, chart_format='png'):
+    """
+    Renders the histogram of a LoanApproval column as PNG or SVG bytes, or returns its bins and counts
+    as JSON for the json format. Only the bin counts are read from the database.
+    Categorical columns get one bar per value instead of bins.
+    """
+    if column_name in CATEGORICAL_COLUMNS:
+        series = categorical_series(column_name)
+        if not series['total']:
             return {"error": f"No data available for column '{column_name}'"}, 400
+        if chart_format == 'json':
+            return encode_series(series)
+        return render_category_counts(series['categories'], series['counts'], f"Distribution of {column_name}",
+                                      column_name.capitalize(), image_format=chart_format)
 
-        plt.figure(figsize=(10, 6))
-        plt.hist(data, bins=10, color='blue', edgecolor='black', alpha=0.7)
-        plt.title(f"Distribution of {column_name}")
-        plt.xlabel(column_name.capitalize())
-        plt.ylabel("Frequency")
+    histogram = compute_histogram(LoanApproval, column_name, bins)
+    if histogram is None:
+        return {"error": f"No data available for column '{column_name}'"}, 400
+    if chart_format == 'json':
+        return encode_series(histogram)
 
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png')
-        buffer.seek(0)
-        plt.close()
+    return render_histogram(histogram['counts'], histogram['edges'], f"Distribution of {column_name}",
+                            column_name.capitalize(), image_format=chart_format)
 
-        return Response(buffer, mimetype='image/png')
+
+def generate_bar_chart(column_name, bins=DEFAULT_BINS, chart_format='png'):
+    """
+    Generates a bar chart (histogram) for a specified column in the LoanApproval table.
+    The chart is cached per column, format and table version and served with an ETag.
+
+    Args:
+        column_name (str): Name of the column to generate the chart for.
+        bins (int): Number of bins.
+        chart_format (str): 'png', 'svg', or 'json' for the bin edges and counts without rendering.
+            Categorical columns (loan_status) return their categories and counts instead.
+
+    Returns:
+        Response: The bar chart or error message with HTTP status code.
+    """
+    try:
+        error = validate_histogram_request(column_name, bins, categorical=True) or validate_chart_format(chart_format)
+        if error:
+            return error
+
+        stamp = get_version_stamp(LoanApproval.__tablename__)
+        return cached_artifact(['loan_bar_chart', column_name, bins, chart_format, stamp],
+                               lambda: render_bar_chart(column_name, bins, chart_format),
+                               mimetype=CHART_FORMATS[chart_format])
 
     except Exception as e:
         return {"error": str(e)}, 500
 
 
-def generate_line_graph(column_name):
+def render_line_graph(column_name, max_points, chart_format='png'):
+    """
+    Renders the sorted values of a LoanApproval column as a PNG or SVG line graph, or returns the
+    sampled points as JSON for the json format.
+    The sorted distribution is quantile sampled in the database down to max_points points.
+    The sorted values of a categorical column are drawn as steps from their counts.
+    """
+    if column_name in CATEGORICAL_COLUMNS:
+        series = categorical_series(column_name)
+        if not series['total']:
+            return {"error": f"No data available for column '{column_name}'"}, 400
+        if chart_format == 'json':
+            return encode_series(series)
+        return render_category_steps(series['categories'], series['counts'], f"Line Graph of {column_name}",
+                                     "Index", column_name.capitalize(), image_format=chart_format)
+
+    positions, values, total = sample_sorted_column(LoanApproval, column_name, max_points)
+    if not total:
+        return {"error": f"No data available for column '{column_name}'"}, 400
+    if chart_format == 'json':
+        return encode_series({
+            "column": column_name,
+            "total": total,
+            "points": [[int(position), float(value)] for position, value in zip(positions, values)]
+        })
+
+    return render_lines([{'x': positions, 'y': values, 'color': 'blue', 'alpha': 0.7}],
+                        f"Line Graph of {column_name}", "Index", column_name.capitalize(),
+                        image_format=chart_format)
+
+
+def generate_line_graph(column_name, chart_format='png'):
     """
     Generates a line graph for a specified column in the LoanApproval table.
+    The graph is cached per column, format and table version and served with an ETag.
+
+    Rendering cost is bounded by GRAPH_MAX_POINTS (app config, about the pixel width of the chart)
+    instead of the number of loans.
 
     Args:
         column_name (str): Name of the column to generate the graph for.
+        chart_format (str): 'png', 'svg', or 'json' for the sampled [index, value] points without rendering.
+            Categorical columns (loan_status) return their categories and counts instead.
 
     Returns:
-        Response: A PNG image of the line graph or error message with HTTP status code.
+        Response: The line graph or error message with HTTP status code.
     """
     try:
-        column = getattr(LoanApproval, column_name, None)
-        if column is None:
+        if getattr(LoanApproval, column_name, None) is None:
             return {"error": f"Column '{column_name}' does not exist in the LoanApproval table"}, 400
-
-        data = [row[0] for row in LoanApproval.query.with_entities(column).all()]
-        if not data:
-            return {"error": f"No data available for column '{column_name}'"}, 400
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(sorted(data), color='blue', alpha=0.7)
-        plt.title(f"Line Graph of {column_name}")
-        plt.xlabel("Index")
-        plt.ylabel(column_name.capitalize())
-
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png')
-        buffer.seek(0)
-        plt.close()
-
-        return Response(buffer, mimetype='image/png')
+        if column_name not in HISTOGRAM_COLUMNS and column_name not in CATEGORICAL_COLUMNS:
+            return {"error": f"Column '{column_name}' is not numeric"}, 400
+        error = validate_chart_format(chart_format)
+        if error:
+            return error
+
+        max_points = current_app.config.get('GRAPH_MAX_POINTS', DEFAULT_MAX_POINTS)
+        stamp = get_version_stamp(LoanApproval.__tablename__)
+        return cached_artifact(['loan_line_graph', column_name, max_points, chart_format, stamp],
+                               lambda: render_line_graph(column_name, max_points, chart_format),
+                               mimetype=CHART_FORMATS[chart_format])
 
     except Exception as e:
         return {"error": str(e)}, 500
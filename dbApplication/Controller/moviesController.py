@@ -4,12 +4,29 @@ import pandas as pd
 from flask import current_app as app
 from sqlalchemy import or_
 from Models.movies_model import Movies 
-from app import db
+from Models.dbModel import db
+from Controller.cleaningController import MOVIE_SCHEMA, clean_frame
+from Controller.queryPlanController import explain_query
+from Controller.paginationController import keyset_paginate
+from Controller.exportController import stream_export
+from Controller.ingestionController import validate_csv_file, stream_csv_into_table, track_ingest, throughput
 
 UPLOAD_FOLDER = 'uploads'
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+MOVIE_CSV_COLUMNS = list(MOVIE_SCHEMA)
+
+def clean_movie_frame(data):
+    """
+    Strips string columns, coerces every movie column to its dtype and rejects rows
+    that are missing a value or fail the coercion.
+
+    Input: data (pandas DataFrame read from a movies CSV)
+    Expected Output: Cleaned DataFrame ready to be inserted and the rejected rows report.
+    """
+    return clean_frame(data, MOVIE_SCHEMA)
+
 def upload_csv(file):
     """
     Uploads a CSV file, validates its format and columns, and inserts the data into the database.
@@ -17,11 +34,9 @@ def upload_csv(file):
     Input: file (uploaded CSV file)
     Expected Output: JSON response with a success or error message.
     """
-    if file.filename == '':
-        return {'error': 'No selected file'}, 400
-
-    if not file.filename.endswith('.csv'):
-        return {'error': 'Invalid file format, please upload a CSV file'}, 400
+    error = validate_csv_file(file)
+    if error:
+        return error
 
     filepath = os.path.join(UPLOAD_FOLDER, file.filename)
     file.save(filepath)
@@ -29,13 +44,11 @@ def upload_csv(file):
     try:
         data = pd.read_csv(filepath)
 
-        required_columns = ['title', 'director', 'release_year', 'runtime', 'genre', 'rating', 'gross']
-        for col in required_columns:
+        for col in MOVIE_CSV_COLUMNS:
             if col not in data.columns:
                 return {'error': f'Missing required column: {col}'}, 400
 
-        data = data.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        data.dropna(subset=required_columns, inplace=True)
+        data, report = clean_movie_frame(data)
 
         for _, row in data.iterrows():
             # Assuming 'movies_id' is a field in the database and auto-incremented, you don't need to set it manually
@@ -51,9 +64,35 @@ def upload_csv(file):
             db.session.add(new_movie)
 
         db.session.commit()
-        return {'message': f'{len(data)} movies successfully added to the database'}, 201
+        return {'message': f'{len(data)} movies successfully added to the database', **report}, 201
+
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+def upload_csv_stream(stream, chunk_size=None):
+    """
+    Streams a movies CSV into the database chunk by chunk without saving it to disk or loading it whole.
+    The 'id' column of the file is ignored, ids are assigned by the database.
+
+    Input: stream (binary file-like object with the CSV content), chunk_size (integer, optional, rows per chunk)
+    Expected Output: JSON response with progress counters and ingestion metrics, or error details.
+    """
+    try:
+        with track_ingest() as metrics:
+            progress, error = stream_csv_into_table(stream, Movies, MOVIE_CSV_COLUMNS, clean_movie_frame, chunk_size)
+        if error:
+            return {'error': error, **progress}, 400
+
+        return {
+            'message': f'{progress["rows_inserted"]} movies successfully added to the database',
+            **progress,
+            'elapsed_seconds': metrics['elapsed_seconds'],
+            'rows_per_sec': throughput(progress['rows_inserted'], metrics['elapsed_seconds']),
+            'peak_memory_mb': metrics['peak_memory_mb']
+        }, 201
 
     except Exception as e:
+        db.session.rollback()
         return {'error': str(e)}, 500
 
 
@@ -84,13 +123,20 @@ def create_movie(data):
 
     return {'message': 'Movie created', 'id': new_movie.id}, 201
 
-def get_all_movies(page, per_page=20):
+def get_all_movies(page, per_page=20, after=None, limit=None, with_total=False):
     """
     Retrieves paginated movie records from the database.
+    When a cursor ('after') or a 'limit' is given, keyset pagination on the id is used instead of page/per_page.
 
-    Input: page (integer), per_page (integer, default 20)
-    Expected Output: JSON response with paginated movie data.
+    Input: page (integer), per_page (integer, default 20), after (string, optional, cursor), limit (integer, optional),
+           with_total (boolean, optional)
+    Expected Output: JSON response with paginated movie data. Raises ValueError for an invalid cursor.
     """
+    if after is not None or limit is not None:
+        result = keyset_paginate(Movies.query, Movies.id, after, limit, with_total)
+        result['data'] = [movie.to_dict() for movie in result.pop('items')]
+        return result
+
     movies = Movies.query.paginate(page=page, per_page=per_page)
     movies_list = [movie.to_dict() for movie in movies.items]
 
@@ -188,18 +234,13 @@ def search_movies(search_query):
         for movie in movies
     ]
 
-def filter_movies(genre=None, release_year=None, min_gross=None, min_rating=None, page=1, per_page=20):
+def build_movie_filter_query(genre=None, release_year=None, min_gross=None, min_rating=None):
     """
-    Filters movies based on genre, release year, minimum gross, and minimum rating.
+    Builds the movies query filtered by genre (partial match), release year, minimum gross and minimum rating.
 
-    Input:
-        genre (string, optional)
-        release_year (integer, optional)
-        min_gross (float, optional)
-        min_rating (float, optional)
-        page (integer, optional, default 1)
-        per_page (integer, optional, default 20)
-    Expected Output: JSON response with paginated and filtered movie data.
+    Input: genre (string, optional), release_year (integer, optional), min_gross (float, optional),
+           min_rating (float, optional)
+    Expected Output: Filtered SQLAlchemy query.
     """
     query = Movies.query
 
@@ -212,6 +253,29 @@ def filter_movies(genre=None, release_year=None, min_gross=None, min_rating=None
     if min_rating:
         query = query.filter(Movies.rating >= min_rating)
 
+    return query
+
+def filter_movies(genre=None, release_year=None, min_gross=None, min_rating=None, page=1, per_page=20,
+                  after=None, limit=None, with_total=False):
+    """
+    Filters movies based on genre, release year, minimum gross, and minimum rating.
+
+    Input:
+        genre (string, optional)
+        release_year (integer, optional)
+        min_gross (float, optional)
+        min_rating (float, optional)
+        page (integer, optional, default 1)
+        per_page (integer, optional, default 20)
+        after (string, optional), limit (integer, optional), with_total (boolean, optional): keyset pagination
+    Expected Output: JSON response with paginated and filtered movie data. Raises ValueError for an invalid cursor.
+    """
+    query = build_movie_filter_query(genre, release_year, min_gross, min_rating)
+    if after is not None or limit is not None:
+        result = keyset_paginate(query, Movies.id, after, limit, with_total)
+        result['data'] = [movie.to_dict() for movie in result.pop('items')]
+        return result
+
     movies = query.paginate(page=page, per_page=per_page)
 
     movie_list = [
@@ -235,3 +299,29 @@ def filter_movies(genre=None, release_year=None, min_gross=None, min_rating=None
         'total_items': movies.total,
         'data': movie_list
     }
+
+def export_movies(genre=None, release_year=None, min_gross=None, min_rating=None, export_format='ndjson'):
+    """
+    Exports every movie matching the filter_movies filters as NDJSON or CSV, streamed from a server-side cursor.
+
+    Input: The same filters as filter_movies, export_format ('ndjson' or 'csv')
+    Expected Output: Streamed export response, or an error message with a status code.
+    """
+    query = build_movie_filter_query(genre, release_year, min_gross, min_rating).order_by(Movies.id)
+    columns = [Movies.id, Movies.title, Movies.director, Movies.release_year, Movies.runtime,
+               Movies.genre, Movies.rating, Movies.gross]
+    return stream_export(query, columns, export_format, 'movies')
+
+def explain_movie_filter(genre=None, release_year=None, min_gross=None, min_rating=None):
+    """
+    Shows the query plan of a /movies/filter request, i.e. which index serves each filter combination.
+    A genre filter is a partial match (ILIKE '%genre%'), which no B-tree index can serve, so genre has none.
+
+    Input: The same filters as filter_movies.
+    Expected Output: JSON response with the SQL, plan lines and indexes used.
+    """
+    try:
+        query = build_movie_filter_query(genre, release_year, min_gross, min_rating)
+        return explain_query(query), 200
+    except Exception as e:
+        return {'error': str(e)}, 500
@@ -0,0 +1,105 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from flask import current_app
+from Models.dbModel import db
+from Controller.dataVersionController import get_table_version
+
+DEFAULT_LIMIT = 20
+
+# (table, SQL, params, table version) -> (count, computed at)
+_count_cache = {}
+_count_lock = threading.Lock()
+MAX_CACHED_COUNTS = 1024
+
+
+def encode_cursor(value):
+    """
+    Encodes the key of the last row of a page into an opaque, URL safe cursor.
+    """
+    payload = json.dumps({'after': value}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor. Pages are keyed by integer primary keys, any other
+    value would be compared with the key column as is.
+
+    Input: cursor (str)
+    Expected Output: The key value to continue after. Raises ValueError for a malformed cursor.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))['after']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('Invalid cursor')
+    return value
+
+
+def resolve_limit(limit):
+    """
+    Clamps a requested page size to 1..MAX_PAGE_LIMIT (app config).
+    """
+    max_limit = current_app.config.get('MAX_PAGE_LIMIT', 1000)
+    if limit is None:
+        return DEFAULT_LIMIT
+    return max(1, min(int(limit), max_limit))
+
+
+def cached_count(query, table_name):
+    """
+    Counts the rows of a query, reusing the last count of the same query while the table version is
+    unchanged and the entry is younger than COUNT_CACHE_TTL seconds (app config).
+    """
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    key = (table_name, str(compiled), repr(sorted(compiled.params.items())), get_table_version(table_name))
+    ttl = current_app.config.get('COUNT_CACHE_TTL', 60)
+
+    cached = _count_cache.get(key)
+    if cached and time.monotonic() - cached[1] < ttl:
+        return cached[0]
+
+    count = query.order_by(None).count()
+    with _count_lock:
+        if len(_count_cache) >= MAX_CACHED_COUNTS:
+            _count_cache.clear()
+        _count_cache[key] = (count, time.monotonic())
+    return count
+
+
+def keyset_paginate(query, key_column, after=None, limit=None, with_total=False):
+    """
+    Paginates a query by seeking past the key of the previous page (WHERE key > cursor ORDER BY key LIMIT n)
+    instead of OFFSET, so every page costs the same however deep it is.
+
+    Args:
+        query (SQLAlchemy query object): The (filtered) query to paginate.
+        key_column (Column): Unique, indexed column the pages are ordered by (the primary key).
+        after (str, optional): Cursor returned as next_cursor by the previous page.
+        limit (int, optional): Page size, clamped to MAX_PAGE_LIMIT.
+        with_total (bool): Include the total number of rows (cached count).
+
+    Returns:
+        dict: 'items' (list of rows), 'limit', 'next_cursor' (None on the last page), 'has_more'
+        and 'total' when requested. Raises ValueError for an invalid cursor.
+    """
+    limit = resolve_limit(limit)
+    total = cached_count(query, key_column.table.name) if with_total else None
+
+    if after:
+        query = query.filter(key_column > decode_cursor(after))
+    rows = query.order_by(key_column).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(getattr(rows[-1], key_column.key)) if has_more else None
+
+    page = {'items': rows, 'limit': limit, 'next_cursor': next_cursor, 'has_more': has_more}
+    if with_total:
+        page['total'] = total
+    return page
@@ -0,0 +1,228 @@
+import io
+import json
+import threading
+from contextlib import contextmanager
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Idle figure templates per chart type. A template is used by one render at a time, matplotlib artists
+# must never be shared between threads, but it is reused by whichever request thread renders next
+_templates = {}
+_templates_lock = threading.Lock()
+MAX_IDLE_TEMPLATES = 4
+
+# Output formats of the chart endpoints: rasterized, vector, or the computed series for client side rendering
+CHART_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'json': 'application/json',
+}
+
+
+def validate_chart_format(chart_format):
+    """
+    Returns None for a supported chart format, otherwise an error message with a status code.
+    """
+    if chart_format not in CHART_FORMATS:
+        return {'error': f"Unsupported format: {chart_format}, expected one of {', '.join(CHART_FORMATS)}"}, 400
+    return None
+
+
+def encode_series(series):
+    """
+    Serializes the computed series of a chart for the json format.
+    """
+    return json.dumps(series, separators=(',', ':')).encode()
+
+
+def build_histogram_template():
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    return {'figure': figure, 'axes': axes, 'bars': None}
+
+
+def build_line_template():
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    return {'figure': figure, 'axes': axes, 'lines': []}
+
+
+def build_scatter_template():
+    figure = Figure(figsize=(8, 6))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    points = axes.scatter([], [], marker='o', c='blue')
+    return {'figure': figure, 'axes': axes, 'points': points}
+
+
+TEMPLATE_BUILDERS = {
+    'histogram': build_histogram_template,
+    'line': build_line_template,
+    'scatter': build_scatter_template,
+}
+
+
+@contextmanager
+def borrow_template(name):
+    """
+    Lends an idle figure template of a chart type, building one when all are in use, and returns it to
+    the pool afterwards. Renders only swap the data of its artists instead of setting up a new figure.
+    """
+    with _templates_lock:
+        idle = _templates.setdefault(name, [])
+        template = idle.pop() if idle else None
+    if template is None:
+        template = TEMPLATE_BUILDERS[name]()
+    yield template
+    # Only reached when the render succeeded, a template left half updated by an error is dropped
+    with _templates_lock:
+        if len(idle) < MAX_IDLE_TEMPLATES:
+            idle.append(template)
+
+
+def set_labels(axes, title, xlabel, ylabel):
+    axes.set_title(title)
+    axes.set_xlabel(xlabel)
+    axes.set_ylabel(ylabel)
+
+
+def save_figure(figure, image_format='png'):
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def render_histogram(counts, edges, title, xlabel, ylabel='Frequency', image_format='png'):
+    """
+    Renders pre-binned counts as histogram bars.
+
+    Input:
+        counts (array-like): Number of values per bin.
+        edges (array-like): Bin edges, one more than counts.
+        title, xlabel, ylabel (str): Chart labels.
+        image_format (str): Output format understood by savefig ('png', 'svg').
+    Output:
+        bytes: The rendered image.
+    """
+    with borrow_template('histogram') as template:
+        axes = template['axes']
+        counts = np.asarray(counts, dtype=float)
+        edges = np.asarray(edges, dtype=float)
+        widths = np.diff(edges)
+
+        bars = template['bars']
+        if bars is None or len(bars) != len(counts):
+            if bars is not None:
+                bars.remove()
+            bars = template['bars'] = axes.bar(edges[:-1], counts, width=widths, align='edge',
+                                               color='blue', edgecolor='black', alpha=0.7)
+        else:
+            for bar, left, width, height in zip(bars, edges[:-1], widths, counts):
+                bar.set_x(left)
+                bar.set_width(width)
+                bar.set_height(height)
+
+        axes.relim()
+        axes.autoscale_view()
+        set_labels(axes, title, xlabel, ylabel)
+        return save_figure(template['figure'], image_format)
+
+
+def render_lines(series, title, xlabel, ylabel, image_format='png'):
+    """
+    Renders one or more line series on the same axes.
+
+    Input:
+        series (list[dict]): Each with 'y', optional 'x', 'color', 'label' and 'alpha'. A legend is drawn when labels are given.
+        title, xlabel, ylabel (str): Chart labels.
+        image_format (str): Output format understood by savefig ('png', 'svg').
+    Output:
+        bytes: The rendered image.
+    """
+    with borrow_template('line') as template:
+        axes = template['axes']
+        lines = template['lines']
+        while len(lines) < len(series):
+            lines.append(axes.plot([], [])[0])
+
+        for line, item in zip(lines, series):
+            y = np.asarray(item['y'], dtype=float).reshape(-1)
+            x = np.asarray(item['x'], dtype=float) if item.get('x') is not None else np.arange(len(y))
+            line.set_data(x, y)
+            line.set_color(item.get('color', 'blue'))
+            line.set_alpha(item.get('alpha', 1.0))
+            line.set_label(item.get('label') or '_nolegend_')
+            line.set_visible(True)
+        for line in lines[len(series):]:
+            line.set_data([], [])
+            line.set_visible(False)
+
+        axes.relim(visible_only=True)
+        axes.autoscale_view()
+        set_labels(axes, title, xlabel, ylabel)
+
+        legend = axes.get_legend()
+        if legend is not None:
+            legend.remove()
+        if any(item.get('label') for item in series):
+            axes.legend()
+        return save_figure(template['figure'], image_format)
+
+
+def render_category_counts(categories, counts, title, xlabel, ylabel='Frequency', image_format='png'):
+    """
+    Renders the number of values per category as one bar per category.
+
+    Categorical charts set their own tick labels, they are drawn on a new figure rather than a template.
+    """
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.bar(range(len(counts)), counts, tick_label=categories, color='blue', edgecolor='black', alpha=0.7)
+    set_labels(axes, title, xlabel, ylabel)
+    return save_figure(figure, image_format)
+
+
+def render_category_steps(categories, counts, title, xlabel, ylabel, image_format='png'):
+    """
+    Renders the sorted values of a categorical column as a line, one step per category at its index range.
+    The line is built from the category counts, the sorted values are never listed.
+    """
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    x = np.column_stack([starts, starts + np.asarray(counts) - 1]).ravel()
+    y = np.repeat(np.arange(len(categories)), 2)
+
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.plot(x, y, color='blue', alpha=0.7)
+    axes.set_yticks(range(len(categories)), categories)
+    set_labels(axes, title, xlabel, ylabel)
+    return save_figure(figure, image_format)
+
+
+def render_scatter(points, title, xlabel, ylabel, image_format='png'):
+    """
+    Renders 2D points as a scatter plot.
+
+    Input:
+        points (array-like): Array of shape (n, 2).
+        title, xlabel, ylabel (str): Chart labels.
+        image_format (str): Output format understood by savefig ('png', 'svg').
+    Output:
+        bytes: The rendered image.
+    """
+    with borrow_template('scatter') as template:
+        axes = template['axes']
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        template['points'].set_offsets(points)
+
+        # Collections are not covered by relim, reset the data limits from the points directly
+        axes.ignore_existing_data_limits = True
+        axes.update_datalim(points)
+        axes.autoscale_view()
+        set_labels(axes, title, xlabel, ylabel)
+        return save_figure(template['figure'], image_format)
@@ -0,0 +1,53 @@
+import re
+from Models.dbModel import db
+
+INDEX_PATTERN = re.compile(r'USING (?:COVERING )?INDEX (\w+)|Index (?:Only )?Scan (?:Backward )?using (\w+)')
+
+
+def is_full_scan(line):
+    """
+    Returns True when a plan line reads a whole table instead of searching an index.
+    """
+    line = str(line)
+    if 'Seq Scan' in line:
+        return True
+    return line.lstrip().startswith('SCAN ') and 'USING' not in line
+
+
+def explain_query(query):
+    """
+    Runs the database query planner on a SQLAlchemy query without executing it.
+
+    SQLite uses EXPLAIN QUERY PLAN, other databases plain EXPLAIN.
+
+    Input:
+        query (SQLAlchemy query object): The query to explain.
+    Output:
+        dict: The compiled SQL, the plan lines and the names of the indexes the plan uses.
+    """
+    dialect = db.engine.dialect
+    compiled = query.statement.compile(dialect=dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = db.session.connection().exec_driver_sql(prefix + str(compiled), params).all()
+    # SQLite returns (id, parent, notused, detail) rows, other databases one text column per plan line
+    plan = [row[-1] for row in rows]
+
+    indexes = []
+    for line in plan:
+        for match in INDEX_PATTERN.finditer(str(line)):
+            name = match.group(1) or match.group(2)
+            if name not in indexes:
+                indexes.append(name)
+
+    return {
+        'sql': str(compiled),
+        'params': [str(param) for param in (params if compiled.positional else params.values())],
+        'plan': plan,
+        'indexes_used': indexes,
+        'full_scan': any(is_full_scan(line) for line in plan)
+    }
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import threading
+import uuid
+from collections import namedtuple
+import numpy as np
+from flask import current_app
+
+# POSIX shared memory is a tmpfs, files there never touch a disk
+SHARED_MEMORY_DIR = '/dev/shm'
+
+# What a worker process needs to map an image buffer: a few bytes to pickle instead of the pixels
+BufferHandle = namedtuple('BufferHandle', ['path', 'shape', 'dtype'])
+
+
+def default_buffer_dir():
+    return SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else tempfile.gettempdir()
+
+
+class ImageBufferManager:
+    """
+    Owns the image buffers handed to worker processes.
+
+    A buffer is a file memory-mapped with numpy.memmap, in /dev/shm by default (the storage behind
+    multiprocessing.shared_memory). share() copies an array into a new buffer once and returns a BufferHandle,
+    workers map the same pages with attach_buffer(), so nothing is pickled or copied through the pool pipe.
+
+    Buffers live until release() deletes their file, pages stay mapped until the last process drops its view.
+    Unlike SharedMemory.close(), unmapping never fails because a view of the buffer is still referenced.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_buffer_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, shape, dtype=np.uint8):
+        """
+        Creates a zero-filled buffer and returns its handle and a writable view of it.
+        """
+        dtype = np.dtype(dtype)
+        path = os.path.join(self.directory, f'imgbuf-{os.getpid()}-{uuid.uuid4().hex}')
+        array = np.memmap(path, dtype=dtype, mode='w+', shape=tuple(shape))
+        handle = BufferHandle(path, tuple(shape), dtype.str)
+        with self._lock:
+            self._buffers[path] = array
+        return handle, array
+
+    def share(self, array):
+        """
+        Copies an array into a new buffer and returns its handle.
+        """
+        handle, view = self.allocate(array.shape, array.dtype)
+        view[...] = array
+        return handle
+
+    def view(self, handle):
+        """
+        Returns the owner's view of a buffer, e.g. to read a result a worker wrote into an allocated buffer.
+        """
+        with self._lock:
+            return self._buffers[handle.path]
+
+    def release(self, handle):
+        """
+        Deletes a buffer. A handle cannot be attached afterwards, workers that already did keep their view.
+        """
+        with self._lock:
+            array = self._buffers.pop(handle.path, None)
+        if array is not None:
+            del array
+            os.remove(handle.path)
+
+    def close(self):
+        """
+        Releases every buffer still owned by the manager.
+        """
+        with self._lock:
+            paths = list(self._buffers)
+        for path in paths:
+            self.release(BufferHandle(path, None, None))
+
+    def __len__(self):
+        return len(self._buffers)
+
+
+def attach_buffer(handle, writable=False):
+    """
+    Maps a buffer shared by an ImageBufferManager in the calling (worker) process, without copying it.
+    The mapping is dropped with the last view of the returned array.
+    """
+    return np.memmap(handle.path, dtype=np.dtype(handle.dtype), mode='r+' if writable else 'r', shape=handle.shape)
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_buffer_manager():
+    """
+    Returns the process-wide image buffer manager, with its buffers in IMAGE_BUFFER_DIR (app config,
+    /dev/shm when unset). Point it at a disk directory where /dev/shm is small (64MB by default in Docker).
+    """
+    directory = current_app.config.get('IMAGE_BUFFER_DIR') or default_buffer_dir()
+    with _managers_lock:
+        if directory not in _managers:
+            _managers[directory] = ImageBufferManager(directory)
+        return _managers[directory]
@@ -0,0 +1,324 @@
+import threading
+import numpy as np
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from Models.dbModel import db
+from Models.loan_models import LoanApproval
+from Controller.dataVersionController import get_table_version
+
+# Columns whose running summaries are maintained, per table
+TRACKED_COLUMNS = {
+    LoanApproval.__tablename__: (LoanApproval, ['income', 'loan_amount', 'credit_score', 'asset_value']),
+}
+
+DEFAULT_SKETCH_SIZE = 1024
+BUILD_BATCH_SIZE = 50000
+MAX_BUILD_ATTEMPTS = 3
+# Deleted or overwritten values stay inside the sketch, past this share of the rows it is rebuilt
+REBUILD_FRACTION = 0.1
+MAX_CACHED_STATS = 256
+
+PENDING_DELTAS_KEY = 'stats_deltas'
+
+
+class QuantileSketch:
+    """
+    KLL style streaming quantile sketch.
+
+    Values enter level 0. Once a level holds more than k items it is sorted and every other item
+    (random offset) is promoted to the next level, where each item stands for twice as many values.
+    Memory stays around k * log2(n / k) floats and the rank error shrinks as k grows.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_SIZE, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compact()
+
+    def compact(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # An odd item out stays at its level so weights remain exact
+                kept, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = kept
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def weighted_items(self):
+        """
+        Returns the sorted retained items and the number of values each one stands for.
+        """
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def quantiles(self, qs):
+        """
+        Quantiles with numpy's default (linear) interpolation. An item of weight w stands for w consecutive
+        values, it is placed at the centre of their 0-based ranks, so a sketch that still holds every value
+        (all weights 1) returns exactly np.percentile of those values.
+        """
+        values, weights = self.weighted_items()
+        if not len(values):
+            return np.full(len(qs), np.nan)
+        ranks = np.cumsum(weights) - (weights + 1) / 2
+        return np.interp(np.asarray(qs) * (weights.sum() - 1), ranks, values)
+
+
+class ColumnSummary:
+    """
+    Running count, sum and sum of squares of a column plus a quantile sketch of its values.
+    """
+
+    def __init__(self, sketch_size):
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.stale_values = 0
+        self.sketch = QuantileSketch(sketch_size)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.total_squares += float(np.square(values).sum())
+        self.sketch.update(values)
+
+    def remove(self, values):
+        values = np.asarray(values, dtype=float)
+        self.count -= len(values)
+        self.total -= float(values.sum())
+        self.total_squares -= float(np.square(values).sum())
+        self.stale_values += len(values)
+
+    def needs_rebuild(self):
+        return self.stale_values > REBUILD_FRACTION * max(self.count, 1)
+
+
+# (table, column) -> ColumnSummary, built on first use and then maintained from committed changes
+_summaries = {}
+# (table, column) -> number of write transactions seen, used to detect writes racing a build
+_write_epochs = {}
+# (table, statistics key, table version, exact) -> computed statistics
+_stats_cache = {}
+_lock = threading.Lock()
+
+
+def record_deltas(session, table_name, column, added=None, removed=None):
+    """
+    Queues values added to or removed from a tracked column by the current transaction of the session.
+    They are folded into the running summaries once the transaction commits.
+    """
+    if table_name not in TRACKED_COLUMNS:
+        return
+    with _lock:
+        _write_epochs[(table_name, column)] = _write_epochs.get((table_name, column), 0) + 1
+    session.info.setdefault(PENDING_DELTAS_KEY, []).append((table_name, column, added, removed))
+
+
+def record_bulk_insert(session, table_name, data):
+    """
+    Queues the rows of a Core bulk insert, mapper events do not see them.
+
+    Input: session, table_name (str), data (pandas DataFrame of the inserted rows).
+    """
+    if table_name not in TRACKED_COLUMNS:
+        return
+    for column in TRACKED_COLUMNS[table_name][1]:
+        if column in data:
+            record_deltas(session, table_name, column, added=data[column].to_numpy(dtype=float))
+
+
+def record_bulk_change(session, table_name):
+    """
+    Marks the summaries of a table for rebuild after a Core statement whose old values are unknown (upserts).
+    """
+    if table_name not in TRACKED_COLUMNS:
+        return
+    for column in TRACKED_COLUMNS[table_name][1]:
+        record_deltas(session, table_name, column)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_values(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        table_name = getattr(instance, '__tablename__', None)
+        if table_name not in TRACKED_COLUMNS:
+            continue
+        state = inspect(instance)
+        for column in TRACKED_COLUMNS[table_name][1]:
+            if instance in session.new:
+                record_deltas(session, table_name, column, added=[getattr(instance, column)])
+            elif instance in session.deleted:
+                record_deltas(session, table_name, column, removed=[getattr(instance, column)])
+            else:
+                history = state.attrs[column].history
+                if not history.has_changes():
+                    continue
+                if not history.deleted:
+                    # The previous value was never loaded, only a rebuild can drop it
+                    record_deltas(session, table_name, column)
+                else:
+                    record_deltas(session, table_name, column, added=history.added, removed=history.deleted)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed_values(session):
+    deltas = session.info.pop(PENDING_DELTAS_KEY, ())
+    with _lock:
+        for table_name, column, added, removed in deltas:
+            summary = _summaries.get((table_name, column))
+            if summary is None:
+                continue
+            if added is None and removed is None:
+                del _summaries[(table_name, column)]
+                continue
+            if removed is not None:
+                summary.remove([value for value in removed if value is not None])
+            if added is not None:
+                summary.add([value for value in added if value is not None])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_values(session):
+    session.info.pop(PENDING_DELTAS_KEY, None)
+
+
+def build_summary(table_name, column):
+    """
+    Scans a column once, batch by batch, into a new summary. The scan is retried when a write to
+    the column lands while it runs, since the scan may or may not have seen that write.
+
+    Returns the summary, or None when writes kept racing every attempt.
+    """
+    model = TRACKED_COLUMNS[table_name][0]
+    sketch_size = current_app.config.get('STATS_SKETCH_SIZE', DEFAULT_SKETCH_SIZE)
+    key = (table_name, column)
+
+    for _ in range(MAX_BUILD_ATTEMPTS):
+        epoch = _write_epochs.get(key, 0)
+        summary = ColumnSummary(sketch_size)
+        attribute = getattr(model, column)
+        # A session of its own: the scan neither commits nor sees the pending changes of the request session,
+        # and closing it ends the read transaction so the next attempt sees fresh data
+        with Session(db.engine) as session:
+            result = session.execute(select(attribute).where(attribute.isnot(None)).execution_options(
+                yield_per=BUILD_BATCH_SIZE))
+            for batch in result.scalars().partitions():
+                summary.add(batch)
+
+        with _lock:
+            if _write_epochs.get(key, 0) == epoch:
+                _summaries[key] = summary
+                return summary
+    return None
+
+
+def get_summary(table_name, column):
+    """
+    Returns the running summary of a tracked column, building or rebuilding it when needed.
+    """
+    summary = _summaries.get((table_name, column))
+    if summary is None or summary.needs_rebuild():
+        summary = build_summary(table_name, column)
+    return summary
+
+
+def get_cached_stats(table_name, key, exact):
+    return _stats_cache.get((table_name, key, get_table_version(table_name), exact))
+
+
+def store_cached_stats(table_name, key, exact, version, result):
+    """
+    Stores computed statistics under the table version read before computing them,
+    so a write that landed meanwhile makes the entry unreachable instead of stale.
+
+    The key is the column name, or a canonical form of the column, filters and grouping of the request.
+    """
+    with _lock:
+        if len(_stats_cache) >= MAX_CACHED_STATS:
+            _stats_cache.clear()
+        _stats_cache[(table_name, key, version, exact)] = result
+
+
+def exact_mode(attribute):
+    """
+    Most frequent value of a column, the smallest one on ties as in the exact statistics.
+    A sketch only keeps a sample of a continuous column, the value its items repeat most is not the mode.
+    """
+    count = func.count()
+    row = (
+        db.session.query(attribute, count)
+        .filter(attribute.isnot(None))
+        .group_by(attribute)
+        .order_by(count.desc(), attribute)
+        .first()
+    )
+    return row[0] if row else None
+
+
+def approximate_stats(table_name, column):
+    """
+    Mean from the running sum and count, median and quartiles from the quantile sketch (exact while the
+    sketch still holds every value). The mode is one GROUP BY query and outliers one range query on the IQR bounds.
+
+    Returns the statistics dictionary, or None when the column has no running summary.
+    """
+    if table_name not in TRACKED_COLUMNS or column not in TRACKED_COLUMNS[table_name][1]:
+        return None
+    summary = get_summary(table_name, column)
+    if summary is None:
+        return None
+    if summary.count < 2:
+        return {'error': 'Not enough data points to compute statistics'}
+
+    with _lock:
+        q1, median, q3 = summary.sketch.quantiles([0.25, 0.5, 0.75])
+        mean = summary.total / summary.count
+        count = summary.count
+    q1, median, q3 = round(float(q1), 1), round(float(median), 1), round(float(q3), 1)
+    iqr = q3 - q1
+    lower_bound = q1 - 1.5 * iqr
+    upper_bound = q3 + 1.5 * iqr
+
+    model = TRACKED_COLUMNS[table_name][0]
+    attribute = getattr(model, column)
+    mode = exact_mode(attribute)
+    max_outliers = current_app.config.get('STATS_MAX_OUTLIERS', 1000)
+    rows = (
+        db.session.query(attribute)
+        .filter((attribute < lower_bound) | (attribute > upper_bound))
+        .limit(max_outliers + 1)
+        .all()
+    )
+    outliers = [round(row[0], 1) for row in rows]
+
+    return {
+        "mean": round(mean, 1),
+        "median": median,
+        "mode": round(float(mode), 1) if mode is not None else None,
+        "q1": q1,
+        "q3": q3,
+        "outliers": outliers[:max_outliers],
+        "outliers_truncated": len(outliers) > max_outliers,
+        "count": count,
+        "approximate": True
+    }
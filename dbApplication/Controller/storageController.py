@@ -0,0 +1,221 @@
+import hashlib
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from io import BytesIO
+import cloudinary
+import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.uploader
+from flask import current_app
+from Controller.httpClientController import download
+
+DEFAULT_ROOT = os.path.join('uploads', 'images')
+
+
+class StorageBackend(ABC):
+    """
+    Interface of the image stores. Objects are addressed by a key, the public_id of the Image rows.
+
+    put(data, filename=None, key=None) stores bytes under a new key, or replaces the object of an existing key,
+    and returns {'key', 'url', 'size'}. get(key, url=None) returns the bytes, url is a hint that saves a lookup,
+    and raises FileNotFoundError for an unknown key.
+    delete(key) removes the object. stat(key) returns {'key', 'url', 'size'} or None when the key is unknown.
+    """
+
+    name = None
+
+    @abstractmethod
+    def put(self, data, filename=None, key=None):
+        pass
+
+    @abstractmethod
+    def get(self, key, url=None):
+        pass
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def stat(self, key):
+        pass
+
+
+class CloudinaryStorage(StorageBackend):
+    """
+    Images hosted on Cloudinary. Every call is a round trip to the Cloudinary API or CDN.
+    """
+
+    name = 'cloudinary'
+
+    def put(self, data, filename=None, key=None):
+        options = {'public_id': key, 'overwrite': True} if key else {}
+        result = cloudinary.uploader.upload(BytesIO(data), **options)
+        return {'key': result['public_id'], 'url': result['secure_url'], 'size': result.get('bytes', len(data))}
+
+    def get(self, key, url=None):
+        if url is None:
+            try:
+                url = cloudinary.api.resource(key)['secure_url']
+            except cloudinary.exceptions.NotFound:
+                raise FileNotFoundError(f'Unknown storage key: {key}')
+        return download(url)
+
+    def delete(self, key):
+        cloudinary.uploader.destroy(key)
+
+    def stat(self, key):
+        try:
+            resource = cloudinary.api.resource(key)
+        except cloudinary.exceptions.NotFound:
+            return None
+        return {'key': key, 'url': resource['secure_url'], 'size': resource.get('bytes')}
+
+
+class LocalStorage(StorageBackend):
+    """
+    Content-addressed store on the local filesystem, no network involved.
+
+    Bytes are written once under objects/<sha256>, identical uploads share the same file. A key is a
+    hard link refs/<key> to its object, so replacing a key is an atomic link swap and an object is removed
+    with the last key pointing to it. digests/<key> names the object of a key, so it is resolved without
+    reading the bytes. URLs carry the content hash, a new version of a key changes its URL.
+    """
+
+    name = 'local'
+
+    def __init__(self, root):
+        self.root = root
+        self.objects = os.path.join(root, 'objects')
+        self.refs = os.path.join(root, 'refs')
+        self.digests = os.path.join(root, 'digests')
+        for directory in (self.objects, self.refs, self.digests):
+            os.makedirs(directory, exist_ok=True)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def ref_path(self, key):
+        if not key or os.path.basename(key) != key or key.startswith('.'):
+            raise ValueError(f'Invalid storage key: {key}')
+        return os.path.join(self.refs, key)
+
+    def digest_path(self, key):
+        return os.path.join(self.digests, key)
+
+    def url(self, key, digest):
+        return f'/images/files/{key}?v={digest[:16]}'
+
+    def put(self, data, filename=None, key=None):
+        digest = hashlib.sha256(data).hexdigest()
+        if key is None:
+            extension = os.path.splitext(filename or '')[1].lower()
+            key = uuid.uuid4().hex + extension
+
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            with open(temporary_path, 'wb') as stored_file:
+                stored_file.write(data)
+            os.replace(temporary_path, path)
+
+        ref = self.ref_path(key)
+        previous = self.resolve(key)
+        temporary_ref = f'{ref}.{uuid.uuid4().hex}.tmp'
+        os.link(path, temporary_ref)
+        os.replace(temporary_ref, ref)
+        # The digest follows the bytes, a reader in between sees the new bytes under the old URL, never the reverse
+        self.write_digest(key, digest)
+        if previous and previous != digest:
+            self.release(previous)
+        return {'key': key, 'url': self.url(key, digest), 'size': len(data)}
+
+    def get(self, key, url=None):
+        with open(self.ref_path(key), 'rb') as stored_file:
+            return stored_file.read()
+
+    def delete(self, key):
+        digest = self.resolve(key)
+        if digest is None:
+            return
+        os.remove(self.ref_path(key))
+        try:
+            os.remove(self.digest_path(key))
+        except FileNotFoundError:
+            pass
+        self.release(digest)
+
+    def stat(self, key):
+        digest = self.resolve(key)
+        if digest is None:
+            return None
+        return {'key': key, 'url': self.url(key, digest), 'size': os.path.getsize(self.ref_path(key))}
+
+    def write_digest(self, key, digest):
+        path = self.digest_path(key)
+        temporary_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temporary_path, 'w') as digest_file:
+            digest_file.write(digest)
+        os.replace(temporary_path, path)
+
+    def resolve(self, key):
+        """
+        Returns the content hash a key points to, or None for an unknown key.
+
+        The recorded digest is trusted when its object is the very file the ref links to (same inode).
+        The bytes are only hashed when it is missing or behind (a store written before digests were
+        recorded, or a concurrent put), and the digest is recorded again.
+        """
+        ref = self.ref_path(key)
+        try:
+            ref_inode = os.stat(ref).st_ino
+        except FileNotFoundError:
+            return None
+        try:
+            with open(self.digest_path(key)) as digest_file:
+                digest = digest_file.read()
+            if os.stat(self.object_path(digest)).st_ino == ref_inode:
+                return digest
+        except (FileNotFoundError, ValueError):
+            pass
+
+        try:
+            with open(ref, 'rb') as stored_file:
+                digest = hashlib.sha256(stored_file.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+        self.write_digest(key, digest)
+        return digest
+
+    def release(self, digest):
+        """
+        Removes an object once no key links to it any more (only the object path itself is left).
+        """
+        path = self.object_path(digest)
+        if os.path.exists(path) and os.stat(path).st_nlink <= 1:
+            os.remove(path)
+
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def get_storage():
+    """
+    Returns the image storage backend selected by the IMAGE_STORAGE_BACKEND app config
+    ('cloudinary' or 'local', rooted at IMAGE_STORAGE_ROOT).
+    """
+    name = current_app.config.get('IMAGE_STORAGE_BACKEND', 'cloudinary')
+    root = current_app.config.get('IMAGE_STORAGE_ROOT', DEFAULT_ROOT)
+    with _lock:
+        if (name, root) not in _backends:
+            if name == 'cloudinary':
+                _backends[(name, root)] = CloudinaryStorage()
+            elif name == 'local':
+                _backends[(name, root)] = LocalStorage(root)
+            else:
+                raise ValueError(f'Unknown image storage backend: {name}')
+        return _backends[(name, root)]
@@ -4,12 +4,15 @@ from textblob import TextBlob
 import spacy
 from sklearn.manifold import TSNE
 from sklearn.feature_extraction.text import TfidfVectorizer
-import matplotlib.pyplot as plt
+from Controller.plottingController import encode_series, render_scatter
 import io
+from functools import lru_cache
 
 
-# Initialize the NLP model
-nlp = spacy.load("en_core_web_sm")
+# The NLP model is loaded on first use, importing the app (CLI commands, worker processes) does not pay for it
+@lru_cache(maxsize=None)
+def get_nlp():
+    return spacy.load("en_core_web_sm")
 
 def summarize_text(text):
     """
@@ -28,7 +31,7 @@ def summarize_text(text):
     Output:
         str: Summary consisting of the top 3 sentences containing named entities.
     """
-    doc = nlp(text)
+    doc = get_nlp()(text)
 
     # Extract sentences with named entities or keywords (basic extractive summarization)
     summary = [sent.text for sent in doc.sents if len(sent.ents) > 0]
@@ -54,7 +57,7 @@ def extract_keywords(text):
     """
     try:
         # Process the text using spaCy
-        doc = nlp(text)
+        doc = get_nlp()(text)
 
         # Extract keywords (Nouns and Proper Nouns)
         keywords = [token.text for token in doc if token.pos_ in ('NOUN', 'PROPN')]
@@ -111,13 +114,13 @@ def preprocess_text(text):
     Output:
         str: The preprocessed text with stopwords removed, non-alphabetic tokens filtered, and lemmatized.
     """
-    doc = nlp(text.lower())
+    doc = get_nlp()(text.lower())
 
     filtered_words = [token.lemma_ for token in doc if not token.is_stop and token.is_alpha]
 
     return " ".join(filtered_words)
 
-def generate_tsne_plot(texts):
+def generate_tsne_plot(texts, chart_format='png'):
     """
     Generate a t-SNE plot for visualizing high-dimensional text data.
 
@@ -126,13 +129,14 @@ def generate_tsne_plot(texts):
 
     Technologies used:
         - scikit-learn (for TF-IDF and t-SNE)
-        - matplotlib (for plotting)
+        - matplotlib (for plotting, through the thread-safe rendering module)
 
     Input:
         texts (list[str]): A list of text documents to analyze.
+        chart_format (str): 'png', 'svg', or 'json' for the 2D points without rendering.
 
     Output:
-        io.BytesIO: A bytes buffer containing the generated t-SNE plot as a PNG image.
+        io.BytesIO: A bytes buffer containing the generated t-SNE plot (PNG or SVG image, or JSON points).
     """
     try:
         # Convert texts to TF-IDF features
@@ -149,19 +153,12 @@ def generate_tsne_plot(texts):
         tsne = TSNE(n_components=2, random_state=42, perplexity=perplexity)
         X_tsne = tsne.fit_transform(tfidf_matrix.toarray())
 
- 
-        plt.figure(figsize=(8, 6))
-        plt.scatter(X_tsne[:, 0], X_tsne[:, 1], marker='o', c='blue') 
-        plt.title('t-SNE Visualization of Texts')
-        plt.xlabel('Component 1')
-        plt.ylabel('Component 2')
+        if chart_format == 'json':
+            return io.BytesIO(encode_series({'points': X_tsne.tolist()}))
 
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png')  
-        buffer.seek(0) 
-        plt.close()
-
-        return buffer
+        image = render_scatter(X_tsne, 't-SNE Visualization of Texts', 'Component 1', 'Component 2',
+                               image_format=chart_format)
+        return io.BytesIO(image)
     except Exception as e:
         raise Exception(f"Error generating t-SNE plot: {str(e)}")
 
@@ -178,7 +175,7 @@ def setCustomBoundaries(doc):
 
 # Function to create SpaCy document object from input text
 def getSpacyDocument(text):
-    return nlp(text)
+    return get_nlp()(text)
 
 # Method to find cosine similarity between two vectors
 def cosineSimilarity(vect1, vect2):
@@ -186,7 +183,7 @@ def cosineSimilarity(vect1, vect2):
 
 # Function to create keyword vectors using SpaCy
 def createKeywordsVectors(keyword):
-    doc = nlp(keyword)
+    doc = get_nlp()(keyword)
     return doc.vector
 
 # Method to find similar words based on a keyword
@@ -195,7 +192,7 @@ def getSimilarWords(keyword):
 
     keyword_vector = createKeywordsVectors(keyword)
 
-    for tokens in nlp.vocab:
+    for tokens in get_nlp().vocab:
         if tokens.has_vector:
             if tokens.is_lower and tokens.is_alpha:
                 similarity_list.append((tokens, cosineSimilarity(keyword_vector, tokens.vector)))
@@ -204,7 +201,7 @@ def getSimilarWords(keyword):
     top_similar_words = [item[0].text for item in similarity_list]
 
     top_similar_words.append(keyword)
-    for token in nlp(keyword):
+    for token in get_nlp()(keyword):
         top_similar_words.insert(0, token.lemma_)
 
     top_similar_words = list(set(top_similar_words))
@@ -212,8 +209,8 @@ def getSimilarWords(keyword):
 
 # Function to search for keyword in the document
 def search_for_keyword(keyword, doc_obj):
-    phrase_matcher = PhraseMatcher(nlp.vocab)
-    phrase_list = [nlp(keyword)]
+    phrase_matcher = PhraseMatcher(get_nlp().vocab)
+    phrase_list = [get_nlp()(keyword)]
     phrase_matcher.add("Text Extractor", None, *phrase_list)
 
     matched_items = phrase_matcher(doc_obj)
@@ -1,3 +1,5 @@
+import json
+from datetime import datetime
 from Models.dbModel import db
 
 class Image(db.Model):
@@ -7,6 +9,8 @@ class Image(db.Model):
     filename = db.Column(db.String(255), nullable=False)
     url = db.Column(db.String(500), nullable=False)
     public_id = db.Column(db.String(255), nullable=False, unique=True)
+    # Stored color histogram counts (see colorHistogramController), deferred: only the histogram code loads them
+    histograms = db.deferred(db.Column(db.JSON, nullable=True))
 
     def __repr__(self):
         return f"<Image {self.filename}>"
@@ -18,3 +22,41 @@ class Image(db.Model):
             "url": self.url,
             "public_id": self.public_id
         }
+
+
+class ImageVariant(db.Model):
+    __tablename__ = 'image_variants'
+    __table_args__ = (
+        db.UniqueConstraint('image_id', 'params_hash', name='uq_image_variants_image_params'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    image_id = db.Column(db.Integer, db.ForeignKey('images.id', ondelete='CASCADE'), nullable=False, index=True)
+    params_hash = db.Column(db.String(64), nullable=False)  # sha256 of the source URL and the transform parameters
+    params = db.Column(db.String(255), nullable=False)  # canonical JSON of the transform parameters
+    storage_key = db.Column(db.String(255), nullable=False)  # content-addressed key in the image store
+    url = db.Column(db.String(500), nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    image = db.relationship('Image', backref=db.backref('variants', lazy='dynamic', passive_deletes=True))
+
+    def __repr__(self):
+        return f"<ImageVariant image_id={self.image_id} {self.params}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "image_id": self.image_id,
+            "params": json.loads(self.params),
+            "url": self.url,
+            "storage_key": self.storage_key,
+            "format": self.format,
+            "width": self.width,
+            "height": self.height,
+            "size": self.size,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,51 @@
+from datetime import datetime
+from Models.dbModel import db
+
+class IngestJob(db.Model):
+    __tablename__ = 'ingest_jobs'
+
+    id = db.Column(db.String(36), primary_key=True)  # uuid4 hex
+    kind = db.Column(db.String(20), nullable=False)  # 'loans' or 'movies'
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    mode = db.Column(db.String(10), nullable=False, default='insert')  # 'insert' or 'upsert'
+    filename = db.Column(db.String(255), nullable=True)
+    filepath = db.Column(db.String(500), nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=True)
+    chunks = db.Column(db.Integer, nullable=False, default=0)
+    rows_read = db.Column(db.Integer, nullable=False, default=0)
+    rows_inserted = db.Column(db.Integer, nullable=False, default=0)
+    rows_dropped = db.Column(db.Integer, nullable=False, default=0)
+    rows_updated = db.Column(db.Integer, nullable=False, default=0)
+    rows_unchanged = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    owner = db.Column(db.String(100), nullable=True)  # host:pid:token of the process running the job
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Refreshed by the owner after every chunk
+
+    def __repr__(self):
+        return f"<IngestJob id={self.id} kind={self.kind} status={self.status}>"
+
+    def to_dict(self):
+        elapsed = None
+        if self.started_at:
+            elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "mode": self.mode,
+            "filename": self.filename,
+            "chunks": self.chunks,
+            "rows_read": self.rows_read,
+            "rows_inserted": self.rows_inserted,
+            "rows_dropped": self.rows_dropped,
+            "rows_updated": self.rows_updated,
+            "rows_unchanged": self.rows_unchanged,
+            "rows_per_sec": round((self.rows_read - self.rows_dropped) / elapsed, 1) if elapsed else None,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -2,11 +2,15 @@ from Models.dbModel import db
 
 class LoanApproval(db.Model):
     __tablename__ = 'loan_approval'
+    __table_args__ = (
+        # Serves loan_status equality filters alone and combined with a credit_score range
+        db.Index('ix_loan_approval_status_credit_score', 'loan_status', 'credit_score'),
+    )
 
     loan_id = db.Column(db.Integer, primary_key=True)  # Primary key
-    income = db.Column(db.Float, nullable=False)
+    income = db.Column(db.Float, nullable=False, index=True)
     loan_amount = db.Column(db.Float, nullable=False)
-    credit_score = db.Column(db.Integer, nullable=False)
+    credit_score = db.Column(db.Integer, nullable=False, index=True)
     loan_status = db.Column(db.String(20), nullable=False)
     asset_value = db.Column(db.Float, nullable=False)
 
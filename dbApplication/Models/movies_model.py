@@ -2,15 +2,19 @@ from Models.dbModel import db
 
 class Movies(db.Model):
     __tablename__ = 'movies'
+    __table_args__ = (
+        # Serves release_year equality filters alone and combined with a minimum rating
+        db.Index('ix_movies_release_year_rating', 'release_year', 'rating'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)  # Primary key
     title = db.Column(db.String(255), nullable=False)
     director = db.Column(db.String(255), nullable=False)
     release_year = db.Column(db.Integer, nullable=False)
     runtime = db.Column(db.Integer, nullable=False)
-    genre = db.Column(db.String(100), nullable=False)
-    rating = db.Column(db.Float, nullable=False)
-    gross = db.Column(db.Float, nullable=False)  # Changed column name
+    genre = db.Column(db.String(100), nullable=False)  # Partial match filter, an index would not serve it
+    rating = db.Column(db.Float, nullable=False, index=True)
+    gross = db.Column(db.Float, nullable=False, index=True)  # Changed column name
 
     def __repr__(self):
         return f"<Movies id={self.id} title={self.title}>"
@@ -1,7 +1,12 @@
 from flask import Blueprint, Response, request, jsonify
+from Controller.imageBatchController import batch_color_histograms, process_image_batch
+from Controller.colorHistogramController import image_color_histograms
+from Controller.featureIndexController import find_similar_images, index_missing_images
 from Controller.imageUploadController import (crop_image, transform_image, upload_image_to_cloudinary,fetch_image_from_db,
+                                              upload_images_to_cloudinary,
                                               fetch_images_with_pagination, generate_color_histogram,
-                                              generate_segmentation_mask)
+                                              generate_segmentation_mask, render_image, serve_stored_file)
+from Routes.route_utils import is_flag_requested
 
 # Create a blueprint for image routes
 image_routes = Blueprint('image_routes', __name__)
@@ -20,46 +25,48 @@ def upload_image():
     Input:
         Form-Data with:
         - "image" (file): The image file to be uploaded.
+        - "reject_duplicates" (bool, optional): Refuse the image when near-identical images exist (also a query parameter).
 
     Output:
         JSON response with:
         - "image_url" (str): URL of the uploaded image.
-        - HTTP status code.
+        - "image_id" (int): ID of the new image.
+        - "duplicates" (list[dict]): Near-identical images ("image_id", perceptual hash "distance" in bits).
+        - HTTP status code, 409 when the image was refused as a duplicate.
     """
     file = request.files.get('image')
     if not file:
         return jsonify({'error': 'No file part'}), 400
 
-    result, status_code = upload_image_to_cloudinary(file)
+    result, status_code = upload_image_to_cloudinary(file, is_flag_requested('reject_duplicates'))
     return jsonify(result), status_code
 
 # Route for uploading multiple images (batch upload)
 @image_routes.route('/upload_images', methods=['POST'])
 def upload_images():
     """
-    Upload multiple images.
+    Upload multiple images in parallel.
 
     Input:
         Form-Data with:
         - "images" (file[]): List of image files to be uploaded.
+        - "reject_duplicates" (bool, optional): Skip the images that have near-identical images (also a query parameter).
 
     Output:
         JSON response with:
-        - "message" (str): Success message.
-        - "image_urls" (list[str]): List of URLs for the uploaded images.
-        - HTTP status code.
+        - "message" (str): Summary message.
+        - "results" (list[dict]): Per-file status ("uploaded", "duplicate" or "failed"), image URL, duplicates
+          or error, and upload time.
+        - "uploaded" / "duplicates" / "failed" (int): Number of files in each state.
+        - "upload_seconds" / "elapsed_seconds" (float): Time spent uploading, and in total with the database insert.
+        - HTTP status code: 200, 207 when some uploads failed, 502 when all of them failed.
     """
     files = request.files.getlist('images')
     if not files:
         return jsonify({'error': 'No files provided'}), 400
 
-    image_urls = []
-    for file in files:
-        result, _ = upload_image_to_cloudinary(file)
-        if 'image_url' in result:
-            image_urls.append(result['image_url'])
-    
-    return jsonify({'message': 'Images uploaded successfully', 'image_urls': image_urls}), 200
+    result, status_code = upload_images_to_cloudinary(files, reject_duplicates=is_flag_requested('reject_duplicates'))
+    return jsonify(result), status_code
 
 # Route for fetching an image by public ID
 @image_routes.route('/fetch_image/<public_id>', methods=['GET'])
@@ -89,6 +96,9 @@ def fetch_images():
         Query Parameters:
         - "page" (int): Page number (default: 1).
         - "per_page" (int): Number of images per page (default: 10).
+        - "after" (str, optional): Cursor returned as "next_cursor" by the previous page (keyset pagination).
+        - "limit" (int, optional): Number of images per page in keyset pagination mode.
+        - "with_total" (bool, optional): Include the cached total count in keyset pagination mode.
 
     Output:
         JSON response with:
@@ -98,9 +108,14 @@ def fetch_images():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        after = request.args.get('after')
+        limit = request.args.get('limit', type=int)
+        with_total = is_flag_requested('with_total')
 
-        result = fetch_images_with_pagination(page, per_page)
+        result = fetch_images_with_pagination(page, per_page, after, limit, with_total)
         return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -113,11 +128,64 @@ def generate_histogram(db_id):
     Input:
         Path Parameter:
         - "db_id" (int): Database ID of the image.
+        Query Parameters:
+        - "format" (str, optional): "png" (default), "svg", or "json" for the 256 counts of every channel.
+
+    Output:
+        Histogram image or counts, with an ETag. A matching If-None-Match header gets 304 Not Modified.
+    """
+    return generate_color_histogram(db_id, request.args.get('format', 'png'))
+
+# Route returning the color histogram counts of an image
+@image_routes.route('/<int:image_id>/histogram', methods=['GET'])
+def color_histogram_counts(image_id):
+    """
+    Get the color histogram counts of an image as JSON. Counts are stored with the image,
+    repeated requests are answered without reading the image.
+
+    Input:
+        Path Parameter:
+        - "image_id" (int): ID of the image.
+        Query Parameters:
+        - "bins" (int, optional): Bins per channel, 1 to 256 (default: 256).
+        - "colorspaces" (str, optional): Comma separated list of "rgb" (default), "hsv" and "lab".
+        - "approximate" (bool, optional): Count a sample of the pixels of large images.
+
+    Output:
+        JSON response with:
+        - "histograms" (dict): Per colorspace, the counts of every channel, the number of pixels counted
+          and whether they were sampled.
+        - "cached" (bool): Whether every histogram was stored already.
+        - HTTP status code.
+    """
+    approximate = request.args.get('approximate', '').lower() in ('1', 'true', 'yes')
+    result, status_code = image_color_histograms(image_id, request.args.get('bins', 256),
+                                                 request.args.get('colorspaces'), approximate)
+    return jsonify(result), status_code
+
+# Route returning the color histogram counts of many images
+@image_routes.route('/histograms', methods=['POST'])
+def color_histogram_counts_batch():
+    """
+    Get the color histogram counts of many images as JSON, the missing ones are computed in parallel.
+
+    Input:
+        JSON Body:
+        - "image_ids" (list[int]): IDs of the images.
+        - "bins" (int, optional): Bins per channel, 1 to 256 (default: 256).
+        - "colorspaces" (list[str], optional): Any of "rgb" (default), "hsv" and "lab".
+        - "approximate" (bool, optional): Count a sample of the pixels of large images.
 
     Output:
-        PNG image of the histogram.
+        JSON response with:
+        - "results" (list[dict]): "image_id", "histograms" and "cached" per image, in request order.
+        - "not_found" (list[int]), "failed" (list[dict]): Images without histograms.
+        - "computed" (int): Number of images whose histograms were computed by this request.
+        - HTTP status code.
     """
-    return generate_color_histogram(db_id)
+    data = request.get_json(silent=True) or {}
+    result, status_code = batch_color_histograms(data)
+    return jsonify(result), status_code
 
 # Route for generating a segmentation mask
 @image_routes.route('/generate_segmentation/<int:db_id>', methods=['POST'])
@@ -205,3 +273,117 @@ def crop_image_route(image_id):
         return jsonify({'error': 'x, y, width, and height are required for cropping'}), 400
 
     return crop_image(image_id, x, y, width, height)
+
+# Route running an operation pipeline on many images
+@image_routes.route('/batch_process', methods=['POST'])
+def batch_process():
+    """
+    Run an operation pipeline on many images in parallel worker processes.
+
+    Input:
+        JSON Body:
+        - "image_ids" (list[int]): IDs of the images to process.
+        - "operations" (list[dict]): Steps applied in order, each with an "op":
+            - {"op": "resize", "width": 200, "height": 150} (one of width and height keeps the aspect ratio)
+            - {"op": "crop", "x": 0, "y": 0, "width": 100, "height": 100}
+            - {"op": "segment", "lower_bound": [35, 43, 46], "upper_bound": [77, 255, 255]}
+            - {"op": "histogram", "bins": 256}
+        - "format" (str, optional): Output image format, "png" (default), "jpeg" or "webp".
+
+    Output:
+        NDJSON stream with one line per image as soon as it is done:
+        - "image_id", "status" (processed, cached, failed or not_found), output "width" and "height".
+        - "url" and "variant_id" of the stored output image, "histograms" when requested, "error" on failure.
+        Followed by a "summary" line with the counts per status and the elapsed time.
+    """
+    data = request.get_json(silent=True) or {}
+    result = process_image_batch(data)
+    if isinstance(result, tuple):
+        return jsonify(result[0]), result[1]
+    return result
+
+# Route listing the images most similar to an image
+@image_routes.route('/similar/<int:image_id>', methods=['GET'])
+def similar_images(image_id):
+    """
+    Find the images most similar to an image, from the feature index built at upload.
+
+    Input:
+        Path Parameter:
+        - "image_id" (int): ID of the query image.
+        Query Parameters:
+        - "k" (int, optional): Number of results, 1 to 100 (default: 10).
+        - "by" (str, optional): "combined" (default), "phash" (perceptual hash, finds resized or re-encoded copies)
+          or "color" (color distribution).
+
+    Output:
+        JSON response with:
+        - "results" (list[dict]): "image_id", "phash_distance" (bits), "color_distance" and "score", best first.
+        - "indexed" (int): Number of indexed images, "search_ms" (float): Search time.
+        - HTTP status code.
+    """
+    result, status_code = find_similar_images(image_id, request.args.get('k', 10), request.args.get('by', 'combined'))
+    return jsonify(result), status_code
+
+# Route indexing the features of images uploaded before the feature index existed
+@image_routes.route('/features/reindex', methods=['POST'])
+def reindex_features():
+    """
+    Add the missing images to the feature index of /images/similar and of the duplicate check.
+
+    Input:
+        Query Parameters:
+        - "limit" (int, optional): Maximum number of missing images indexed by this call (default: 1000).
+        - "after" (int, optional): The "next_after" of the previous call.
+
+    Output:
+        JSON response with:
+        - "indexed" (int): Number of images in the index.
+        - "next_after" (int): Cursor of the next call, null once no images are left.
+        - "failed" (list[dict]): Images whose features could not be extracted.
+        - HTTP status code.
+    """
+    try:
+        result, status_code = index_missing_images(request.args.get('limit', 1000, type=int),
+                                                   request.args.get('after', 0, type=int))
+        return jsonify(result), status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route rendering a resized, cropped or converted variant of an image
+@image_routes.route('/<int:image_id>/render', methods=['GET'])
+def render(image_id):
+    """
+    Render a variant of an image on the fly. Variants are stored once and served from the cache afterwards,
+    the original image is never modified.
+
+    Input:
+        Path Parameter:
+        - "image_id" (int): ID of the image.
+        Query Parameters (at least one):
+        - "w" (int, optional): Output width.
+        - "h" (int, optional): Output height, the aspect ratio is kept when only one of w and h is given.
+        - "crop" (str, optional): Crop box "x,y,w,h", applied before the resize.
+        - "fmt" (str, optional): Output format ("png", "jpeg", "webp", "gif", "bmp"), defaults to the original format.
+
+    Output:
+        The variant image with an ETag, a matching If-None-Match header gets 304 Not Modified,
+        or an error message with the HTTP status code.
+    """
+    return render_image(image_id, request.args.get('w'), request.args.get('h'),
+                        request.args.get('crop'), request.args.get('fmt'))
+
+# Route serving the files of the local storage backend
+@image_routes.route('/files/<key>', methods=['GET'])
+def stored_file(key):
+    """
+    Serve a stored image file.
+
+    Input:
+        Path Parameter:
+        - "key" (str): Storage key (public ID) of the image.
+
+    Output:
+        The image bytes, or an error message with the HTTP status code.
+    """
+    return serve_stored_file(key)
@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify
+from Controller.jobController import get_job
+
+job_routes = Blueprint('job_routes', __name__)
+
+@job_routes.route('/<job_id>', methods=['GET'])
+def get_job_route(job_id):
+    """
+    Fetch the status of a background CSV ingestion job.
+
+    Input:
+        Path Parameter:
+        - "job_id" (str): The id returned by an async upload.
+
+    Output:
+        JSON response with:
+        - "status" (str): queued, running, succeeded or failed.
+        - Rows read, inserted and dropped, chunks processed, rows/sec and the error if any.
+        - HTTP status code.
+    """
+    response, status_code = get_job(job_id)
+    return jsonify(response), status_code
@@ -3,14 +3,21 @@ from Controller.loan_approvalController import (
     generate_bar_chart,
     generate_line_graph,
     upload_csv,
+    upload_csv_stream,
     create_loan,
     get_all_loans,
     get_loan_by_id,
     update_loan,
     delete_loan,
     filter_and_aggregate,
-    compute_advanced_stats
+    explain_filter,
+    export_loans,
+    compute_advanced_stats,
+    get_histogram
 )
+from Controller.jobController import submit_ingest_job
+from Controller.ingestionController import validate_csv_file
+from Routes.route_utils import is_flag_requested
 
 
 def register_routes(app, db):
@@ -22,15 +29,45 @@ def register_routes(app, db):
         Input:
             Form-Data with:
             - "file" (file): The CSV file to be uploaded.
+            - "chunk_size" (int, optional): Number of rows written per insert batch.
+            - "stream" (bool, optional): Parse, clean and insert the upload chunk by chunk instead of saving it first.
+            - "async" (bool, optional): Queue the upload as a background job and return its id immediately.
+            - "mode" (str, optional): "insert" (default) or "upsert" to update loans whose loan_id already exists.
+            Or a raw "text/csv" request body, which is always streamed straight from the request.
 
         Output:
-            JSON response indicating success or failure of the upload, along with the HTTP status code.
+            JSON response indicating success or failure of the upload with rows/sec and peak memory
+            (plus chunk and row counters in streaming mode, and inserted/updated/unchanged counts in upsert mode),
+            along with the HTTP status code.
+            In async mode a 202 response with the "job_id" to poll at /jobs/<job_id>.
         """
+        mode = request.form.get('mode', request.args.get('mode', 'insert'))
+        if mode not in ('insert', 'upsert'):
+            return jsonify({'error': f'Unsupported mode: {mode}'}), 400
+        upsert = mode == 'upsert'
+
+        chunk_size = request.args.get('chunk_size', type=int)
+        if request.mimetype == 'text/csv':
+            if is_flag_requested('async'):
+                response, status_code = submit_ingest_job('loans', request.stream, chunk_size=chunk_size, upsert=upsert)
+            else:
+                response, status_code = upload_csv_stream(request.stream, chunk_size, upsert)
+            return jsonify(response), status_code
+
         if 'file' not in request.files:
             return jsonify({'error': 'No file part'}), 400
 
         file = request.files['file']
-        response, status_code = upload_csv(file)
+        error = validate_csv_file(file)
+        if error:
+            return jsonify(error[0]), error[1]
+        chunk_size = request.form.get('chunk_size', chunk_size, type=int)
+        if is_flag_requested('async'):
+            response, status_code = submit_ingest_job('loans', file.stream, file.filename, chunk_size, upsert)
+        elif is_flag_requested('stream'):
+            response, status_code = upload_csv_stream(file.stream, chunk_size, upsert)
+        else:
+            response, status_code = upload_csv(file, chunk_size, upsert)
         return jsonify(response), status_code
 
     @app.route('/loan_approval', methods=['POST'])
@@ -56,8 +93,25 @@ def register_routes(app, db):
 
     @app.route('/loan_approval', methods=['GET'])
     def get_all_loans_route():
+        """
+        List loan approval records.
+
+        Input:
+            Query Parameters:
+            - "page" (int, optional): Page number (OFFSET pagination, default: 1).
+            - "after" (str, optional): Cursor returned as "next_cursor" by the previous page (keyset pagination).
+            - "limit" (int, optional): Page size in keyset pagination mode.
+            - "with_total" (bool, optional): Include the cached total count in keyset pagination mode.
+
+        Output:
+            JSON response with the loans and pagination metadata.
+        """
         page = request.args.get('page', 1, type=int)
-        response = get_all_loans(page)
+        try:
+            response = get_all_loans(page, after=request.args.get('after'), limit=request.args.get('limit', type=int),
+                                     with_total=is_flag_requested('with_total'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         return jsonify(response)
 
     @app.route('/loan_approval/<int:loan_id>', methods=['GET'])
@@ -89,7 +143,14 @@ def register_routes(app, db):
                 - "operator" (str): The comparison operator (e.g., "equals", "greater_than").
             - "aggregate_type" (str, optional): Aggregation type (e.g., "avg", "sum").
             - "field" (str, optional): The column on which to perform aggregation.
+            - "aggregates" (list[dict], optional): Several aggregations computed in one query, each with
+                - "type" (str): One of "sum", "avg", "min", "max", "count", "stddev".
+                - "field" (str): The numeric column to aggregate.
+            - "group_by" (list, optional): "loan_status" and/or {"column": "income", "bucket_size": 100000}
+              to group numeric columns into buckets.
             - "page" (int, optional): Page number for paginated results.
+            - "after" (str, optional) / "limit" (int, optional): Keyset pagination cursor and page size.
+            - "with_total" (bool, optional): Include the cached total count in keyset pagination mode.
 
         Output:
             JSON response with filtered or aggregated data, along with the HTTP status code.
@@ -99,6 +160,41 @@ def register_routes(app, db):
         return jsonify(response), status_code
 
 
+    @app.route('/loan_approval/export', methods=['POST'])
+    def export_route():
+        """
+        Export every loan matching the filters in one streamed response.
+
+        Input:
+            JSON object with:
+            - "filters" (list[dict], optional): The same filter conditions as /loan_approval/filter.
+            Query Parameter:
+            - "format" (str, optional): "ndjson" (default) or "csv".
+
+        Output:
+            Streamed NDJSON or CSV attachment, or a JSON error with its HTTP status code.
+        """
+        data = request.get_json(silent=True) or {}
+        export_format = request.args.get('format', data.get('format', 'ndjson'))
+        return export_loans(data, export_format)
+
+    @app.route('/loan_approval/explain', methods=['POST'])
+    def explain_route():
+        """
+        Show which index the database uses for a combination of loan filters.
+
+        Input:
+            JSON object with the same keys as /loan_approval/filter ("filters", and optionally
+            "aggregates" or "aggregate_type"/"field" and "group_by").
+
+        Output:
+            JSON response with the SQL, the query plan lines, the indexes used and whether the plan
+            scans the whole table, along with the HTTP status code.
+        """
+        data = request.get_json() or {}
+        response, status_code = explain_filter(data)
+        return jsonify(response), status_code
+
     @app.route('/loan_approval/stats', methods=['POST'])
     def stats_route():
         """
@@ -107,6 +203,11 @@ def register_routes(app, db):
         Input:
             JSON object with:
             - "column_name" (str): The column for which to compute statistics (e.g., "income").
+            - "exact" (bool, optional): Scan the whole column instead of answering from the running
+              summary and quantile sketch. Also accepted as the ?exact=true query argument.
+            - "filters" (list[dict], optional): The same filter conditions as /loan_approval/filter.
+            - "group_by" (list, optional): "loan_status" and/or {"column": "income", "bucket_size": 100000},
+              the statistics are then returned per group.
 
         Output:
             JSON response with statistics or an error message if the column is not provided, along with the HTTP status code.
@@ -116,7 +217,9 @@ def register_routes(app, db):
             return jsonify({"error": "Please provide a 'column_name' in the request body"}), 400
 
         column_name = data["column_name"]
-        response, status_code = compute_advanced_stats(column_name)
+        exact = data.get("exact") in (True, "true", "1") or is_flag_requested('exact')
+        response, status_code = compute_advanced_stats(column_name, exact=exact, filters=data.get("filters"),
+                                                       group_by=data.get("group_by"))
         return jsonify(response), status_code
 
 
@@ -128,16 +231,43 @@ def register_routes(app, db):
         Input:
             JSON object with:
             - "column_name" (str): The column for which to generate the bar chart.
+            - "bins" (int, optional): Number of bins (default: 10).
+            - "format" (str, optional): "png" (default), "svg", or "json" for the bin edges and counts without
+              rendering. Also accepted as the ?format= query argument.
 
         Output:
             The generated bar chart or an error message if the column is not provided.
+            The PNG carries an ETag, a request with a matching If-None-Match header gets 304 Not Modified.
         """
         data = request.get_json()
         if not data or "column_name" not in data:
             return jsonify({"error": "Please provide a 'column_name' in the request body"}), 400
 
         column_name = data["column_name"]
-        return generate_bar_chart(column_name)
+        chart_format = data.get("format", request.args.get("format", "png"))
+        return generate_bar_chart(column_name, data.get("bins", 10), chart_format)
+
+
+    @app.route('/loan_approval/histogram', methods=['POST'])
+    def histogram_route():
+        """
+        Compute the histogram of a numeric column in the loan approval dataset without rendering it.
+        The binning runs in the database, so the cost does not grow with the size of the table.
+
+        Input:
+            JSON object with:
+            - "column_name" (str): The column to bin.
+            - "bins" (int, optional): Number of bins (default: 10).
+
+        Output:
+            JSON response with "edges", "counts" and "total", or an error message, along with the HTTP status code.
+        """
+        data = request.get_json()
+        if not data or "column_name" not in data:
+            return jsonify({"error": "Please provide a 'column_name' in the request body"}), 400
+
+        response, status_code = get_histogram(data["column_name"], data.get("bins", 10))
+        return jsonify(response), status_code
 
 
     @app.route('/loan_approval/graph', methods=['POST'])
@@ -148,15 +278,19 @@ def register_routes(app, db):
         Input:
             JSON object with:
             - "column_name" (str): The column for which to generate the line graph.
+            - "format" (str, optional): "png" (default), "svg", or "json" for the sampled [index, value] points
+              without rendering. Also accepted as the ?format= query argument.
 
         Output:
             The generated line graph or an error message if the column is not provided.
+            The PNG carries an ETag, a request with a matching If-None-Match header gets 304 Not Modified.
         """
         data = request.get_json()
         if not data or "column_name" not in data:
             return jsonify({"error": "Please provide a 'column_name' in the request body"}), 400
 
         column_name = data["column_name"]
-        return generate_line_graph(column_name)
+        chart_format = data.get("format", request.args.get("format", "png"))
+        return generate_line_graph(column_name, chart_format)
 
 
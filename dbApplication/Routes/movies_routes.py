@@ -1,12 +1,50 @@
 from flask import Blueprint, request, jsonify
 
-from Controller.moviesController import (filter_movies, search_movies, upload_csv,create_movie, delete_movie, get_all_movies, get_movie_by_id, update_movie)
+from Routes.route_utils import is_flag_requested
+from Controller.jobController import submit_ingest_job
+from Controller.ingestionController import validate_csv_file
+from Controller.moviesController import (explain_movie_filter, export_movies, filter_movies, search_movies, upload_csv, upload_csv_stream,create_movie, delete_movie, get_all_movies, get_movie_by_id, update_movie)
 
 movies_bp = Blueprint('movies', __name__)
 
 @movies_bp.route('/upload_csv', methods=['POST'])
 def upload_csv_route():
-    file = request.files.get('file')
+    """
+    Upload a movies CSV file.
+
+    Input:
+        Form-Data with:
+        - "file" (file): The CSV file to be uploaded.
+        - "stream" (bool, optional): Parse, clean and insert the upload chunk by chunk instead of saving it first.
+        - "chunk_size" (int, optional): Rows per chunk in streaming mode.
+        - "async" (bool, optional): Queue the upload as a background job and return its id immediately.
+        Or a raw "text/csv" request body, which is always streamed straight from the request.
+
+    Output:
+        JSON response with a success message (plus chunk and row counters in streaming mode) or error details.
+        In async mode a 202 response with the "job_id" to poll at /jobs/<job_id>.
+    """
+    if request.form.get('mode', request.args.get('mode', 'insert')) != 'insert':
+        return jsonify({'error': 'Movies uploads only support the insert mode'}), 400
+
+    chunk_size = request.args.get('chunk_size', type=int)
+    if request.mimetype == 'text/csv':
+        if is_flag_requested('async'):
+            return submit_ingest_job('movies', request.stream, chunk_size=chunk_size)
+        return upload_csv_stream(request.stream, chunk_size)
+
+    if 'file' not in request.files:
+        return {'error': 'No file part'}, 400
+
+    file = request.files['file']
+    error = validate_csv_file(file)
+    if error:
+        return error
+    chunk_size = request.form.get('chunk_size', chunk_size, type=int)
+    if is_flag_requested('async'):
+        return submit_ingest_job('movies', file.stream, file.filename, chunk_size)
+    if is_flag_requested('stream'):
+        return upload_csv_stream(file.stream, chunk_size)
     return upload_csv(file)
 
 @movies_bp.route('/add', methods=['POST'])
@@ -16,9 +54,17 @@ def create_movie_route():
 
 @movies_bp.route('/', methods=['GET'])
 def get_all_movies_route():
+    """
+    List movies with page/per_page pagination, or keyset pagination when "after" (cursor) or "limit" is given.
+    "with_total" adds the cached total count in keyset mode.
+    """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
-    return jsonify(get_all_movies(page, per_page))
+    try:
+        return jsonify(get_all_movies(page, per_page, request.args.get('after'), request.args.get('limit', type=int),
+                                      is_flag_requested('with_total')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @movies_bp.route('/<int:movie_id>', methods=['GET'])
 def get_movie_route(movie_id):
@@ -70,6 +116,9 @@ def filter_moviesroute():
         - "min_rating" (float, optional): Minimum rating to filter by.
         - "page" (int, optional): Page number for pagination (default: 1).
         - "per_page" (int, optional): Number of items per page (default: 20).
+        - "after" (str, optional): Cursor returned as "next_cursor" by the previous page (keyset pagination).
+        - "limit" (int, optional): Page size in keyset pagination mode.
+        - "with_total" (bool, optional): Include the cached total count in keyset pagination mode.
 
     Output:
         JSON response with:
@@ -82,6 +131,59 @@ def filter_moviesroute():
     min_rating = request.args.get('min_rating', default=None, type=float)
     page = request.args.get('page', default=1, type=int)
     per_page = request.args.get('per_page', default=20, type=int)
-
-    filtered_movies = filter_movies(genre, release_year, min_gross, min_rating, page, per_page)
+    after = request.args.get('after', default=None, type=str)
+    limit = request.args.get('limit', default=None, type=int)
+
+    try:
+        filtered_movies = filter_movies(genre, release_year, min_gross, min_rating, page, per_page,
+                                        after, limit, is_flag_requested('with_total'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(filtered_movies), 200
+
+
+@movies_bp.route('/export', methods=['GET'])
+def export_moviesroute():
+    """
+    Export every movie matching the filters in one streamed response.
+
+    Input:
+        Query Parameters:
+        - The same filters as /movies/filter ("genre", "release_year", "min_gross", "min_rating").
+        - "format" (str, optional): "ndjson" (default) or "csv".
+
+    Output:
+        Streamed NDJSON or CSV attachment, or a JSON error with its HTTP status code.
+    """
+    genre = request.args.get('genre', default=None, type=str)
+    release_year = request.args.get('release_year', default=None, type=int)
+    min_gross = request.args.get('min_gross', default=None, type=float)
+    min_rating = request.args.get('min_rating', default=None, type=float)
+    export_format = request.args.get('format', default='ndjson', type=str)
+
+    return export_movies(genre, release_year, min_gross, min_rating, export_format)
+
+
+@movies_bp.route('/explain', methods=['GET'])
+def explain_moviesroute():
+    """
+    Show which index the database uses for a combination of movie filters.
+
+    Input:
+        Query Parameters: The same filters as /movies/filter ("genre", "release_year", "min_gross", "min_rating").
+
+    Output:
+        JSON response with:
+        - "sql" (str): The filter query.
+        - "plan" (list[str]): The query plan lines.
+        - "indexes_used" (list[str]): Names of the indexes used by the plan.
+        - "full_scan" (bool): Whether the plan scans the whole table.
+        - HTTP status code.
+    """
+    genre = request.args.get('genre', default=None, type=str)
+    release_year = request.args.get('release_year', default=None, type=int)
+    min_gross = request.args.get('min_gross', default=None, type=float)
+    min_rating = request.args.get('min_rating', default=None, type=float)
+
+    response, status_code = explain_movie_filter(genre, release_year, min_gross, min_rating)
+    return jsonify(response), status_code
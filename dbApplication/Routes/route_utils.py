@@ -0,0 +1,9 @@
+from flask import request
+
+
+def is_flag_requested(name):
+    """
+    Returns True when a boolean option such as "stream" or "async" is set in the form data or query arguments.
+    """
+    value = request.form.get(name, request.args.get(name, ''))
+    return value.lower() in ('1', 'true', 'yes')
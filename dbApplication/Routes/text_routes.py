@@ -1,5 +1,6 @@
 from flask import Blueprint, Response, request, jsonify
 from Controller.textController import ( summarize_text, extract_keywords, analyze_sentiment, generate_tsne_plot)
+from Controller.plottingController import CHART_FORMATS, validate_chart_format
 
 text_routes = Blueprint('text_routes', __name__)
 
@@ -59,8 +60,14 @@ def generate_tsne():
         if not texts or len(texts) < 2:
             return jsonify({'error': 'Please provide at least two text inputs'}), 400
 
-        buffer = generate_tsne_plot(texts)
-        return Response(buffer, mimetype='image/png')
+        # "png" (default), "svg", or "json" for the 2D points without rendering
+        chart_format = data.get('format', request.args.get('format', 'png'))
+        error = validate_chart_format(chart_format)
+        if error:
+            return jsonify(error[0]), error[1]
+
+        buffer = generate_tsne_plot(texts, chart_format)
+        return Response(buffer, mimetype=CHART_FORMATS[chart_format])
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
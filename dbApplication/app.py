@@ -6,20 +6,60 @@ from Models.dbModel import db
 from Routes.image_routes import image_routes 
 from Routes.text_routes import text_routes
 from Routes.movies_routes import movies_bp
+from Routes.job_routes import job_routes
+from Controller.jobController import recover_jobs_command
 
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///./testdb.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False 
+    app.config['INGEST_CHUNK_SIZE'] = 5000  # Rows per bulk insert batch
+    app.config['INGEST_TRACK_MEMORY'] = False  # Report peak memory of uploads (tracemalloc slows down the whole process)
+    app.config['INGEST_JOB_WORKERS'] = 2  # Background ingestion threads
+    app.config['INGEST_JOB_HEARTBEAT_TIMEOUT'] = 300  # Seconds without progress before a running job counts as orphaned
+    app.config['MAX_PAGE_LIMIT'] = 1000  # Largest page size of keyset pagination
+    app.config['COUNT_CACHE_TTL'] = 60  # Seconds a cached listing count stays valid
+    app.config['EXPORT_BATCH_SIZE'] = 1000  # Rows fetched and serialized per export chunk
+    app.config['STATS_SKETCH_SIZE'] = 1024  # Items per level of the quantile sketch behind /loan_approval/stats
+    app.config['STATS_MAX_OUTLIERS'] = 1000  # Outliers listed by approximate statistics
+    app.config['CHART_CACHE_MAX_BYTES'] = 64 * 1024 * 1024  # In-process budget of the rendered chart cache
+    app.config['GRAPH_MAX_POINTS'] = 1000  # Samples plotted by /loan_approval/graph, about the chart width in pixels
+    app.config['IMAGE_UPLOAD_CONCURRENCY'] = 8  # Parallel uploads of /images/upload_images
+    app.config['IMAGE_STORAGE_BACKEND'] = 'cloudinary'  # Image store: 'cloudinary' or 'local' (content-addressed files)
+    app.config['IMAGE_STORAGE_ROOT'] = 'uploads/images'  # Root directory of the local image store
+    app.config['IMAGE_CACHE_MAX_BYTES'] = 256 * 1024 * 1024  # In-process budget of decoded image arrays
+    app.config['IMAGE_CACHE_DIR'] = 'uploads/image_cache'  # On-disk cache of remote image bytes, disabled when None
+    app.config['IMAGE_CACHE_DIR_MAX_BYTES'] = 1024 * 1024 * 1024  # Budget of the on-disk image cache, least recently used files are evicted
+    app.config['HTTP_POOL_CONNECTIONS'] = 10  # Hosts kept in the pooled HTTP session
+    app.config['HTTP_POOL_MAXSIZE'] = 16  # Kept-alive connections per host
+    app.config['HTTP_CONNECT_TIMEOUT'] = 3.05  # Seconds
+    app.config['HTTP_READ_TIMEOUT'] = 10  # Seconds between bytes of a response
+    app.config['HTTP_RETRIES'] = 3  # Retries of failed GETs, with exponential backoff
+    app.config['HTTP_RETRY_BACKOFF'] = 0.3
+    app.config['MAX_DOWNLOAD_BYTES'] = 25 * 1024 * 1024  # Largest image download accepted
+    app.config['IMAGE_VARIANT_MAX_SIDE'] = 4096  # Largest width or height of a rendered image variant
+    app.config['IMAGE_PROCESS_WORKERS'] = None  # Processes of /images/batch_process, one per core when None
+    app.config['IMAGE_BATCH_MAX_IDS'] = 10000  # Largest number of images in one batch
+    app.config['IMAGE_PREFETCH_WORKERS'] = 8  # Parallel downloads of the images of a batch missing from the image cache
+    app.config['IMAGE_BUFFER_DIR'] = None  # Shared image buffers of the batch workers, /dev/shm when None
+    app.config['IMAGE_HISTOGRAM_APPROX_PIXELS'] = 512 * 512  # Pixels sampled by approximate color histograms
+    app.config['IMAGE_FEATURE_INDEX_DIR'] = 'uploads/feature_index'  # Perceptual hash and color vector index of the images
+    app.config['IMAGE_DUPLICATE_MAX_DISTANCE'] = 4  # Perceptual hash bits two duplicate images may differ by
+    if config:
+        app.config.update(config)  # Overrides, e.g. a test database
     db.init_app(app)  # Bind SQLAlchemy to the app
 
     register_routes(app, db)
     app.register_blueprint(image_routes, url_prefix='/images')
     app.register_blueprint(text_routes, url_prefix='/text')
     app.register_blueprint(movies_bp, url_prefix='/movies')
+    app.register_blueprint(job_routes, url_prefix='/jobs')
     
 
     migrate = Migrate(app, db)
+    # Building the app has no side effects, orphaned jobs are recovered by the server process (run.py)
+    # or with "flask recover-jobs"
+    app.cli.add_command(recover_jobs_command)
 
     return app
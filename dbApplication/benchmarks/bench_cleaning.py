@@ -0,0 +1,57 @@
+"""
+Benchmark of the CSV cleaning stage: per-cell applymap stripping versus the
+column-wise vectorized pipeline in Controller/cleaningController.py.
+
+The bundled uploads/*.csv datasets are repeated SCALE times (1000x by default).
+
+Usage (from the dbApplication directory):
+    python benchmarks/bench_cleaning.py [scale]
+"""
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Controller.cleaningController import LOAN_SCHEMA, MOVIE_SCHEMA, clean_frame
+
+UPLOADS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+DATASETS = [
+    ('loans', 'loan_approval_dataset_modified_200.csv', LOAN_SCHEMA, ['income', 'loan_amount', 'credit_score', 'asset_value']),
+    ('movies', 'cleaned_imdb (1).csv', MOVIE_SCHEMA, None),
+]
+
+
+def legacy_clean(data, schema, round_columns):
+    """The cleaning previously done inline in upload_csv."""
+    per_cell = data.map if hasattr(data, 'map') else data.applymap
+    data = per_cell(lambda x: x.strip() if isinstance(x, str) else x)
+    data = data.dropna(subset=list(schema))
+    if round_columns:
+        data[round_columns] = data[round_columns].round(1)
+    return data
+
+
+def best_of(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(scale=1000):
+    for name, filename, schema, round_columns in DATASETS:
+        base = pd.read_csv(os.path.join(UPLOADS, filename))
+        data = pd.concat([base] * scale, ignore_index=True)
+
+        legacy = best_of(lambda: legacy_clean(data, schema, round_columns))
+        vectorized = best_of(lambda: clean_frame(data, schema, round_columns=round_columns))
+        print(f'{name:<7} rows={len(data):>9,}  applymap={legacy:8.3f}s  vectorized={vectorized:8.3f}s  '
+              f'speedup={legacy / vectorized:6.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,73 @@
+"""
+Benchmark of the color histogram counts of decoded images: channel_counts (Controller/colorHistogramController.py,
+chunked per-channel np.bincount on uint8 views) versus cv2.calcHist, one call per channel, and versus the
+previous single bincount over a fancy-indexed (pixels, 3) lookup, which allocated an int64 temporary of
+24 bytes per pixel.
+
+Every method is checked against channel_counts before it is timed.
+
+Usage (from the dbApplication directory):
+    python benchmarks/bench_color_histogram.py [repeats]
+"""
+import os
+import sys
+import time
+import tracemalloc
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Controller.colorHistogramController import bin_lookup, channel_counts
+
+SIZES = {'640x480': (480, 640), '1080p': (1080, 1920), '4K': (2160, 3840)}
+BINS = (256, 32)
+RANGES = (256, 256, 256)
+
+
+def calc_hist_counts(image, bins, ranges):
+    # calcHist bins are half-open [0, range) intervals of equal width, as bin_lookup
+    return np.stack([cv2.calcHist([image], [channel], None, [bins], [0, value_range]).ravel().astype(np.int64)
+                     for channel, value_range in enumerate(ranges)])
+
+
+def fancy_index_counts(image, bins, ranges):
+    lookup = np.stack([bin_lookup(bins, value_range) + channel * bins for channel, value_range in enumerate(ranges)])
+    slots = lookup[np.arange(3), image.reshape(-1, 3)]
+    return np.bincount(slots.ravel(), minlength=3 * bins).reshape(3, bins)
+
+
+METHODS = {'channel_counts': channel_counts, 'cv2.calcHist': calc_hist_counts, 'fancy index': fancy_index_counts}
+
+
+def measure(method, image, bins, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        method(image, bins, RANGES)
+    seconds = (time.perf_counter() - start) / repeats
+
+    tracemalloc.start()
+    method(image, bins, RANGES)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(repeats=5):
+    rng = np.random.default_rng(0)
+    for size, shape in SIZES.items():
+        image = rng.integers(0, 256, (*shape, 3), dtype=np.uint8)
+        megapixels = shape[0] * shape[1] / 1e6
+        for bins in BINS:
+            expected = channel_counts(image, bins, RANGES)
+            results = []
+            for name, method in METHODS.items():
+                assert np.array_equal(method(image, bins, RANGES), expected), name
+                seconds, peak = measure(method, image, bins, repeats)
+                results.append(f'{name}={seconds * 1000:7.1f}ms ({megapixels / seconds:6.0f}MP/s, '
+                               f'peak {peak / 1e6:6.1f}MB)')
+            print(f'{size:<8} bins={bins:<4} ' + '  '.join(results))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
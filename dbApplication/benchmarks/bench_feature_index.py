@@ -0,0 +1,69 @@
+"""
+Benchmark of the image feature index (Controller/featureIndexController.py) at scale: builds an index
+of synthetic descriptors (random perceptual hashes and normalized color vectors), then times the
+/images/similar top-k search for every measure, the duplicate check of an upload, an id lookup
+and a single append.
+
+Usage (from the dbApplication directory):
+    python benchmarks/bench_feature_index.py [images] [index_dir]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Controller.featureIndexController import SIMILARITY_MEASURES, VECTOR_DIM, FeatureIndex
+
+BATCH = 100000
+REPEATS = 20
+
+
+def synthetic_features(rng, count):
+    hashes = rng.integers(0, 2 ** 63, count, dtype=np.int64).astype(np.uint64) * np.uint64(2)
+    vectors = rng.random((count, VECTOR_DIM), dtype=np.float32)
+    vectors /= vectors.sum(axis=1, keepdims=True)
+    return hashes, vectors
+
+
+def milliseconds(function):
+    function()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        function()
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main(images=1000000, directory=None):
+    directory = directory or tempfile.mkdtemp(prefix='feature-index-')
+    rng = np.random.default_rng(0)
+    index = FeatureIndex(directory)
+
+    start = time.perf_counter()
+    for offset in range(0, images, BATCH):
+        count = min(BATCH, images - offset)
+        hashes, vectors = synthetic_features(rng, count)
+        index.add([(offset + i + 1, {'phash': int(hashes[i]), 'color': vectors[i]}) for i in range(count)])
+    print(f'{index.count} images indexed in {time.perf_counter() - start:.1f}s, files in {directory}')
+
+    query = {'phash': int(index.hashes[images // 2]), 'color': np.array(index.vectors[images // 2])}
+    for by in SIMILARITY_MEASURES:
+        print(f'similar top-10 by {by:<8} {milliseconds(lambda: index.search(query, 10, by)):8.2f} ms')
+    print(f'duplicate check          {milliseconds(lambda: index.duplicates(query["phash"], 4)):8.2f} ms')
+    print(f'id lookup                {milliseconds(lambda: index.row_of(images // 2)):8.2f} ms')
+
+    hashes, vectors = synthetic_features(rng, REPEATS + 1)
+    next_id = iter(range(images + 1, images + REPEATS + 2))
+    append = milliseconds(lambda: index.add([(next(next_id), {'phash': int(hashes[0]), 'color': vectors[0]})]))
+    print(f'append one image         {append:8.2f} ms')
+
+    if len(sys.argv) <= 2:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+         sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,75 @@
+"""
+Benchmark of chart rendering throughput: the previous pyplot code path (global state, one new
+figure per chart, serialized behind a lock since pyplot is not thread-safe) versus the pooled, reusable
+figure templates of Controller/plottingController.py, at 1, 4 and 16 threads. Both paths draw the same
+pre-binned histogram counts and the same sorted series, so only the rendering differs.
+
+Usage (from the dbApplication directory):
+    python benchmarks/bench_plotting.py [charts_per_run]
+"""
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Controller.plottingController import render_histogram, render_lines
+
+THREAD_COUNTS = [1, 4, 16]
+VALUES = np.random.default_rng(0).lognormal(11, 0.5, 10000)
+COUNTS, EDGES = np.histogram(VALUES, bins=10)
+SORTED = np.sort(VALUES)[::10]
+
+_pyplot_lock = threading.Lock()
+
+
+def pyplot_chart(i):
+    """The rendering previously done inline in the controllers, fed the same data as the templates."""
+    with _pyplot_lock:
+        plt.figure(figsize=(10, 6))
+        if i % 2:
+            plt.bar(EDGES[:-1], COUNTS, width=np.diff(EDGES), align='edge', color='blue', edgecolor='black',
+                    alpha=0.7)
+        else:
+            plt.plot(SORTED, color='blue', alpha=0.7)
+        plt.title('Distribution of income')
+        plt.xlabel('Income')
+        plt.ylabel('Frequency')
+        buffer = io.BytesIO()
+        plt.savefig(buffer, format='png')
+        plt.close()
+        return buffer.getvalue()
+
+
+def template_chart(i):
+    if i % 2:
+        return render_histogram(COUNTS, EDGES, 'Distribution of income', 'Income')
+    return render_lines([{'y': SORTED, 'color': 'blue', 'alpha': 0.7}], 'Line Graph of income', 'Index', 'Income')
+
+
+def charts_per_second(render, threads, charts):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        # Warm up the template pool so template construction is not part of the measurement
+        list(executor.map(render, range(threads * 2)))
+        start = time.perf_counter()
+        list(executor.map(render, range(charts)))
+        return charts / (time.perf_counter() - start)
+
+
+def main(charts=200):
+    for threads in THREAD_COUNTS:
+        legacy = charts_per_second(pyplot_chart, threads, charts)
+        templates = charts_per_second(template_chart, threads, charts)
+        print(f'threads={threads:>2}  pyplot={legacy:7.1f} charts/s  templates={templates:7.1f} charts/s  '
+              f'speedup={templates / legacy:5.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
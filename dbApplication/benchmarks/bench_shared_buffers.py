@@ -0,0 +1,87 @@
+"""
+Benchmark of handing decoded 4K images (3840x2160 BGR, about 25MB each) to process-pool workers:
+pickling the arrays through the pool pipe (copy) versus passing ImageBufferManager handles
+(zero-copy, Controller/sharedBufferController.py), for a cheap and a heavier per-image task.
+
+The handles are shared once up front, as for images already held by the decoded image cache.
+The "share per call" column also includes the one copy into a new buffer per image.
+
+Usage (from the dbApplication directory):
+    python benchmarks/bench_shared_buffers.py [frames] [workers]
+"""
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Controller.sharedBufferController import ImageBufferManager, attach_buffer
+
+WIDTH, HEIGHT = 3840, 2160
+LOWER, UPPER = np.array([35, 43, 46]), np.array([77, 255, 255])
+
+
+def mean_intensity(image):
+    return float(image[::8, ::8].mean())
+
+
+def segment(image):
+    mask = cv2.inRange(cv2.cvtColor(image, cv2.COLOR_BGR2HSV), LOWER, UPPER)
+    return int(cv2.countNonZero(mask))
+
+
+TASKS = {'mean': mean_intensity, 'segment': segment}
+
+
+def run_on_array(task, image):
+    return TASKS[task](image)
+
+
+def run_on_handle(task, handle):
+    return TASKS[task](np.asarray(attach_buffer(handle)))
+
+
+def frames_per_second(pool, function, task, sources):
+    start = time.perf_counter()
+    list(pool.map(function, [task] * len(sources), sources))
+    return len(sources) / (time.perf_counter() - start)
+
+
+def main(frames=32, workers=None):
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8) for _ in range(4)]
+    arrays = [images[i % len(images)] for i in range(frames)]
+    megabytes = arrays[0].nbytes / 1e6
+
+    manager = ImageBufferManager()
+    handles = [manager.share(image) for image in arrays]
+    print(f'{frames} frames of {WIDTH}x{HEIGHT} ({megabytes:.1f}MB), {workers} workers, buffers in {manager.directory}')
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        # Start every worker before measuring
+        list(pool.map(run_on_array, ['mean'] * workers, arrays[:workers]))
+        for task in TASKS:
+            copied = frames_per_second(pool, run_on_array, task, arrays)
+            shared = frames_per_second(pool, run_on_handle, task, handles)
+
+            start = time.perf_counter()
+            per_call = [manager.share(image) for image in arrays]
+            list(pool.map(run_on_handle, [task] * frames, per_call))
+            share_per_call = frames / (time.perf_counter() - start)
+            for handle in per_call:
+                manager.release(handle)
+
+            print(f'task={task:<8} copy={copied:7.1f} frames/s ({copied * megabytes:7.0f}MB/s)  '
+                  f'zero-copy={shared:7.1f} frames/s  share per call={share_per_call:7.1f} frames/s  '
+                  f'speedup={shared / copied:5.1f}x')
+    manager.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 32,
+         int(sys.argv[2]) if len(sys.argv) > 2 else None)
@@ -0,0 +1,40 @@
+"""add ingest_jobs table
+
+Revision ID: 3f2a9c1d7e54
+Revises: 9814194ed6c8
+Create Date: 2026-10-18 10:12:41.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e54'
+down_revision = '9814194ed6c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ingest_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=True),
+    sa.Column('filepath', sa.String(length=500), nullable=False),
+    sa.Column('chunk_size', sa.Integer(), nullable=True),
+    sa.Column('chunks', sa.Integer(), nullable=False),
+    sa.Column('rows_read', sa.Integer(), nullable=False),
+    sa.Column('rows_inserted', sa.Integer(), nullable=False),
+    sa.Column('rows_dropped', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('ingest_jobs')
@@ -0,0 +1,26 @@
+"""add stored color histograms to images
+
+Revision ID: 4d2b8f6a9e13
+Revises: e3a7d95b1f60
+Create Date: 2026-10-18 18:22:09.540132
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d2b8f6a9e13'
+down_revision = 'e3a7d95b1f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('images', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('histograms', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('images', schema=None) as batch_op:
+        batch_op.drop_column('histograms')
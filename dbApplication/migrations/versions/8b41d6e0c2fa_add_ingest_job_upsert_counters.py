@@ -0,0 +1,30 @@
+"""add upsert mode and counters to ingest_jobs
+
+Revision ID: 8b41d6e0c2fa
+Revises: 3f2a9c1d7e54
+Create Date: 2026-10-18 11:02:15.880342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d6e0c2fa'
+down_revision = '3f2a9c1d7e54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('mode', sa.String(length=10), nullable=False, server_default='insert'))
+        batch_op.add_column(sa.Column('rows_updated', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('rows_unchanged', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.drop_column('rows_unchanged')
+        batch_op.drop_column('rows_updated')
+        batch_op.drop_column('mode')
@@ -0,0 +1,28 @@
+"""add owner and heartbeat to ingest_jobs
+
+Revision ID: a5c3e8f17b42
+Revises: 4d2b8f6a9e13
+Create Date: 2026-10-19 09:14:37.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5c3e8f17b42'
+down_revision = '4d2b8f6a9e13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('owner', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('owner')
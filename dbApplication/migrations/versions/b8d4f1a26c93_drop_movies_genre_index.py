@@ -0,0 +1,27 @@
+"""drop the movies genre index
+
+Revision ID: b8d4f1a26c93
+Revises: a5c3e8f17b42
+Create Date: 2026-10-19 10:02:51.618044
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f1a26c93'
+down_revision = 'a5c3e8f17b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The genre filter is a partial match (ILIKE '%genre%'), a B-tree index cannot serve it
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_movies_genre'))
+
+
+def downgrade():
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_movies_genre'), ['genre'], unique=False)
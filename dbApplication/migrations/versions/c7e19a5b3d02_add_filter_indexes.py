@@ -0,0 +1,42 @@
+"""add indexes for the loan and movie filter columns
+
+Revision ID: c7e19a5b3d02
+Revises: 8b41d6e0c2fa
+Create Date: 2026-10-18 12:40:03.115720
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e19a5b3d02'
+down_revision = '8b41d6e0c2fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('loan_approval', schema=None) as batch_op:
+        batch_op.create_index('ix_loan_approval_status_credit_score', ['loan_status', 'credit_score'], unique=False)
+        batch_op.create_index(batch_op.f('ix_loan_approval_credit_score'), ['credit_score'], unique=False)
+        batch_op.create_index(batch_op.f('ix_loan_approval_income'), ['income'], unique=False)
+
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.create_index('ix_movies_release_year_rating', ['release_year', 'rating'], unique=False)
+        batch_op.create_index(batch_op.f('ix_movies_genre'), ['genre'], unique=False)
+        batch_op.create_index(batch_op.f('ix_movies_rating'), ['rating'], unique=False)
+        batch_op.create_index(batch_op.f('ix_movies_gross'), ['gross'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_movies_gross'))
+        batch_op.drop_index(batch_op.f('ix_movies_rating'))
+        batch_op.drop_index(batch_op.f('ix_movies_genre'))
+        batch_op.drop_index('ix_movies_release_year_rating')
+
+    with op.batch_alter_table('loan_approval', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_loan_approval_income'))
+        batch_op.drop_index(batch_op.f('ix_loan_approval_credit_score'))
+        batch_op.drop_index('ix_loan_approval_status_credit_score')
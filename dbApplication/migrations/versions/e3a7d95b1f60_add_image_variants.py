@@ -0,0 +1,44 @@
+"""add image variants
+
+Revision ID: e3a7d95b1f60
+Revises: c7e19a5b3d02
+Create Date: 2026-10-18 16:05:41.208317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a7d95b1f60'
+down_revision = 'c7e19a5b3d02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_variants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('image_id', sa.Integer(), nullable=False),
+    sa.Column('params_hash', sa.String(length=64), nullable=False),
+    sa.Column('params', sa.String(length=255), nullable=False),
+    sa.Column('storage_key', sa.String(length=255), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['image_id'], ['images.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('image_id', 'params_hash', name='uq_image_variants_image_params')
+    )
+    with op.batch_alter_table('image_variants', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_image_variants_image_id'), ['image_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('image_variants', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_image_variants_image_id'))
+
+    op.drop_table('image_variants')
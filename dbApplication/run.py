@@ -1,6 +1,16 @@
-from app import create_app
+import os
 
-flask_app =  create_app()
+DEBUG = True
+
+# The image pipeline workers re-import this script as __mp_main__, they must not create a second app
+if __name__ != '__mp_main__':
+    from app import create_app
+    from Controller.jobController import recover_jobs
+
+    flask_app =  create_app()
 
 if __name__ == '__main__':
-    flask_app.run(debug=True,host='0.0.0.0',port=5000)
\ No newline at end of file
+    # With the reloader the parent process only watches files, the child serves requests and runs the jobs
+    if not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        recover_jobs(flask_app)
+    flask_app.run(debug=DEBUG,host='0.0.0.0',port=5000)
\ No newline at end of file
@@ -0,0 +1,126 @@
+import io
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from PIL import Image as PILImage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from Models.dbModel import db
+from Models.loan_models import LoanApproval
+from Controller.ingestionController import bulk_insert_dataframe
+from Controller.loan_approvalController import LOAN_CSV_COLUMNS
+from Controller import (chartCacheController, dataVersionController, histogramController, imageCacheController,
+                        paginationController, statsCacheController)
+
+LOAN_CSV_HEADER = 'loan_id,income,loan_amount,credit_score,loan_status,asset_value\n'
+MOVIE_CSV_HEADER = 'id,title,director,release_year,runtime,genre,rating,gross\n'
+
+
+def reset_caches():
+    """
+    Drops the in-process caches derived from table versions. Every test gets a new database whose
+    versions would otherwise collide with entries cached by an earlier test.
+    """
+    dataVersionController._versions.clear()
+    paginationController._count_cache.clear()
+    statsCacheController._summaries.clear()
+    statsCacheController._write_epochs.clear()
+    statsCacheController._stats_cache.clear()
+    histogramController._ranges.clear()
+    chartCacheController._artifacts.clear()
+    chartCacheController._artifact_bytes = 0
+    imageCacheController._decoded.clear()
+    imageCacheController._decoded_bytes = 0
+    imageCacheController._disk_bytes.clear()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """
+    The application on a fresh SQLite database, run from a temporary directory so uploads,
+    spooled files and local image storage stay out of the source tree.
+    """
+    monkeypatch.chdir(tmp_path)
+    # Created relative to the working directory when the controllers are imported
+    os.makedirs(os.path.join('uploads', 'jobs'))
+    reset_caches()
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'IMAGE_STORAGE_BACKEND': 'local',
+        'IMAGE_STORAGE_ROOT': str(tmp_path / 'images'),
+        'IMAGE_CACHE_DIR': None,
+        'IMAGE_FEATURE_INDEX_DIR': str(tmp_path / 'feature_index'),
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+    reset_caches()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def loan_rows(count, start=1):
+    return [(loan_id, 1000000 + loan_id * 1000, 5000000 + loan_id * 100, 300 + loan_id % 600,
+             'Approved' if loan_id % 3 else 'Rejected', 2000000 + loan_id * 10)
+            for loan_id in range(start, start + count)]
+
+
+def loan_csv(rows):
+    """
+    CSV bytes of loan rows given as (loan_id, income, loan_amount, credit_score, loan_status, asset_value) tuples.
+    """
+    return (LOAN_CSV_HEADER + ''.join(','.join(str(value) for value in row) + '\n' for row in rows)).encode()
+
+
+def movie_csv(count, start=0):
+    lines = [f'{i},Movie {i},Director {i % 7},{1990 + i % 30},{90 + i % 60},{("Drama", "Crime", "Action")[i % 3]},'
+             f'{5 + (i % 50) / 10},{i * 1.5}\n' for i in range(start, start + count)]
+    return (MOVIE_CSV_HEADER + ''.join(lines)).encode()
+
+
+def add_loans(rows):
+    """
+    Inserts loan rows through the bulk insert path of the uploads, so running summaries and versions follow.
+    """
+    bulk_insert_dataframe(LoanApproval, pd.DataFrame(rows, columns=LOAN_CSV_COLUMNS), LOAN_CSV_COLUMNS)
+    db.session.commit()
+
+
+def csv_upload(content, filename='data.csv', **fields):
+    """
+    Multipart form data uploading CSV bytes as the "file" part.
+    """
+    return {'file': (io.BytesIO(content), filename), **fields}
+
+
+def image_bytes(color=(200, 30, 30), size=(32, 24), image_format='PNG', seed=None):
+    """
+    Encoded bytes of a solid color image, or of random noise when a seed is given.
+    """
+    if seed is None:
+        image = PILImage.new('RGB', size, color)
+    else:
+        pixels = np.random.default_rng(seed).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        image = PILImage.fromarray(pixels)
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def upload_image(client, content, filename='image.png'):
+    """
+    Uploads image bytes through /images/upload_image and returns the id of the new image.
+    """
+    response = client.post('/images/upload_image', data={'image': (io.BytesIO(content), filename)})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['image_id']
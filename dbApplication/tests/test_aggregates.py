@@ -0,0 +1,117 @@
+import pandas as pd
+import pytest
+from conftest import add_loans, loan_rows
+from Controller.loan_approvalController import LOAN_CSV_COLUMNS
+
+ROWS = loan_rows(60)
+
+
+@pytest.fixture
+def loans(app):
+    add_loans(ROWS)
+    return pd.DataFrame(ROWS, columns=LOAN_CSV_COLUMNS)
+
+
+def post_filter(client, payload):
+    response = client.post('/loan_approval/filter', json=payload)
+    return response.status_code, response.get_json()
+
+
+def test_single_aggregate(client, loans):
+    status, body = post_filter(client, {'aggregate_type': 'avg', 'field': 'income'})
+
+    assert status == 200
+    assert body == {'aggregate_type': 'avg', 'field': 'income', 'result': pytest.approx(loans['income'].mean())}
+
+
+def test_several_aggregates_over_filtered_rows(client, loans):
+    status, body = post_filter(client, {
+        'filters': [{'column': 'credit_score', 'operator': 'greater_than', 'value': 330}],
+        'aggregates': [{'type': 'count', 'field': 'loan_status'}, {'type': 'sum', 'field': 'loan_amount'},
+                       {'type': 'min', 'field': 'income'}, {'type': 'max', 'field': 'asset_value'},
+                       {'type': 'stddev', 'field': 'income'}],
+    })
+
+    expected = loans[loans['credit_score'] > 330]
+    assert status == 200
+    assert body['result'] == {
+        'count_loan_status': len(expected),
+        'sum_loan_amount': pytest.approx(expected['loan_amount'].sum()),
+        'min_income': expected['income'].min(),
+        'max_asset_value': expected['asset_value'].max(),
+        'stddev_income': pytest.approx(expected['income'].std(), abs=1e-3),
+    }
+
+
+def test_grouped_aggregates_match_pandas(client, loans):
+    status, body = post_filter(client, {
+        'aggregates': [{'type': 'avg', 'field': 'loan_amount'}, {'type': 'count', 'field': 'income'}],
+        'group_by': ['loan_status', {'column': 'income', 'bucket_size': 20000}],
+    })
+
+    loans['income_bucket'] = (loans['income'] // 20000 * 20000).astype(int)
+    expected = loans.groupby(['loan_status', 'income_bucket']).agg(avg=('loan_amount', 'mean'), count=('income', 'size'))
+    assert status == 200
+    assert body['group_by'] == ['loan_status', 'income_bucket']
+    assert [(group['loan_status'], group['income_bucket']) for group in body['groups']] == list(expected.index)
+    for group, (_, row) in zip(body['groups'], expected.iterrows()):
+        assert group['avg_loan_amount'] == pytest.approx(row['avg'])
+        assert group['count_income'] == row['count']
+
+
+def test_stddev_of_a_single_row_is_null(client, loans):
+    status, body = post_filter(client, {'filters': [{'column': 'income', 'value': 1001000}],
+                                        'aggregates': [{'type': 'stddev', 'field': 'income'}]})
+
+    assert status == 200
+    assert body['result'] == {'stddev_income': None}
+
+
+def test_stddev_of_large_values_with_a_small_spread(client):
+    rows = [(i, 1e12 + i % 7, 5e11 + i % 5, 300, 'Approved' if i % 2 else 'Rejected', 1.0) for i in range(1, 41)]
+    add_loans(rows)
+    loans = pd.DataFrame(rows, columns=LOAN_CSV_COLUMNS)
+
+    status, body = post_filter(client, {'aggregates': [{'type': 'stddev', 'field': 'income'},
+                                                       {'type': 'stddev', 'field': 'loan_amount'}],
+                                        'group_by': ['loan_status']})
+
+    expected = loans.groupby('loan_status')[['income', 'loan_amount']].std()
+    assert status == 200
+    for group in body['groups']:
+        assert group['stddev_income'] == pytest.approx(expected.loc[group['loan_status'], 'income'], abs=1e-3)
+        assert group['stddev_loan_amount'] == pytest.approx(expected.loc[group['loan_status'], 'loan_amount'], abs=1e-3)
+
+
+def test_filters_without_aggregates_paginate(client, loans):
+    status, body = post_filter(client, {'filters': [{'column': 'loan_status', 'value': 'Rejected'}], 'per_page': 5})
+
+    assert status == 200
+    assert body['total'] == 20
+    assert len(body['filtered_loans']) == 5
+    assert all(loan['loan_status'] == 'Rejected' for loan in body['filtered_loans'])
+
+
+@pytest.mark.parametrize('payload, error', [
+    ({'filters': [{'column': 'loan_id', 'value': 1}]}, 'Unsupported column: loan_id'),
+    ({'filters': [{'column': 'income', 'operator': 'like', 'value': 1}]}, 'Unsupported operator: like'),
+    ({'aggregates': [{'type': 'median', 'field': 'income'}]}, 'Unsupported aggregate type: median'),
+    ({'aggregates': [{'type': 'sum', 'field': 'loan_status'}]}, 'Unsupported aggregate field: loan_status'),
+    ({'group_by': ['loan_status']}, "Please provide 'aggregates' or 'aggregate_type' and 'field'"),
+    ({'aggregate_type': 'sum', 'field': 'income', 'group_by': ['income']},
+     "Column 'income' can only be grouped with a bucket_size"),
+    ({'aggregate_type': 'sum', 'field': 'income', 'group_by': [{'column': 'income', 'bucket_size': 0}]},
+     'bucket_size must be a positive number'),
+    ({'aggregate_type': 'sum', 'field': 'income', 'group_by': [{'column': 'loan_id', 'bucket_size': 5}]},
+     'Unsupported bucket column: loan_id'),
+    ({'aggregate_type': 'sum', 'field': 'income', 'group_by': [7]}, 'Unsupported group_by entry: 7'),
+    ({'aggregate_type': 'sum', 'field': 'income', 'group_by': 7}, 'group_by must be a list'),
+    ({'aggregates': ['sum']}, 'Unsupported aggregate entry: sum'),
+    ({'aggregates': {'type': 'sum', 'field': 'income'}}, 'aggregates must be a list'),
+    ({'aggregates': [{'type': ['sum'], 'field': {'income': 1}}]}, "Unsupported aggregate type: ['sum']"),
+])
+def test_invalid_requests_are_rejected(client, loans, payload, error):
+    status, body = post_filter(client, payload)
+
+    assert status == 400
+    assert body['error'] == error
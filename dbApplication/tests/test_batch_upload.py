@@ -0,0 +1,117 @@
+import io
+import threading
+import time
+from sqlalchemy import event
+from werkzeug.datastructures import FileStorage
+from conftest import image_bytes, upload_image
+from Models.dbModel import db
+from Models.image_model import Image
+from Controller.imageUploadController import upload_images_to_cloudinary
+from Controller.storageController import get_storage
+
+
+class StandInStorage:
+    """
+    Local stand-in for the upload API: records the peak number of concurrent uploads and fails chosen files.
+    """
+
+    def __init__(self, store, failing=(), delay=0.0):
+        self.store = store
+        self.failing = set(failing)
+        self.delay = delay
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def put(self, data, filename=None, key=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if filename in self.failing:
+                raise ConnectionError(f'upload of {filename} timed out')
+            return self.store.put(data, filename, key)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def files(count):
+    return [FileStorage(io.BytesIO(image_bytes(seed=i)), f'image{i}.png') for i in range(count)]
+
+
+def upload_batch(app, batch, **kwargs):
+    with app.test_request_context():
+        return upload_images_to_cloudinary(batch, **kwargs)
+
+
+def test_batch_is_uploaded_with_one_insert(client):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.post('/images/upload_images',
+                               data={'images': [(io.BytesIO(image_bytes(seed=i)), f'image{i}.png') for i in range(5)]})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body['uploaded'], body['duplicates'], body['failed']) == (5, 0, 0)
+    assert [result['filename'] for result in body['results']] == [f'image{i}.png' for i in range(5)]
+    assert all(result['status'] == 'uploaded' and result['elapsed_seconds'] >= 0 for result in body['results'])
+    assert len([statement for statement in statements if statement.startswith('INSERT INTO images')]) == 1
+    assert {image.public_id for image in Image.query} == {result['public_id'] for result in body['results']}
+
+
+def test_concurrency_is_bounded(app):
+    storage = StandInStorage(get_storage(), delay=0.05)
+
+    summary, status = upload_batch(app, files(6), storage=storage, concurrency=2)
+
+    assert status == 200
+    assert storage.peak == 2
+    assert summary['upload_seconds'] >= 0.15
+
+
+def test_partial_failure(app):
+    storage = StandInStorage(get_storage(), failing={'image1.png'})
+
+    summary, status = upload_batch(app, files(3), storage=storage)
+
+    assert status == 207
+    assert summary['message'] == '2 of 3 images uploaded successfully'
+    assert [result['status'] for result in summary['results']] == ['uploaded', 'failed', 'uploaded']
+    assert summary['results'][1]['error'] == 'upload of image1.png timed out'
+    assert Image.query.count() == 2
+
+
+def test_every_upload_failing(app):
+    storage = StandInStorage(get_storage(), failing={'image0.png', 'image1.png'})
+
+    summary, status = upload_batch(app, files(2), storage=storage)
+
+    assert status == 502
+    assert summary['message'] == 'No image could be uploaded'
+    assert Image.query.count() == 0
+
+
+def test_duplicates_can_be_skipped(client):
+    upload_image(client, image_bytes(seed=0))
+
+    response = client.post('/images/upload_images?reject_duplicates=true',
+                           data={'images': [(io.BytesIO(image_bytes(seed=0)), 'again.png'),
+                                            (io.BytesIO(image_bytes(seed=1)), 'new.png')]})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['message'] == '1 images uploaded, 1 duplicates skipped'
+    assert body['results'][0]['status'] == 'duplicate'
+    assert Image.query.count() == 2
+
+
+def test_no_files(client):
+    response = client.post('/images/upload_images', data={})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'No files provided'}
@@ -0,0 +1,135 @@
+import threading
+import tracemalloc
+import pandas as pd
+import pytest
+from conftest import csv_upload, loan_csv, loan_rows
+from Models.dbModel import db
+from Models.loan_models import LoanApproval
+from Controller.dataVersionController import get_table_version
+from Controller.ingestionController import bulk_insert_dataframe, resolve_chunk_size, track_ingest
+from Controller.loan_approvalController import LOAN_CSV_COLUMNS
+
+
+def test_upload_inserts_every_row_in_batches(client):
+    response = client.post('/upload_csv', data=csv_upload(loan_csv(loan_rows(25)), chunk_size='10'))
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['rows_inserted'] == 25
+    assert body['batches'] == 3
+    assert body['rows_per_sec'] > 0
+    assert LoanApproval.query.count() == 25
+    loan = db.session.get(LoanApproval, 7)
+    assert (loan.income, loan.credit_score, loan.loan_status) == (1007000.0, 307, 'Approved')
+
+
+def test_upload_drops_invalid_rows(client):
+    rows = loan_rows(3) + [(4, 'not a number', 1, 1, 'Approved', 1), (5, '', 1, 1, 'Rejected', 1)]
+    response = client.post('/upload_csv', data=csv_upload(loan_csv(rows)))
+
+    assert response.status_code == 201
+    assert response.get_json()['rows_inserted'] == 3
+    assert LoanApproval.query.count() == 3
+
+
+def test_upload_without_file_part_is_rejected(client):
+    response = client.post('/upload_csv', data={})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'No file part'
+
+
+@pytest.mark.parametrize('content, filename, error', [
+    (b'', '', 'No selected file'),
+    (b'a,b\n1,2\n', 'data.txt', 'Invalid file format, please upload a CSV file'),
+    (b'loan_id,income\n1,2\n', 'data.csv', 'Missing required column: loan_amount'),
+])
+def test_upload_rejects_invalid_files(client, content, filename, error):
+    response = client.post('/upload_csv', data=csv_upload(content, filename))
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    assert LoanApproval.query.count() == 0
+
+
+def test_upload_rejects_invalid_chunk_size(client):
+    response = client.post('/upload_csv', data=csv_upload(loan_csv(loan_rows(2)), chunk_size='0'))
+
+    assert response.status_code == 400
+    assert LoanApproval.query.count() == 0
+
+
+def test_duplicate_keys_roll_back_the_upload(client):
+    client.post('/upload_csv', data=csv_upload(loan_csv(loan_rows(3))))
+    response = client.post('/upload_csv', data=csv_upload(loan_csv(loan_rows(5))))
+
+    assert response.status_code == 500
+    assert LoanApproval.query.count() == 3
+
+
+def test_bulk_insert_dataframe_counts_batches_and_bumps_version(app):
+    frame = pd.DataFrame(loan_rows(7), columns=LOAN_CSV_COLUMNS)
+    frame['extra'] = 'ignored'
+    version = get_table_version('loan_approval')
+
+    result = bulk_insert_dataframe(LoanApproval, frame, LOAN_CSV_COLUMNS, chunk_size=3)
+    assert result == {'rows_inserted': 7, 'batches': 3}
+    # The version moves only once the transaction commits
+    assert get_table_version('loan_approval') == version
+    db.session.commit()
+
+    assert get_table_version('loan_approval') == version + 1
+    assert [loan.loan_id for loan in LoanApproval.query.order_by(LoanApproval.loan_id)] == list(range(1, 8))
+
+
+def test_bulk_insert_of_an_empty_frame_changes_nothing(app):
+    version = get_table_version('loan_approval')
+    result = bulk_insert_dataframe(LoanApproval, pd.DataFrame(columns=LOAN_CSV_COLUMNS), LOAN_CSV_COLUMNS)
+    db.session.commit()
+
+    assert result == {'rows_inserted': 0, 'batches': 0}
+    assert get_table_version('loan_approval') == version
+
+
+def test_resolve_chunk_size(app):
+    assert resolve_chunk_size() == app.config['INGEST_CHUNK_SIZE']
+    assert resolve_chunk_size('12') == 12
+    with pytest.raises(ValueError):
+        resolve_chunk_size(-1)
+
+
+def test_memory_tracking_is_off_by_default(app):
+    with track_ingest() as metrics:
+        pass
+
+    assert metrics['peak_memory_mb'] is None
+    assert metrics['elapsed_seconds'] >= 0
+    assert not tracemalloc.is_tracing()
+
+
+def test_overlapping_ingests_share_one_tracing_session(app):
+    app.config['INGEST_TRACK_MEMORY'] = True
+    inner_started, outer_done = threading.Event(), threading.Event()
+    results = {}
+
+    def inner():
+        with app.app_context(), track_ingest() as metrics:
+            inner_started.set()
+            outer_done.wait(5)
+            results['still_tracing'] = tracemalloc.is_tracing()
+        results['inner'] = metrics
+
+    with track_ingest() as outer:
+        thread = threading.Thread(target=inner)
+        thread.start()
+        inner_started.wait(5)
+        buffer = bytearray(4 * 1024 * 1024)
+    outer_done.set()
+    thread.join(5)
+    del buffer
+
+    assert outer['peak_memory_mb'] >= 4
+    # The outer run finished first, it must not have stopped tracing under the inner one
+    assert results['still_tracing']
+    assert results['inner']['peak_memory_mb'] >= 4
+    assert not tracemalloc.is_tracing()
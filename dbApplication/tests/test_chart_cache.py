@@ -0,0 +1,99 @@
+import pytest
+from conftest import add_loans, loan_rows
+from Controller import chartCacheController, loan_approvalController
+from Controller.chartCacheController import get_artifact, store_artifact
+
+
+@pytest.fixture
+def renders(client, monkeypatch):
+    """
+    Counts the bar charts actually rendered.
+    """
+    calls = []
+    render = loan_approvalController.render_bar_chart
+
+    def counting_render(*args):
+        calls.append(args)
+        return render(*args)
+
+    monkeypatch.setattr(loan_approvalController, 'render_bar_chart', counting_render)
+    add_loans(loan_rows(40))
+    return calls
+
+
+def bar_chart(client, etag=None, **payload):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.post('/loan_approval/chart', json={'column_name': 'income', **payload}, headers=headers)
+
+
+def test_repeated_charts_are_rendered_once(client, renders):
+    first = bar_chart(client)
+    second = bar_chart(client)
+
+    assert first.status_code == second.status_code == 200
+    assert first.mimetype == 'image/png'
+    assert first.data == second.data
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert len(renders) == 1
+
+
+def test_matching_etag_is_answered_with_304(client, renders):
+    etag = bar_chart(client).headers['ETag']
+
+    response = bar_chart(client, etag=etag)
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert len(renders) == 1
+
+
+def test_plot_parameters_are_part_of_the_key(client, renders):
+    etags = {bar_chart(client, **payload).headers['ETag']
+             for payload in ({}, {'bins': 5}, {'format': 'svg'}, {'column_name': 'credit_score'})}
+
+    assert len(etags) == 4
+    assert len(renders) == 4
+
+
+def test_writes_invalidate_the_chart(client, renders):
+    etag = bar_chart(client).headers['ETag']
+
+    add_loans(loan_rows(5, start=41))
+    response = bar_chart(client, etag=etag)
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(renders) == 2
+
+
+def test_line_graph_is_cached_with_an_etag(client):
+    add_loans(loan_rows(40))
+    etag = client.post('/loan_approval/graph', json={'column_name': 'income'}).headers['ETag']
+
+    response = client.post('/loan_approval/graph', json={'column_name': 'income'}, headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+
+
+def test_errors_are_not_cached(client):
+    assert bar_chart(client).status_code == 400
+    assert chartCacheController._artifacts == {}
+
+    add_loans(loan_rows(3))
+    assert bar_chart(client).status_code == 200
+
+
+def test_least_recently_used_artifacts_are_evicted(app):
+    app.config['CHART_CACHE_MAX_BYTES'] = 10
+    store_artifact('a', 'image/png', b'1234')
+    store_artifact('b', 'image/png', b'1234')
+    assert get_artifact('a') == b'1234'
+
+    store_artifact('c', 'image/png', b'1234')
+    store_artifact('too-big', 'image/png', b'12345678901')
+
+    assert list(chartCacheController._artifacts) == ['a', 'c']
+    assert chartCacheController._artifact_bytes == 8
+    assert get_artifact('b') is None
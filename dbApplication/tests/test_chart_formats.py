@@ -0,0 +1,90 @@
+import pytest
+from conftest import add_loans, image_bytes, loan_rows, upload_image
+
+TEXTS = ['the cat sat on the mat', 'dogs bark at the mailman', 'a cat chased the dog']
+
+
+@pytest.fixture
+def loans(app):
+    add_loans(loan_rows(40))
+
+
+@pytest.mark.parametrize('url', ['/loan_approval/chart', '/loan_approval/graph'])
+def test_loan_charts_as_svg(client, loans, url):
+    response = client.post(f'{url}?format=svg', json={'column_name': 'income'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/svg+xml'
+    assert response.data.lstrip().startswith(b'<?xml')
+
+
+def test_loan_chart_json_is_the_histogram(client, loans):
+    body = client.post('/loan_approval/chart', json={'column_name': 'credit_score', 'bins': 4, 'format': 'json'}).get_json()
+
+    assert body['counts'] == [10, 10, 10, 10]
+    assert body['edges'] == [301.0, 310.75, 320.5, 330.25, 340.0]
+
+
+def test_formats_are_cached_separately(client, loans):
+    etags = {client.post('/loan_approval/graph', json={'column_name': 'income', 'format': chart_format}).headers['ETag']
+             for chart_format in ('png', 'svg', 'json')}
+
+    assert len(etags) == 3
+
+
+def test_image_histogram_json_has_the_channel_counts(client):
+    image_id = upload_image(client, image_bytes(color=(200, 30, 90), size=(8, 4)))
+
+    response = client.get(f'/images/generate_histogram/{image_id}?format=json')
+
+    assert response.mimetype == 'application/json'
+    body = response.get_json()
+    assert body['bins'] == 256
+    for channel, value in zip('rgb', (200, 30, 90)):
+        assert body['channels'][channel][value] == 32
+        assert sum(body['channels'][channel]) == 32
+
+
+def test_image_histogram_svg(client):
+    image_id = upload_image(client, image_bytes())
+
+    response = client.get(f'/images/generate_histogram/{image_id}?format=svg')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/svg+xml'
+    assert b'Color Histogram' in response.data
+
+
+def test_tsne_json_has_one_point_per_text(client):
+    response = client.post('/text/generate_tsne', json={'texts': TEXTS, 'format': 'json'})
+
+    assert response.status_code == 200
+    points = response.get_json()['points']
+    assert len(points) == 3
+    assert all(len(point) == 2 for point in points)
+
+
+def test_tsne_svg(client):
+    response = client.post('/text/generate_tsne?format=svg', json={'texts': TEXTS})
+
+    assert response.mimetype == 'image/svg+xml'
+
+
+@pytest.mark.parametrize('method, url, kwargs', [
+    ('post', '/loan_approval/chart', {'json': {'column_name': 'income', 'format': 'gif'}}),
+    ('post', '/loan_approval/graph?format=gif', {'json': {'column_name': 'income'}}),
+    ('get', '/images/generate_histogram/1?format=gif', {}),
+    ('post', '/text/generate_tsne', {'json': {'texts': TEXTS, 'format': 'gif'}}),
+])
+def test_unsupported_formats_are_rejected(client, loans, method, url, kwargs):
+    response = getattr(client, method)(url, **kwargs)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Unsupported format: gif, expected one of png, svg, json'}
+
+
+def test_missing_image(client):
+    response = client.get('/images/generate_histogram/99?format=json')
+
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Image not found'}
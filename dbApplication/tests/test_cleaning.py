@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from conftest import csv_upload, movie_csv
+from Models.movies_model import Movies
+from Controller.cleaningController import LOAN_SCHEMA, MAX_REJECTED_SAMPLE, clean_frame, strip_string_columns
+from Controller.loan_approvalController import clean_loan_frame
+from Controller.moviesController import clean_movie_frame
+
+
+def raw_loans(rows):
+    return pd.DataFrame(rows, columns=list(LOAN_SCHEMA), dtype=object)
+
+
+def test_strip_string_columns_strips_only_strings():
+    data = pd.DataFrame({'name': [' a ', 'b  ', None, ' a '], 'mixed': [' x ', 3, np.nan, '\ty'], 'number': [1, 2, 3, 4]})
+
+    strip_string_columns(data)
+
+    assert data['name'].tolist()[:2] == ['a', 'b'] and data['name'][3] == 'a'
+    assert pd.isna(data['name'][2])
+    assert data['mixed'][0] == 'x' and data['mixed'][1] == 3 and data['mixed'][3] == 'y'
+    assert pd.isna(data['mixed'][2])
+    assert data['number'].tolist() == [1, 2, 3, 4]
+
+
+def test_clean_frame_coerces_the_schema_dtypes():
+    cleaned, report = clean_loan_frame(raw_loans([['1', '9600000.04', '29900000', '778', ' Approved ', '48300000']]))
+
+    assert report == {'rows_rejected': 0, 'rejected_rows_sample': [], 'rejected_by_column': {}}
+    assert cleaned.dtypes.astype(str).to_dict() == {'loan_id': 'int64', 'income': 'float64', 'loan_amount': 'float64',
+                                                    'credit_score': 'int64', 'loan_status': 'category',
+                                                    'asset_value': 'float64'}
+    row = cleaned.iloc[0]
+    assert (row['loan_id'], row['income'], row['credit_score'], row['loan_status']) == (1, 9600000.0, 778, 'Approved')
+
+
+def test_clean_frame_rejects_missing_blank_and_invalid_values():
+    cleaned, report = clean_loan_frame(raw_loans([
+        [1, 1, 1, 700, 'Approved', 1],
+        [2, 'abc', 1, 700, 'Approved', 1],
+        [3, 1, 1, 700.5, 'Approved', 1],
+        [4, 1, 1, 700, '   ', 1],
+        [5, None, 1, 700, None, 1],
+        [6, 1, 1, 700, 'Rejected', 1],
+    ]))
+
+    assert cleaned['loan_id'].tolist() == [1, 6]
+    assert report['rows_rejected'] == 4
+    assert report['rejected_rows_sample'] == [1, 2, 3, 4]
+    assert report['rejected_by_column'] == {'income': 2, 'credit_score': 1, 'loan_status': 2}
+
+
+def test_rounding_happens_before_the_integer_check():
+    data = pd.DataFrame({'value': ['2.00004', '2.4']})
+
+    cleaned, report = clean_frame(data, {'value': 'int'}, round_columns=['value'], decimals=1)
+
+    assert cleaned['value'].tolist() == [2]
+    assert report['rows_rejected'] == 1
+
+
+def test_rejected_rows_sample_is_capped():
+    _, report = clean_loan_frame(raw_loans([[i, 'bad', 1, 1, 'Approved', 1] for i in range(MAX_REJECTED_SAMPLE + 5)]))
+
+    assert report['rows_rejected'] == MAX_REJECTED_SAMPLE + 5
+    assert len(report['rejected_rows_sample']) == MAX_REJECTED_SAMPLE
+
+
+def test_clean_frame_does_not_modify_its_input():
+    data = raw_loans([[1, ' 2 ', 1, 700, ' Approved', 1]])
+
+    clean_loan_frame(data)
+
+    assert data['loan_status'][0] == ' Approved'
+
+
+def test_clean_movie_frame_keeps_extra_columns():
+    data = pd.read_csv(pd.io.common.BytesIO(movie_csv(3)))
+
+    cleaned, report = clean_movie_frame(data)
+
+    assert len(cleaned) == 3 and 'id' in cleaned
+    assert cleaned['genre'].tolist() == ['Drama', 'Crime', 'Action']
+
+
+def test_movie_upload_reports_rejected_rows(client):
+    content = movie_csv(2) + b'9,Broken,Someone,not a year,100,Drama,7.0,1.0\n'
+
+    response = client.post('/movies/upload_csv', data=csv_upload(content))
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['rows_rejected'] == 1
+    assert body['rejected_by_column'] == {'release_year': 1}
+    assert Movies.query.count() == 2
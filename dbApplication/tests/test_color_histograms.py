@@ -0,0 +1,133 @@
+import cv2
+import numpy as np
+import pytest
+from sqlalchemy import event, inspect
+from conftest import image_bytes, upload_image
+from Models.dbModel import db
+from Models.image_model import Image
+from Controller import colorHistogramController
+from Controller.colorHistogramController import MAX_STORED_HISTOGRAMS, channel_counts, compute_color_histograms
+from Controller.storageController import get_storage
+
+
+@pytest.fixture
+def pixels():
+    return np.random.default_rng(0).integers(0, 256, (37, 53, 3), dtype=np.uint8)
+
+
+def reference_counts(image, bins, ranges):
+    return np.stack([np.bincount(np.minimum(image[..., channel].ravel().astype(int) * bins // value_range, bins - 1),
+                                 minlength=bins) for channel, value_range in enumerate(ranges)])
+
+
+@pytest.mark.parametrize('bins, ranges', [(256, (256, 256, 256)), (7, (180, 256, 256)), (1, (256, 256, 256))])
+def test_counts_match_a_direct_count(pixels, bins, ranges):
+    assert np.array_equal(channel_counts(pixels, bins, ranges), reference_counts(pixels, bins, ranges))
+
+
+def test_counts_add_up_across_chunks(pixels, monkeypatch):
+    monkeypatch.setattr(colorHistogramController, 'CHUNK_PIXELS', 100)
+
+    counts = channel_counts(pixels, 16, (256, 256, 256))
+
+    assert np.array_equal(counts, reference_counts(pixels, 16, (256, 256, 256)))
+    assert counts.sum(axis=1).tolist() == [37 * 53] * 3
+
+
+def test_counts_match_calc_hist(pixels):
+    expected = [cv2.calcHist([pixels], [channel], None, [32], [0, 256]).ravel() for channel in range(3)]
+
+    assert np.array_equal(channel_counts(pixels, 32, (256, 256, 256)), np.stack(expected))
+
+
+def test_channels_are_named_per_colorspace():
+    image = np.zeros((2, 2, 3), dtype=np.uint8)
+    image[...] = (255, 0, 0)  # Pure blue in BGR
+
+    histograms = compute_color_histograms(image, 2, ('rgb', 'hsv', 'lab'))
+
+    assert histograms['rgb']['channels'] == {'r': [4, 0], 'g': [4, 0], 'b': [0, 4]}
+    assert list(histograms['hsv']['channels']) == ['h', 's', 'v']
+    assert histograms['hsv']['channels']['h'] == [0, 4]  # Hue 120 of 0-179
+    assert list(histograms['lab']['channels']) == ['l', 'a', 'b']
+    assert histograms['rgb']['pixels'] == 4 and not histograms['rgb']['approximate']
+
+
+def test_approximate_histograms_count_a_sample(pixels):
+    histograms = compute_color_histograms(pixels, 8, approximate=True, max_pixels=500)
+
+    assert histograms['rgb']['approximate']
+    assert histograms['rgb']['pixels'] == 19 * 27
+    assert all(sum(counts) == 19 * 27 for counts in histograms['rgb']['channels'].values())
+
+
+def test_histograms_are_stored_on_the_image(client):
+    image_id = upload_image(client, image_bytes(seed=3))
+
+    first = client.get(f'/images/{image_id}/histogram?bins=4&colorspaces=rgb,hsv').get_json()
+    second = client.get(f'/images/{image_id}/histogram?bins=4&colorspaces=hsv').get_json()
+
+    assert (first['cached'], second['cached']) == (False, True)
+    assert second['histograms']['hsv'] == first['histograms']['hsv']
+    assert sum(first['histograms']['rgb']['channels']['g']) == 32 * 24
+
+
+def test_a_new_version_of_the_image_is_counted_again(client):
+    image_id = upload_image(client, image_bytes(color=(0, 0, 0)))
+    client.get(f'/images/{image_id}/histogram?bins=2')
+    image = db.session.get(Image, image_id)
+    image.url = get_storage().put(image_bytes(color=(255, 255, 255)), key=image.public_id)['url']
+    db.session.commit()
+
+    body = client.get(f'/images/{image_id}/histogram?bins=2').get_json()
+
+    assert not body['cached']
+    assert body['histograms']['rgb']['channels']['r'] == [0, 32 * 24]
+
+
+def test_stored_histograms_are_bounded(client):
+    image_id = upload_image(client, image_bytes())
+
+    for bins in range(1, MAX_STORED_HISTOGRAMS + 2):
+        client.get(f'/images/{image_id}/histogram?bins={bins}')
+
+    assert len(db.session.get(Image, image_id).histograms) == MAX_STORED_HISTOGRAMS
+
+
+@pytest.mark.parametrize('query, status, error', [
+    ('bins=abc', 400, 'bins must be an integer'),
+    ('bins=300', 400, 'bins must be between 1 and 256'),
+    ('colorspaces=rgb,cmyk', 400, 'Unsupported colorspace: cmyk, expected one of rgb, hsv, lab'),
+])
+def test_invalid_parameters(client, query, status, error):
+    image_id = upload_image(client, image_bytes())
+
+    response = client.get(f'/images/{image_id}/histogram?{query}')
+
+    assert response.status_code == status
+    assert response.get_json() == {'error': error}
+
+
+def test_missing_image(client):
+    response = client.get('/images/5/histogram')
+
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Image not found'}
+
+
+def test_stored_histograms_are_only_loaded_by_the_histogram_code(client):
+    image_ids = [upload_image(client, image_bytes(seed=i), f'{i}.png') for i in range(3)]
+    client.post('/images/histograms', json={'image_ids': image_ids})
+    db.session.expunge_all()
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+
+    assert all('histograms' in inspect(image).unloaded for image in Image.query.all())
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        body = client.post('/images/histograms', json={'image_ids': image_ids}).get_json()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert all(result['cached'] for result in body['results'])
+    assert len([statement for statement in statements if 'FROM images' in statement]) == 1
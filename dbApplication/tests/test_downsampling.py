@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from conftest import add_loans, loan_rows
+from Models.loan_models import LoanApproval
+from Controller.downsamplingController import sample_ranks, sample_sorted_column
+
+
+def post_graph(client, **payload):
+    return client.post('/loan_approval/graph', json={'column_name': 'income', **payload})
+
+
+@pytest.mark.parametrize('total, points, expected', [
+    (5, 10, [1, 2, 3, 4, 5]),
+    (10, 4, [1, 4, 7, 10]),
+    (1000, 3, [1, 500, 1000]),
+])
+def test_sample_ranks(total, points, expected):
+    assert sample_ranks(total, points).tolist() == expected
+
+
+def test_sampled_values_are_the_sorted_values_at_their_positions(app):
+    rows = [(i, float((i * 7919) % 1000), 1.0, 300, 'Approved', 1.0) for i in range(1, 1001)]
+    add_loans(rows)
+
+    positions, values, total = sample_sorted_column(LoanApproval, 'income', 50)
+
+    ordered = np.sort([row[1] for row in rows])
+    assert total == 1000
+    assert len(values) == 50
+    assert (positions[0], positions[-1]) == (0, 999)
+    np.testing.assert_array_equal(values, ordered[positions])
+
+
+def test_small_columns_are_returned_whole(app):
+    add_loans(loan_rows(8))
+
+    positions, values, total = sample_sorted_column(LoanApproval, 'credit_score', 50)
+
+    assert (positions.tolist(), total) == (list(range(8)), 8)
+    assert values.tolist() == [301.0 + i for i in range(8)]
+
+
+def test_graph_points_are_bounded_by_the_config(app, client):
+    app.config['GRAPH_MAX_POINTS'] = 10
+    add_loans(loan_rows(100))
+
+    body = post_graph(client, format='json').get_json()
+
+    assert body['total'] == 100
+    assert len(body['points']) == 10
+    assert body['points'][0] == [0, 1001000.0]
+    assert body['points'][-1] == [99, 1100000.0]
+
+
+def test_graph_png(client):
+    add_loans(loan_rows(20))
+
+    response = post_graph(client)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+
+
+def test_categorical_graph_is_drawn_from_the_counts(client):
+    add_loans(loan_rows(9))
+
+    body = post_graph(client, column_name='loan_status', format='json').get_json()
+    png = post_graph(client, column_name='loan_status')
+
+    assert body == {'column': 'loan_status', 'categories': ['Approved', 'Rejected'], 'counts': [6, 3], 'total': 9}
+    assert (png.status_code, png.mimetype) == (200, 'image/png')
+
+
+@pytest.mark.parametrize('payload, error', [
+    ({'column_name': 'nope'}, "Column 'nope' does not exist in the LoanApproval table"),
+    ({'format': 'gif'}, 'Unsupported format: gif, expected one of png, svg, json'),
+    ({}, "No data available for column 'income'"),
+])
+def test_invalid_graph_requests_are_rejected(client, payload, error):
+    response = post_graph(client, **payload)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
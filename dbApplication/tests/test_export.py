@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import pytest
+from conftest import add_loans, csv_upload, loan_rows, movie_csv
+from Controller.exportController import generate_csv, generate_ndjson
+
+
+def test_loan_ndjson_export_streams_every_filtered_row(client):
+    add_loans(loan_rows(25))
+
+    response = client.post('/loan_approval/export',
+                           json={'filters': [{'column': 'loan_status', 'value': 'Approved'}]})
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=loans.ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['loan_id'] for row in rows] == [i for i in range(1, 26) if i % 3]
+    assert rows[0] == {'loan_id': 1, 'income': 1001000.0, 'loan_amount': 5000100.0, 'credit_score': 301,
+                       'loan_status': 'Approved', 'asset_value': 2000010.0}
+
+
+def test_loan_csv_export(client):
+    add_loans(loan_rows(4))
+
+    response = client.post('/loan_approval/export?format=csv', json={})
+
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['loan_id', 'income', 'loan_amount', 'credit_score', 'loan_status', 'asset_value']
+    assert [row[0] for row in rows[1:]] == ['1', '2', '3', '4']
+
+
+def test_movie_export_applies_the_filters(client):
+    client.post('/movies/upload_csv', data=csv_upload(movie_csv(30)))
+
+    response = client.get('/movies/export?genre=crime&format=csv')
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 10
+    assert {row['genre'] for row in rows} == {'Crime'}
+
+
+def test_empty_export(client):
+    assert client.post('/loan_approval/export', json={}).get_data() == b''
+    assert client.post('/loan_approval/export?format=csv', json={}).get_data(as_text=True).strip() == \
+        'loan_id,income,loan_amount,credit_score,loan_status,asset_value'
+
+
+@pytest.mark.parametrize('request_args', [
+    ('post', '/loan_approval/export?format=xml', {'json': {}}),
+    ('get', '/movies/export?format=xlsx', {}),
+])
+def test_unsupported_format_is_rejected(client, request_args):
+    method, url, kwargs = request_args
+
+    response = getattr(client, method)(url, **kwargs)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Unsupported export format')
+
+
+def test_invalid_filter_is_rejected_before_streaming(client):
+    response = client.post('/loan_approval/export', json={'filters': [{'column': 'nope', 'value': 1}]})
+
+    assert response.status_code == 400
+
+
+def test_serializers_emit_one_chunk_per_batch():
+    rows = [(i, f'name {i}') for i in range(5)]
+
+    ndjson_chunks = list(generate_ndjson(iter(rows), ['id', 'name'], 2))
+    csv_chunks = list(generate_csv(iter(rows), ['id', 'name'], 2))
+
+    assert [chunk.count('\n') for chunk in ndjson_chunks] == [2, 2, 1]
+    assert len(csv_chunks) == 3
+    assert ''.join(csv_chunks).splitlines() == ['id,name'] + [f'{i},name {i}' for i in range(5)]
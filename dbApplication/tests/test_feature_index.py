@@ -0,0 +1,181 @@
+import io
+import numpy as np
+import pytest
+from conftest import image_bytes, upload_image
+from Models.dbModel import db
+from Models.image_model import Image
+from Controller import featureIndexController
+from Controller.featureIndexController import HASH_BITS, VECTOR_DIM, FeatureIndex, extract_features
+from Controller.storageController import get_storage
+
+
+def synthetic_entries(count, first_id=1, seed=0):
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 2 ** 63, count, dtype=np.uint64)
+    vectors = rng.random((count, VECTOR_DIM), dtype=np.float32)
+    vectors /= vectors.sum(axis=1, keepdims=True)
+    return [(first_id + i, {'phash': int(hashes[i]), 'color': vectors[i]}) for i in range(count)]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return FeatureIndex(str(tmp_path / 'index'))
+
+
+@pytest.fixture
+def entries():
+    return synthetic_entries(50)
+
+
+def brute_force(entries, query, by):
+    def score(features):
+        hamming = bin(features['phash'] ^ query['phash']).count('1')
+        color = float(np.linalg.norm(features['color'] - query['color']))
+        return {'phash': hamming, 'color': color,
+                'combined': 0.5 * color / np.sqrt(2 / 3) + 0.5 * hamming / HASH_BITS}[by]
+    return sorted(entries, key=lambda entry: score(entry[1]))
+
+
+@pytest.mark.parametrize('by', ['combined', 'color'])
+def test_search_returns_the_nearest_images(index, entries, by):
+    index.add(entries)
+    query = synthetic_entries(1, seed=1)[0][1]
+
+    results = index.search(query, 5, by)
+
+    assert [result['image_id'] for result in results] == [image_id for image_id, _ in brute_force(entries, query, by)[:5]]
+    assert [result['score'] for result in results] == sorted(result['score'] for result in results)
+
+
+def test_hash_search_cuts_at_the_kth_distance(index, entries):
+    index.add(entries)
+    query = entries[7][1]
+
+    results = index.search(query, 5, 'phash', exclude_id=8)
+
+    expected = sorted(bin(features['phash'] ^ query['phash']).count('1') for image_id, features in entries if image_id != 8)
+    assert [result['phash_distance'] for result in results] == expected[:5]
+    assert 8 not in [result['image_id'] for result in results]
+
+
+def test_duplicates_are_found_by_hash_distance(index, entries):
+    index.add(entries)
+    near = entries[3][1]['phash'] ^ 0b101
+
+    assert index.duplicates(near, 2) == [{'image_id': 4, 'distance': 2}]
+    assert index.duplicates(near, 1) == []
+
+
+def test_known_and_repeated_ids_are_skipped(index, entries):
+    assert index.add(entries[:10]) == 10
+
+    assert index.add(entries[5:15] + entries[12:13]) == 5
+    assert index.count == 15
+    assert sorted(index.ids[:index.count].tolist()) == list(range(1, 16))
+    assert index.row_of(12) == 11
+    assert index.missing_ids([3, 99, 15, 16]) == [99, 16]
+
+
+def test_the_index_grows_and_keeps_its_rows(index, monkeypatch):
+    monkeypatch.setattr(featureIndexController, 'MIN_CAPACITY', 4)
+    entries = synthetic_entries(11)
+
+    for offset in range(0, 11, 3):
+        index.add(entries[offset:offset + 3])
+
+    assert len(index.ids) == 16
+    assert index.ids[:index.count].tolist() == list(range(1, 12))
+    assert np.allclose(index.norms[:11], [np.dot(features['color'], features['color']) for _, features in entries])
+    assert index.search(entries[9][1], 1, 'color')[0]['image_id'] == 10
+
+
+def test_snapshots_are_unaffected_by_later_appends(index, entries):
+    index.add(entries[:10])
+    snapshot = index.snapshot()
+
+    index.add(entries[10:])
+
+    assert snapshot.count == 10
+    assert len(snapshot.norms) >= snapshot.count
+    assert index.snapshot().count == 50
+
+
+def test_other_processes_see_new_rows(index, entries):
+    index.add(entries[:10])
+    other = FeatureIndex(index.directory)
+
+    index.add(entries[10:20])
+
+    assert other.row_of(15) == 14
+    assert other.search(entries[14][1], 1, 'color')[0]['image_id'] == 15
+    assert other.add(entries[:20]) == 0
+
+
+def test_uploads_report_duplicates(client):
+    upload_image(client, image_bytes(seed=4, size=(64, 64)))
+
+    copy = client.post('/images/upload_image',
+                       data={'image': (io.BytesIO(image_bytes(seed=4, size=(64, 64), image_format='JPEG')), 'copy.jpg')})
+    rejected = client.post('/images/upload_image?reject_duplicates=true',
+                           data={'image': (io.BytesIO(image_bytes(seed=4, size=(64, 64))), 'again.png')})
+
+    assert copy.get_json()['duplicates'][0]['distance'] <= 4
+    assert rejected.status_code == 409
+    assert Image.query.count() == 2
+
+
+def test_similar_images_are_ranked(client):
+    ids = [upload_image(client, image_bytes(color=color, size=(16, 16)), f'{i}.png')
+           for i, color in enumerate([(250, 0, 0), (240, 10, 0), (0, 0, 250)])]
+
+    response = client.get(f'/images/similar/{ids[0]}?k=2&by=color')
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [result['image_id'] for result in body['results']] == [ids[1], ids[2]]
+    assert body['indexed'] == 3
+
+
+def test_images_uploaded_before_the_index_are_reindexed(app, client):
+    ids = [upload_image(client, image_bytes(seed=i), f'{i}.png') for i in range(3)]
+    app.config['IMAGE_FEATURE_INDEX_DIR'] = app.config['IMAGE_FEATURE_INDEX_DIR'] + '-new'
+
+    first = client.post('/images/features/reindex?limit=2').get_json()
+    second = client.post(f"/images/features/reindex?after={first['next_after']}&limit=1").get_json()
+
+    assert (first['indexed'], first['next_after']) == (2, ids[1])
+    assert (second['indexed'], second['next_after'], second['failed']) == (3, None, [])
+
+
+def test_query_images_missing_from_the_index_are_indexed(app, client):
+    image_id = upload_image(client, image_bytes(seed=1))
+    app.config['IMAGE_FEATURE_INDEX_DIR'] = app.config['IMAGE_FEATURE_INDEX_DIR'] + '-new'
+
+    body = client.get(f'/images/similar/{image_id}').get_json()
+
+    assert (body['results'], body['indexed']) == ([], 1)
+    assert body['phash'] == f"{extract_features(image_bytes(seed=1))['phash']:016x}"
+
+
+@pytest.mark.parametrize('query, error', [
+    ('by=size', 'Unsupported measure: size, expected one of combined, phash, color'),
+    ('k=abc', 'k must be an integer'),
+    ('k=101', 'k must be between 1 and 100'),
+])
+def test_invalid_searches(client, query, error):
+    image_id = upload_image(client, image_bytes())
+
+    response = client.get(f'/images/similar/{image_id}?{query}')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_similar_to_unknown_or_undecodable_images(app, client):
+    image_id = upload_image(client, image_bytes())
+    image = db.session.get(Image, image_id)
+    get_storage().put(b'not an image', key=image.public_id)
+    app.config['IMAGE_FEATURE_INDEX_DIR'] = app.config['IMAGE_FEATURE_INDEX_DIR'] + '-new'
+
+    assert client.get('/images/similar/99').status_code == 404
+    assert client.get(f'/images/similar/{image_id}').status_code == 422
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Query
+from conftest import add_loans, loan_rows
+from Models.dbModel import db
+from Controller.loan_approvalController import LOAN_CSV_COLUMNS, compute_group_stats
+
+ROWS = loan_rows(90) + [(91, 9000000.0, 5009100.0, 391, 'Rejected', 2000910.0)]
+
+
+@pytest.fixture
+def loans(app):
+    add_loans(ROWS)
+    return pd.DataFrame(ROWS, columns=LOAN_CSV_COLUMNS)
+
+
+def post_stats(client, **payload):
+    response = client.post('/loan_approval/stats', json=payload)
+    return response.status_code, response.get_json()
+
+
+def expected_stats(values):
+    values = np.sort(np.asarray(values, dtype=float))
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    q1, q3 = round(q1, 1), round(q3, 1)
+    uniques, counts = np.unique(values, return_counts=True)
+    return {
+        'mean': round(values.mean(), 1),
+        'median': round(median, 1),
+        'mode': uniques[np.argmax(counts)],
+        'q1': q1,
+        'q3': q3,
+        'outliers': [v for v in values if v < q1 - 1.5 * (q3 - q1) or v > q3 + 1.5 * (q3 - q1)],
+    }
+
+
+def test_filtered_stats_cover_the_matching_rows_only(client, loans):
+    status, body = post_stats(client, column_name='income',
+                              filters=[{'column': 'loan_status', 'value': 'Rejected'}])
+
+    assert status == 200
+    assert body == expected_stats(loans.loc[loans['loan_status'] == 'Rejected', 'income'])
+    assert body['outliers'] == [9000000.0]
+
+
+def test_grouped_stats_match_numpy_per_group(client, loans):
+    status, body = post_stats(client, column_name='loan_amount', group_by=[
+        'loan_status', {'column': 'credit_score', 'bucket_size': 30}])
+
+    assert status == 200
+    assert body['group_by'] == ['loan_status', 'credit_score_bucket']
+    loans['credit_score_bucket'] = loans['credit_score'] // 30 * 30
+    expected = loans.groupby(['loan_status', 'credit_score_bucket'])['loan_amount']
+    assert [(group['loan_status'], group['credit_score_bucket']) for group in body['groups']] == list(expected.groups)
+    for group, (_, values) in zip(body['groups'], expected):
+        del group['loan_status'], group['credit_score_bucket']
+        assert group.pop('count') == len(values)
+        assert group == expected_stats(values)
+
+
+def test_grouped_stats_are_one_query(client, loans):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        status, body = post_stats(client, column_name='income', group_by=['loan_status'],
+                                  filters=[{'column': 'credit_score', 'operator': 'greater_than', 'value': 320}])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert status == 200
+    assert len(body['groups']) == 2
+    assert len([statement for statement in statements if statement.startswith('SELECT')]) == 1
+
+
+def test_filters_matching_nothing_give_no_groups(client, loans):
+    status, body = post_stats(client, column_name='income', group_by=['loan_status'],
+                              filters=[{'column': 'income', 'operator': 'less_than', 'value': 0}])
+
+    assert (status, body) == (200, {'group_by': ['loan_status'], 'groups': []})
+
+
+def test_grouped_stats_are_cached_until_a_write(client, loans):
+    payload = {'column_name': 'income', 'group_by': ['loan_status']}
+    first = post_stats(client, **payload)[1]
+    assert post_stats(client, **payload)[1] == first
+    assert [group['count'] for group in first['groups']] == [60, 31]
+
+    add_loans([(92, 1.0, 1.0, 300, 'Approved', 1.0)])
+
+    groups = post_stats(client, **payload)[1]['groups']
+    assert [group['count'] for group in groups] == [61, 31]
+
+
+def test_compute_group_stats_ties_pick_the_smallest_mode():
+    values = np.array([5, 3, 3, 5, 1, 7, 7, 2], dtype=float)
+    codes = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+
+    results = compute_group_stats(values, codes)
+
+    assert [(result['code'], result['count'], result['mode']) for result in results] == [(0, 4, 3.0), (1, 4, 7.0)]
+    assert results[1]['median'] == np.median([1, 7, 7, 2])
+
+
+@pytest.mark.parametrize('payload, error', [
+    ({'filters': [{'column': 'loan_id', 'value': 1}]}, 'Unsupported column: loan_id'),
+    ({'group_by': ['income']}, "Column 'income' can only be grouped with a bucket_size"),
+    ({'filters': [{'column': 'loan_status', 'value': 'Unknown'}]}, 'Not enough data points to compute statistics'),
+    ({'group_by': 'loan_status'}, 'group_by must be a list'),
+    ({'group_by': [['loan_status']]}, "Unsupported group_by entry: ['loan_status']"),
+])
+def test_invalid_filtered_requests_are_rejected(client, loans, payload, error):
+    status, body = post_stats(client, column_name='income', **payload)
+
+    assert status == 400
+    assert body == {'error': error}
+
+
+def test_columns_holding_only_nan_are_not_enough_data(client, loans, monkeypatch):
+    # SQLite stores NaN as NULL, other backends return it as a float
+    monkeypatch.setattr(Query, 'all', lambda query: [(float('nan'),)] * 3)
+
+    status, body = post_stats(client, column_name='income', filters=[{'column': 'loan_status', 'value': 'Rejected'}])
+
+    assert (status, body) == (400, {'error': 'Not enough data points to compute statistics'})
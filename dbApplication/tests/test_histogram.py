@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from conftest import add_loans, loan_rows
+from Models.dbModel import db
+from Models.loan_models import LoanApproval
+from Controller.histogramController import compute_histogram, get_column_range
+
+
+def random_loans(count):
+    rng = np.random.default_rng(4)
+    incomes = rng.lognormal(13, 0.6, count)
+    scores = rng.integers(300, 900, count)
+    return [(i + 1, float(incomes[i]), 1000.0, int(scores[i]), 'Approved', 1.0) for i in range(count)]
+
+
+def post_histogram(client, **payload):
+    response = client.post('/loan_approval/histogram', json=payload)
+    return response.status_code, response.get_json()
+
+
+@pytest.mark.parametrize('column, bins', [('income', 10), ('income', 37), ('credit_score', 10), ('credit_score', 600)])
+def test_histogram_matches_numpy(client, column, bins):
+    rows = random_loans(500)
+    add_loans(rows)
+    values = [row[1 if column == 'income' else 3] for row in rows]
+
+    status, body = post_histogram(client, column_name=column, bins=bins)
+
+    counts, edges = np.histogram(values, bins=bins)
+    assert status == 200
+    assert body['counts'] == counts.tolist()
+    np.testing.assert_allclose(body['edges'], edges)
+    assert body['total'] == 500
+
+
+def test_equal_values_fall_in_the_middle_bin(app):
+    add_loans([(i, 5.0, 1.0, 700, 'Approved', 1.0) for i in range(1, 4)])
+
+    histogram = compute_histogram(LoanApproval, 'credit_score', 3)
+
+    assert histogram['edges'] == [699.5, 699.8333333333334, 700.1666666666666, 700.5]
+    assert histogram['counts'] == [0, 3, 0]
+
+
+def test_filtered_query(app):
+    add_loans(loan_rows(30))
+
+    histogram = compute_histogram(LoanApproval, 'income', 3, LoanApproval.query.filter_by(loan_status='Rejected'))
+
+    assert histogram['counts'] == [3, 3, 4]
+    assert histogram['total'] == 10
+
+
+def test_column_range_follows_writes(app):
+    add_loans(loan_rows(10))
+    assert get_column_range(LoanApproval, 'credit_score') == (301, 310)
+
+    db.session.get(LoanApproval, 1).credit_score = 250
+    db.session.commit()
+
+    assert get_column_range(LoanApproval, 'credit_score') == (250, 310)
+    assert compute_histogram(LoanApproval, 'credit_score', 2)['counts'] == [1, 9]
+
+
+def test_chart_json_format_returns_the_bins(client):
+    add_loans(loan_rows(20))
+
+    response = client.post('/loan_approval/chart', json={'column_name': 'income', 'bins': 4, 'format': 'json'})
+
+    assert response.mimetype == 'application/json'
+    assert response.get_json()['counts'] == [5, 5, 5, 5]
+
+
+def test_categorical_chart_counts_every_value(client):
+    empty = client.post('/loan_approval/chart', json={'column_name': 'loan_status'})
+    add_loans(loan_rows(9))
+
+    body = client.post('/loan_approval/chart', json={'column_name': 'loan_status', 'format': 'json'}).get_json()
+    png = client.post('/loan_approval/chart', json={'column_name': 'loan_status'})
+    svg = client.post('/loan_approval/chart', json={'column_name': 'loan_status', 'format': 'svg'})
+
+    assert body == {'column': 'loan_status', 'categories': ['Approved', 'Rejected'], 'counts': [6, 3], 'total': 9}
+    assert (png.status_code, png.mimetype) == (200, 'image/png')
+    assert svg.mimetype == 'image/svg+xml'
+    assert empty.get_json() == {'error': "No data available for column 'loan_status'"}
+
+
+def test_empty_column(client):
+    assert post_histogram(client, column_name='income') == \
+        (400, {'error': "No data available for column 'income'"})
+
+
+@pytest.mark.parametrize('payload, error', [
+    ({'column_name': 'nope'}, "Column 'nope' does not exist in the LoanApproval table"),
+    ({'column_name': 'loan_status'}, "Column 'loan_status' is not numeric"),
+    ({'column_name': 'income', 'bins': 0}, 'bins must be an integer between 1 and 1000'),
+    ({'column_name': 'income', 'bins': 1001}, 'bins must be an integer between 1 and 1000'),
+    ({'column_name': 'income', 'bins': True}, 'bins must be an integer between 1 and 1000'),
+    ({'column_name': 'income', 'bins': '10'}, 'bins must be an integer between 1 and 1000'),
+    ({}, "Please provide a 'column_name' in the request body"),
+])
+def test_invalid_requests_are_rejected(client, payload, error):
+    add_loans(loan_rows(5))
+
+    assert post_histogram(client, **payload) == (400, {'error': error})
@@ -0,0 +1,94 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from Controller import httpClientController
+from Controller.httpClientController import DownloadTooLarge, download, get_session
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        if self.path == '/flaky' and server.requests.count('/flaky') < 3:
+            self.reply(503, b'busy')
+        elif self.path == '/missing':
+            self.reply(404, b'not found')
+        elif self.path == '/unannounced':
+            # No Content-Length, the body ends when the connection closes
+            self.send_response(200)
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(b'x' * 5000)
+            self.close_connection = True
+        else:
+            self.reply(200, b'x' * (5000 if self.path == '/large' else 100))
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(app):
+    app.config['HTTP_RETRY_BACKOFF'] = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.requests, httpd.connections = [], 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+    httpClientController._sessions.clear()
+
+
+def test_connections_are_reused(server):
+    httpd, base = server
+
+    bodies = [download(f'{base}/image{i}') for i in range(5)]
+
+    assert bodies == [b'x' * 100] * 5
+    assert httpd.connections == 1
+
+
+def test_failed_requests_are_retried(server):
+    httpd, base = server
+
+    assert download(f'{base}/flaky') == b'x' * 100
+    assert httpd.requests.count('/flaky') == 3
+
+
+def test_error_status_raises(server):
+    _, base = server
+
+    with pytest.raises(requests.HTTPError):
+        download(f'{base}/missing')
+
+
+@pytest.mark.parametrize('path', ['/large', '/unannounced'])
+def test_downloads_are_bounded(server, path):
+    _, base = server
+
+    with pytest.raises(DownloadTooLarge):
+        download(f'{base}{path}', max_bytes=1000)
+    assert len(download(f'{base}{path}', max_bytes=5000)) == 5000
+
+
+def test_sessions_follow_the_settings(app):
+    session = get_session()
+    assert get_session() is session
+
+    app.config['HTTP_POOL_MAXSIZE'] = 2
+    assert get_session() is not session
+    httpClientController._sessions.clear()
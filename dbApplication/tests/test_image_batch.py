@@ -0,0 +1,220 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+import pytest
+from conftest import image_bytes, upload_image
+from Models.dbModel import db
+from Models.image_model import Image, ImageVariant
+from Controller import imageBatchController
+from Controller.imageBatchController import discard_process_pool, prefetch_sources
+from Controller.imageCacheController import get_decoded_image
+from Controller.storageController import get_storage
+
+
+@pytest.fixture(scope='module', autouse=True)
+def process_pool():
+    yield
+    discard_process_pool()
+
+
+@pytest.fixture
+def app(app):
+    app.config['IMAGE_PROCESS_WORKERS'] = 2
+    return app
+
+
+@pytest.fixture
+def image_ids(client):
+    return [upload_image(client, image_bytes(seed=i, size=(40, 20)), f'image{i}.png') for i in range(3)]
+
+
+def batch(client, **data):
+    response = client.post('/images/batch_process', json=data)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    return {line['image_id']: line for line in lines[:-1]}, lines[-1]['summary']
+
+
+def test_pipeline_results_are_stored_as_variants(client, image_ids):
+    lines, summary = batch(client, image_ids=image_ids, operations=[{'op': 'resize', 'width': 20}])
+
+    assert set(lines) == set(image_ids)
+    assert all(line['status'] == 'processed' and (line['width'], line['height']) == (20, 10)
+               for line in lines.values())
+    assert (summary['processed'], summary['cached'], summary['failed'], summary['not_found']) == (3, 0, 0, 0)
+    assert ImageVariant.query.count() == 3
+    assert client.get(lines[image_ids[0]]['url']).status_code == 200
+
+
+def test_a_rerun_returns_the_stored_variants(client, image_ids):
+    operations = [{'op': 'crop', 'x': 0, 'y': 0, 'width': 10, 'height': 10}]
+    first, _ = batch(client, image_ids=image_ids, operations=operations)
+
+    again, summary = batch(client, image_ids=image_ids, operations=operations)
+
+    assert summary['cached'] == 3
+    assert all(again[image_id]['variant_id'] == first[image_id]['variant_id'] for image_id in image_ids)
+    assert ImageVariant.query.count() == 3
+
+
+def test_histogram_steps_always_run(client, image_ids):
+    operations = [{'op': 'histogram', 'bins': 4}]
+
+    lines, summary = batch(client, image_ids=image_ids[:1], operations=operations)
+
+    line = lines[image_ids[0]]
+    assert summary['processed'] == 1
+    assert 'url' not in line
+    assert line['histograms'][0]['bins'] == 4
+    assert [sum(channel) for channel in line['histograms'][0]['channels'].values()] == [800] * 3
+
+
+def test_decoded_images_are_shared_with_the_workers(app, client, image_ids):
+    image = db.session.get(Image, image_ids[0])
+    get_decoded_image(image.public_id, image.url)
+
+    lines, summary = batch(client, image_ids=image_ids[:1], operations=[{'op': 'resize', 'height': 5}])
+
+    assert summary['processed'] == 1
+    assert (lines[image_ids[0]]['width'], lines[image_ids[0]]['height']) == (10, 5)
+
+
+def test_missing_and_failing_images(client, image_ids):
+    image = db.session.get(Image, image_ids[1])
+    get_storage().put(b'not an image', key=image.public_id)
+    operations = [{'op': 'crop', 'x': 0, 'y': 0, 'width': 30, 'height': 20}, {'op': 'histogram'}]
+
+    lines, summary = batch(client, image_ids=[image_ids[0], 999, image_ids[1]], operations=operations)
+
+    assert lines[999] == {'image_id': 999, 'status': 'not_found'}
+    assert lines[image_ids[0]]['status'] == 'processed'
+    assert lines[image_ids[1]] == {'image_id': image_ids[1], 'status': 'failed', 'error': 'Image could not be decoded'}
+    assert (summary['processed'], summary['failed'], summary['not_found']) == (1, 1, 1)
+
+
+def test_crops_outside_the_image_fail(client, image_ids):
+    lines, summary = batch(client, image_ids=image_ids[:1],
+                           operations=[{'op': 'crop', 'x': 30, 'y': 0, 'width': 20, 'height': 20}])
+
+    assert lines[image_ids[0]]['error'] == 'Crop area exceeds image bounds'
+    assert summary['failed'] == 1
+
+
+@pytest.mark.parametrize('data, error', [
+    ({'operations': [{'op': 'resize', 'width': 5}]}, 'image_ids must be a non-empty list'),
+    ({'image_ids': ['1'], 'operations': [{'op': 'resize', 'width': 5}]}, 'image_ids must be integers'),
+    ({'image_ids': [1], 'operations': []}, 'operations must be a non-empty list'),
+    ({'image_ids': [1], 'operations': [{'op': 'blur'}]},
+     'Unsupported operation: blur, expected resize, crop, segment or histogram'),
+    ({'image_ids': [1], 'operations': [{'op': 'resize'}]}, 'resize needs a width or a height'),
+    ({'image_ids': [1], 'operations': [{'op': 'segment', 'lower_bound': [0, 0], 'upper_bound': [1, 1, 1]}]},
+     "'lower_bound' of the segment operation must be three integers [H, S, V]"),
+    ({'image_ids': [1], 'operations': [{'op': 'resize', 'width': 5}], 'format': 'tiff'},
+     'Unsupported format: tiff, expected one of png, jpeg, jpg, webp'),
+])
+def test_invalid_batches_are_rejected(client, data, error):
+    response = client.post('/images/batch_process', json=data)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_batch_size_is_bounded(app, client):
+    app.config['IMAGE_BATCH_MAX_IDS'] = 2
+
+    response = client.post('/images/batch_process', json={'image_ids': [1, 2, 3], 'operations': [{'op': 'histogram'}]})
+
+    assert response.get_json() == {'error': 'A batch has at most 2 images'}
+
+
+def test_batch_histograms_are_computed_once(client, image_ids):
+    data = {'image_ids': image_ids + [999], 'bins': 8, 'colorspaces': ['rgb', 'hsv']}
+
+    first = client.post('/images/histograms', json=data).get_json()
+    second = client.post('/images/histograms', json=data).get_json()
+
+    assert [result['image_id'] for result in first['results']] == image_ids
+    assert (first['computed'], second['computed']) == (3, 0)
+    assert first['not_found'] == [999]
+    assert all(result['cached'] for result in second['results'])
+    assert second['results'] == [{**result, 'cached': True} for result in first['results']]
+    assert sum(first['results'][0]['histograms']['rgb']['channels']['r']) == 800
+
+
+def test_batch_histograms_of_undecodable_images(client, image_ids):
+    image = db.session.get(Image, image_ids[0])
+    get_storage().put(b'not an image', key=image.public_id)
+
+    body = client.post('/images/histograms', json={'image_ids': image_ids[:2]}).get_json()
+
+    assert body['failed'] == [{'image_id': image_ids[0], 'error': 'Image could not be decoded'}]
+    assert [result['image_id'] for result in body['results']] == [image_ids[1]]
+
+
+def test_prefetch_keeps_the_order_and_downloads_in_parallel(app, monkeypatch):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def slow_download(key, url):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return key.encode()
+
+    monkeypatch.setattr(imageBatchController, 'get_image_bytes', slow_download)
+    images = [Image(public_id=f'image{i}', url=f'url{i}') for i in range(6)]
+
+    with app.test_request_context():
+        results = [(entry, future and future.result())
+                   for entry, future in prefetch_sources(images + [None], lambda image: image, workers=3)]
+
+    assert results == [(image, image.public_id.encode()) for image in images] + [(None, None)]
+    assert peak[0] == 3
+
+
+class RecordingPool:
+    """
+    Runs the histogram tasks inline and records how many results were submitted but not collected yet.
+    """
+
+    def __init__(self):
+        self.in_flight = self.peak = 0
+
+    def submit(self, function, *args):
+        pool = self
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+        class CollectedFuture(Future):
+            def result(self, timeout=None):
+                pool.in_flight -= 1
+                return super().result(timeout)
+
+        future = CollectedFuture()
+        future.set_result(function(*args))
+        return future
+
+
+def test_batch_histograms_bound_the_images_in_flight(app, client, monkeypatch):
+    app.config['IMAGE_PROCESS_WORKERS'] = 1
+    image_ids = [upload_image(client, image_bytes(seed=i), f'image{i}.png') for i in range(6)]
+    pool = RecordingPool()
+    monkeypatch.setattr(imageBatchController, 'get_process_pool', lambda: pool)
+
+    body = client.post('/images/histograms', json={'image_ids': image_ids, 'bins': 4}).get_json()
+
+    assert body['computed'] == 6
+    assert pool.peak == 2
+    assert pool.in_flight == 0
+
+
+@pytest.mark.parametrize('approximate', ['false', 0, None])
+def test_batch_histograms_need_a_boolean_approximate(client, approximate):
+    response = client.post('/images/histograms', json={'image_ids': [1], 'approximate': approximate})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'approximate must be true or false'}
@@ -0,0 +1,104 @@
+import os
+import numpy as np
+import pytest
+from conftest import image_bytes
+from Controller import imageCacheController
+from Controller.imageCacheController import disk_cache_path, get_decoded_image, get_image_bytes
+
+
+class RemoteStub:
+    """
+    Stand-in for a remote store, every get is a download.
+    """
+
+    name = 'remote'
+
+    def __init__(self):
+        self.downloads = []
+
+    def get(self, key, url=None):
+        self.downloads.append(key)
+        return image_bytes(size=(8, 8)) if key.startswith('image') else bytes(100)
+
+
+@pytest.fixture
+def remote(app, tmp_path, monkeypatch):
+    app.config['IMAGE_CACHE_DIR'] = str(tmp_path / 'image_cache')
+    stub = RemoteStub()
+    monkeypatch.setattr(imageCacheController, 'get_storage', lambda: stub)
+    return stub
+
+
+def age(path, seconds_ago):
+    timestamp = os.path.getmtime(path) - seconds_ago
+    os.utime(path, (timestamp, timestamp))
+
+
+def test_bytes_are_downloaded_once_per_url(remote):
+    assert get_image_bytes('a', 'http://cdn/a?v=1') == get_image_bytes('a', 'http://cdn/a?v=1')
+    get_image_bytes('a', 'http://cdn/a?v=2')
+
+    assert remote.downloads == ['a', 'a']
+
+
+def test_least_recently_used_files_are_evicted(app, remote):
+    app.config['IMAGE_CACHE_DIR_MAX_BYTES'] = 250
+    for i, key in enumerate(['a', 'b']):
+        get_image_bytes(key, key)
+        age(disk_cache_path(key, key), 100 - i)
+    get_image_bytes('a', 'a')  # Refreshes a, b is now the oldest
+
+    get_image_bytes('c', 'c')
+
+    assert os.path.exists(disk_cache_path('a', 'a'))
+    assert not os.path.exists(disk_cache_path('b', 'b'))
+    assert os.path.exists(disk_cache_path('c', 'c'))
+    assert imageCacheController._disk_bytes[app.config['IMAGE_CACHE_DIR']] == 200
+
+
+def test_existing_files_count_against_the_budget(app, remote):
+    get_image_bytes('a', 'a')
+    get_image_bytes('b', 'b')
+    imageCacheController._disk_bytes.clear()  # A new process
+    app.config['IMAGE_CACHE_DIR_MAX_BYTES'] = 150
+
+    get_image_bytes('c', 'c')
+
+    assert len([path for path in (disk_cache_path(key, key) for key in 'abc') if os.path.exists(path)]) == 1
+
+
+def test_files_larger_than_the_budget_are_not_cached(app, remote):
+    app.config['IMAGE_CACHE_DIR_MAX_BYTES'] = 50
+
+    get_image_bytes('a', 'a')
+
+    assert not os.path.exists(disk_cache_path('a', 'a'))
+
+
+def test_no_disk_tier_for_the_local_store(app):
+    app.config['IMAGE_CACHE_DIR'] = 'image_cache'
+
+    assert disk_cache_path('a', 'a') is None
+
+
+def test_decoded_images_are_shared_and_read_only(remote):
+    bgr = get_decoded_image('image-1', 'url')
+    hsv = get_decoded_image('image-1', 'url', 'HSV')
+
+    assert get_decoded_image('image-1', 'url') is bgr
+    assert not bgr.flags.writeable
+    assert bgr[0, 0].tolist() == [30, 30, 200]
+    assert hsv.shape == bgr.shape
+    assert remote.downloads == ['image-1']
+
+
+def test_decoded_cache_is_bounded(app, remote):
+    app.config['IMAGE_CACHE_MAX_BYTES'] = 2 * 8 * 8 * 3
+
+    for key in ('image-1', 'image-2', 'image-3'):
+        get_decoded_image(key, 'url')
+
+    assert [key[0] for key in imageCacheController._decoded] == ['image-2', 'image-3']
+    assert imageCacheController._decoded_bytes == 2 * 8 * 8 * 3
+    assert isinstance(get_decoded_image('image-1', 'url'), np.ndarray)
+    assert remote.downloads == ['image-1', 'image-2', 'image-3']
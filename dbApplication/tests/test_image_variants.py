@@ -0,0 +1,128 @@
+import io
+import pytest
+from PIL import Image as PILImage
+from conftest import image_bytes, upload_image
+from Models.dbModel import db
+from Models.image_model import Image, ImageVariant
+from Controller import imageVariantController
+from Controller.imageVariantController import normalize_variant_params, render_variant, store_variant, variant_hash
+from Controller.storageController import get_storage
+
+
+@pytest.fixture
+def image_id(client):
+    return upload_image(client, image_bytes(seed=1, size=(40, 20)))
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+    render = imageVariantController.render_variant
+
+    def counting_render(content, params):
+        calls.append(params)
+        return render(content, params)
+
+    monkeypatch.setattr(imageVariantController, 'render_variant', counting_render)
+    return calls
+
+
+def opened(response):
+    return PILImage.open(io.BytesIO(response.data))
+
+
+def test_render_keeps_the_aspect_ratio(client, image_id):
+    response = client.get(f'/images/{image_id}/render?w=20&fmt=jpeg')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert opened(response).size == (20, 10)
+
+
+def test_variants_are_rendered_once(client, image_id, renders):
+    first = client.get(f'/images/{image_id}/render?crop=0,0,20,20&h=5')
+    second = client.get(f'/images/{image_id}/render?h=5&crop=0,0,20,20')
+    not_modified = client.get(f'/images/{image_id}/render?crop=0,0,20,20&h=5',
+                              headers={'If-None-Match': first.headers['ETag']})
+
+    assert opened(first).size == (5, 5)
+    assert second.data == first.data
+    assert not_modified.status_code == 304
+    assert len(renders) == 1
+    assert ImageVariant.query.count() == 1
+
+
+def test_the_original_is_untouched(client, image_id):
+    image = db.session.get(Image, image_id)
+
+    client.post(f'/images/resize_image/{image_id}', json={'width': 4, 'height': 4, 'format_type': 'png'})
+
+    assert get_storage().get(image.public_id) == image_bytes(seed=1, size=(40, 20))
+
+
+def test_resize_and_crop_routes_return_the_stored_variant(client, image_id):
+    resized = client.post(f'/images/resize_image/{image_id}', json={'width': 10, 'height': 8}).get_json()
+    again = client.post(f'/images/resize_image/{image_id}', json={'width': 10, 'height': 8}).get_json()
+    cropped = client.post(f'/images/crop_image/{image_id}', json={'x': 5, 'y': 5, 'width': 10, 'height': 10}).get_json()
+
+    assert resized['variant'] == again['variant']
+    assert (resized['variant']['width'], resized['variant']['height']) == (10, 8)
+    assert (cropped['variant']['width'], cropped['variant']['height']) == (10, 10)
+    assert client.get(resized['image_url']).status_code == 200
+
+
+def test_identical_outputs_share_one_stored_object(client):
+    first = upload_image(client, image_bytes(color=(1, 2, 3)))
+    second = upload_image(client, image_bytes(color=(1, 2, 3)), 'copy.png')
+
+    keys = {client.post(f'/images/resize_image/{image_id}', json={'width': 4, 'height': 4}).get_json()['variant']
+            ['storage_key'] for image_id in (first, second)}
+
+    assert len(keys) == 1
+    assert ImageVariant.query.count() == 2
+
+
+def test_a_request_losing_the_race_returns_the_stored_variant(app, image_id):
+    image = db.session.get(Image, image_id)
+    params = normalize_variant_params(8, 8)
+    params_hash = variant_hash(image, params)
+    content, img_format, width, height = render_variant(get_storage().get(image.public_id), params)
+
+    winner = store_variant(image, params_hash, params, content, img_format, width, height)
+    loser = store_variant(image, params_hash, params, content, img_format, width, height)
+
+    assert loser.id == winner.id
+    assert ImageVariant.query.count() == 1
+
+
+def test_a_new_upload_of_the_original_gets_new_variants(app, image_id):
+    image = db.session.get(Image, image_id)
+    params = normalize_variant_params(8, 8)
+    before = variant_hash(image, params)
+
+    image.url = get_storage().put(image_bytes(seed=2), key=image.public_id)['url']
+
+    assert variant_hash(image, params) != before
+
+
+@pytest.mark.parametrize('query, error', [
+    ('', 'At least one of w, h, crop or fmt is required'),
+    ('w=abc', 'w must be an integer'),
+    ('h=0', 'h must be between 1 and 4096'),
+    ('crop=1,2,3', 'crop must be four integers: x,y,w,h'),
+    ('crop=-1,0,5,5', 'crop must have a non-negative origin and a positive size'),
+    ('crop=30,0,20,20', 'Crop area exceeds image bounds'),
+    ('fmt=tiff', 'Unsupported format: tiff, expected one of png, jpeg, jpg, webp, gif, bmp'),
+])
+def test_invalid_variants_are_rejected(client, image_id, query, error):
+    response = client.get(f'/images/{image_id}/render?{query}')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_missing_image(client):
+    response = client.get('/images/7/render?w=5')
+
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Image not found'}
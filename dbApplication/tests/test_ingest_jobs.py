@@ -0,0 +1,188 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from conftest import csv_upload, loan_csv, loan_rows
+from app import create_app
+from Models.dbModel import db
+from Models.job_model import IngestJob
+from Models.loan_models import LoanApproval
+from Controller.jobController import (JOB_UPLOAD_FOLDER, PROCESS_TOKEN, job_owner, owner_is_alive, recover_jobs,
+                                      run_ingest_job)
+
+
+def queued_job(job_id, content, status='queued', **fields):
+    """
+    Records a queued loans job with its spooled CSV, without handing it to the background pool.
+    """
+    filepath = os.path.join(JOB_UPLOAD_FOLDER, f'{job_id}.csv')
+    with open(filepath, 'wb') as spool:
+        spool.write(content)
+    job = IngestJob(id=job_id, kind='loans', status=status, filepath=filepath, **fields)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def running_job(job_id, owner, heartbeat_age=0):
+    heartbeat = datetime.utcnow() - timedelta(seconds=heartbeat_age)
+    return queued_job(job_id, b'', status='running', owner=owner, started_at=heartbeat, heartbeat_at=heartbeat)
+
+
+def wait_for_job(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        body = client.get(f'/jobs/{job_id}').get_json()
+        if body['status'] in ('succeeded', 'failed'):
+            return body
+        time.sleep(0.02)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_async_upload_runs_in_the_background(client):
+    response = client.post('/upload_csv', data=csv_upload(loan_csv(loan_rows(30)), chunk_size='10', **{'async': 'true'}))
+
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    assert response.get_json()['status_url'] == f'/jobs/{job_id}'
+
+    body = wait_for_job(client, job_id)
+    assert (body['status'], body['chunks'], body['rows_inserted']) == ('succeeded', 3, 30)
+    assert LoanApproval.query.count() == 30
+    assert not os.path.exists(os.path.join(JOB_UPLOAD_FOLDER, f'{job_id}.csv'))
+
+
+def test_failed_job_reports_its_error(client):
+    response = client.post('/upload_csv', data=b'loan_id\n1\n', content_type='text/csv', query_string={'async': '1'})
+
+    body = wait_for_job(client, response.get_json()['job_id'])
+    assert body['status'] == 'failed'
+    assert body['error'] == 'Missing required column: income'
+
+
+@pytest.mark.parametrize('kind, data, error', [
+    ('movies', {'mode': 'upsert'}, 'Movies uploads only support the insert mode'),
+    ('loans', {'mode': 'merge'}, 'Unsupported mode: merge'),
+])
+def test_async_upload_rejects_unsupported_modes(client, kind, data, error):
+    url = '/movies/upload_csv' if kind == 'movies' else '/upload_csv'
+    response = client.post(url, data=csv_upload(b'a\n1\n', **{'async': 'true'}, **data))
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    assert IngestJob.query.count() == 0
+
+
+def test_unknown_job_is_not_found(client):
+    assert client.get('/jobs/missing').status_code == 404
+
+
+def test_job_is_claimed_by_exactly_one_worker(app):
+    queued_job('claimed', loan_csv(loan_rows(50)), chunk_size=10)
+    barrier = threading.Barrier(4)
+
+    def worker():
+        barrier.wait()
+        run_ingest_job(app, 'claimed')
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    db.session.expire_all()
+    job = db.session.get(IngestJob, 'claimed')
+    # A second run of the file would have failed on the primary key
+    assert (job.status, job.error, job.rows_inserted) == ('succeeded', None, 50)
+    assert job.owner == job_owner()
+    assert LoanApproval.query.count() == 50
+
+
+def test_job_that_is_not_queued_is_not_run_again(app):
+    running_job('running', job_owner())
+    run_ingest_job(app, 'running')
+
+    db.session.expire_all()
+    job = db.session.get(IngestJob, 'running')
+    assert (job.status, job.finished_at) == ('running', None)
+
+
+def test_creating_the_app_does_not_touch_jobs(app):
+    running_job('orphan', f'{socket.gethostname()}:{dead_pid()}:{PROCESS_TOKEN}')
+    queued_job('waiting', loan_csv(loan_rows(1)))
+
+    create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI']})
+
+    db.session.expire_all()
+    assert db.session.get(IngestJob, 'orphan').status == 'running'
+    assert db.session.get(IngestJob, 'waiting').status == 'queued'
+
+
+def test_recovery_fails_only_orphaned_jobs_and_resubmits_queued_ones(app):
+    host = socket.gethostname()
+    running_job('dead_owner', f'{host}:{dead_pid()}:{PROCESS_TOKEN}')
+    running_job('previous_process', f'{host}:{os.getpid()}:00000000')
+    running_job('live_owner', job_owner())
+    running_job('remote_live', 'other-host:1:abcdef12')
+    running_job('remote_stale', 'other-host:1:abcdef12', heartbeat_age=3600)
+    running_job('unowned', None)
+    queued_job('waiting', loan_csv(loan_rows(3)))
+    resubmitted = []
+
+    result = recover_jobs(app, run_queued=resubmitted.append)
+
+    assert sorted(result['failed']) == ['dead_owner', 'previous_process', 'remote_stale', 'unowned']
+    assert result['resubmitted'] == resubmitted == ['waiting']
+    db.session.expire_all()
+    statuses = {job.id: job.status for job in IngestJob.query}
+    assert statuses == {'dead_owner': 'failed', 'previous_process': 'failed', 'remote_stale': 'failed',
+                        'unowned': 'failed', 'live_owner': 'running', 'remote_live': 'running', 'waiting': 'queued'}
+    assert db.session.get(IngestJob, 'dead_owner').error == 'Interrupted by a server restart'
+
+
+def test_recovery_before_migration_does_nothing(app):
+    db.drop_all()
+
+    assert recover_jobs(app) == {'failed': [], 'resubmitted': []}
+
+
+def test_recover_jobs_command_runs_queued_jobs(app):
+    queued_job('waiting', loan_csv(loan_rows(4)))
+    running_job('orphan', f'{socket.gethostname()}:{dead_pid()}:{PROCESS_TOKEN}')
+
+    result = app.test_cli_runner().invoke(args=['recover-jobs'])
+
+    assert result.exit_code == 0
+    assert '1 orphaned jobs marked as failed, 1 queued jobs run' in result.output
+    db.session.expire_all()
+    assert db.session.get(IngestJob, 'waiting').status == 'succeeded'
+    assert LoanApproval.query.count() == 4
+
+
+@pytest.mark.parametrize('owner, alive', [
+    (None, False),
+    ('garbage', False),
+    ('other-host:12:abcdef12', True),
+])
+def test_owner_is_alive(owner, alive):
+    assert owner_is_alive(owner) is alive
+
+
+def test_owner_is_alive_checks_local_processes():
+    host = socket.gethostname()
+
+    assert owner_is_alive(job_owner())
+    assert owner_is_alive(f'{host}:{os.getppid()}:abcdef12')
+    assert not owner_is_alive(f'{host}:{dead_pid()}:abcdef12')
+    assert not owner_is_alive(f'{host}:{os.getpid()}:abcdef12')
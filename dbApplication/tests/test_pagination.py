@@ -0,0 +1,116 @@
+import pytest
+from conftest import add_loans, csv_upload, loan_rows, movie_csv
+from Models.dbModel import db
+from Models.image_model import Image
+from Controller.paginationController import decode_cursor, encode_cursor, resolve_limit
+
+
+def walk(client, url, items_key, method='get', payload=None, **params):
+    """
+    Follows next_cursor from the first page to the last one and returns the ids seen and the pages.
+    """
+    ids, pages, after = [], [], None
+    while True:
+        if method == 'get':
+            body = client.get(url, query_string={**params, **({'after': after} if after else {})}).get_json()
+        else:
+            body = client.post(url, json={**payload, **params, **({'after': after} if after else {})}).get_json()
+        pages.append(body)
+        ids += [item.get('loan_id', item.get('id')) for item in body[items_key]]
+        if not body['has_more']:
+            assert body['next_cursor'] is None
+            return ids, pages
+        after = body['next_cursor']
+
+
+def test_loan_pages_cover_every_row_once(client):
+    add_loans(loan_rows(23))
+
+    ids, pages = walk(client, '/loan_approval', 'data', limit=5)
+
+    assert ids == list(range(1, 24))
+    assert [len(page['data']) for page in pages] == [5, 5, 5, 5, 3]
+    assert 'total' not in pages[0]
+
+
+def test_filtered_loan_pages(client):
+    add_loans(loan_rows(30))
+    payload = {'filters': [{'column': 'loan_status', 'value': 'Rejected'}]}
+
+    ids, pages = walk(client, '/loan_approval/filter', 'filtered_loans', method='post', payload=payload, limit=4,
+                      with_total=True)
+
+    assert ids == list(range(3, 31, 3))
+    assert all(page['total'] == 10 for page in pages)
+
+
+def test_movie_and_movie_filter_pages(client):
+    client.post('/movies/upload_csv', data=csv_upload(movie_csv(12)))
+
+    all_ids, _ = walk(client, '/movies/', 'data', limit=5)
+    drama_ids, _ = walk(client, '/movies/filter', 'data', genre='Drama', limit=2)
+
+    assert all_ids == list(range(1, 13))
+    assert drama_ids == [1, 4, 7, 10]
+
+
+def test_image_pages(client):
+    db.session.add_all([Image(filename=f'{i}.png', url=f'http://images/{i}.png', public_id=f'image-{i}')
+                        for i in range(7)])
+    db.session.commit()
+
+    ids, pages = walk(client, '/images/fetch_images', 'images', limit=3, with_total='true')
+
+    assert ids == list(range(1, 8))
+    assert pages[0]['total'] == 7
+
+
+def test_offset_pagination_is_unchanged(client):
+    add_loans(loan_rows(12))
+
+    body = client.get('/loan_approval?page=1').get_json()
+
+    assert (body['page'], body['total_items'], body['total_pages']) == (1, 12, 1)
+    assert [loan['loan_id'] for loan in body['data']] == list(range(1, 13))
+
+
+def test_cached_total_follows_writes(client):
+    add_loans(loan_rows(5))
+    assert client.get('/loan_approval?limit=2&with_total=1').get_json()['total'] == 5
+
+    add_loans(loan_rows(3, start=6))
+    assert client.get('/loan_approval?limit=2&with_total=1').get_json()['total'] == 8
+
+    client.delete('/loan_approval/1')
+    assert client.get('/loan_approval?limit=2&with_total=1').get_json()['total'] == 7
+
+
+@pytest.mark.parametrize('url', ['/loan_approval?after=garbage', '/movies/?after=e30', '/images/fetch_images?after=!!'])
+def test_invalid_cursor_is_rejected(client, url):
+    response = client.get(url)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+
+@pytest.mark.parametrize('value', [[1, 2], {'id': 1}, 1.5, '7', True, None])
+def test_cursors_must_hold_an_integer_key(client, value):
+    response = client.post('/loan_approval/filter', json={'after': encode_cursor(value)})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(12345)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == 12345
+
+
+def test_limit_is_clamped(app):
+    app.config['MAX_PAGE_LIMIT'] = 50
+
+    assert resolve_limit(None) == 20
+    assert resolve_limit(0) == 1
+    assert resolve_limit(10000) == 50
@@ -0,0 +1,74 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from Controller import plottingController
+from Controller.plottingController import borrow_template, render_histogram, render_lines, render_scatter
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+@pytest.fixture(autouse=True)
+def empty_pool(monkeypatch):
+    monkeypatch.setattr(plottingController, '_templates', {})
+
+
+def test_templates_are_reused_across_threads():
+    render_histogram([1, 2, 3], [0, 1, 2, 3], 'First', 'x')
+    template = plottingController._templates['histogram'][0]
+
+    thread = threading.Thread(target=render_histogram, args=([3, 2, 1], [0, 1, 2, 3], 'Second', 'x'))
+    thread.start()
+    thread.join()
+
+    assert plottingController._templates['histogram'] == [template]
+    assert template['axes'].get_title() == 'Second'
+
+
+def test_concurrent_renders_match_serial_ones():
+    charts = [([i, 2 * i, 3], [0, 1, 2, 3]) for i in range(1, 9)]
+    serial = [render_histogram(counts, edges, 'Chart', 'x') for counts, edges in charts]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        concurrent = list(executor.map(lambda chart: render_histogram(*chart, 'Chart', 'x'), charts))
+
+    assert concurrent == serial
+    assert 1 <= len(plottingController._templates['histogram']) <= plottingController.MAX_IDLE_TEMPLATES
+
+
+def test_busy_templates_are_not_shared():
+    with borrow_template('line') as first, borrow_template('line') as second:
+        assert first is not second
+
+    assert len(plottingController._templates['line']) == 2
+
+
+def test_a_failed_render_drops_its_template():
+    with pytest.raises(ValueError):
+        render_histogram([1, 2], [0, 1, 2, 3, 4], 'Broken', 'x')
+
+    assert plottingController._templates['histogram'] == []
+
+
+def test_histogram_bars_follow_the_bin_count():
+    render_histogram([1, 2, 3], [0, 1, 2, 3], 'Three', 'x')
+    render_histogram([5, 4], [0, 10, 20], 'Two', 'x')
+
+    bars = plottingController._templates['histogram'][0]['bars']
+    assert [(bar.get_x(), bar.get_width(), bar.get_height()) for bar in bars] == [(0, 10, 5), (10, 10, 4)]
+
+
+def test_formats():
+    assert render_lines([{'y': [3, 1, 2], 'label': 'a'}, {'y': [1, 2]}], 'Lines', 'x', 'y').startswith(PNG_SIGNATURE)
+    svg = render_scatter(np.array([[0, 1], [2, 3]]), 'Points', 'x', 'y', image_format='svg')
+    assert svg.lstrip().startswith(b'<?xml')
+    assert b'Points' in svg
+
+
+def test_unused_lines_are_hidden():
+    render_lines([{'y': [1, 2]}, {'y': [2, 1]}], 'Two', 'x', 'y')
+    render_lines([{'y': [1, 2, 3]}], 'One', 'x', 'y')
+
+    lines = plottingController._templates['line'][0]['lines']
+    assert [line.get_visible() for line in lines] == [True, False]
+    assert list(lines[0].get_xdata()) == [0, 1, 2]
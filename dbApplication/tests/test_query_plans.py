@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import inspect
+from conftest import add_loans, csv_upload, loan_rows, movie_csv
+from Models.dbModel import db
+from Controller.queryPlanController import is_full_scan
+
+
+@pytest.fixture
+def data(client):
+    add_loans(loan_rows(200))
+    client.post('/movies/upload_csv', data=csv_upload(movie_csv(200)))
+
+
+def explain_loans(client, filters, **payload):
+    response = client.post('/loan_approval/explain', json={'filters': filters, **payload})
+    return response.status_code, response.get_json()
+
+
+@pytest.mark.parametrize('filters, index', [
+    ([{'column': 'loan_status', 'value': 'Approved'}, {'column': 'credit_score', 'operator': 'greater_than', 'value': 700}],
+     'ix_loan_approval_status_credit_score'),
+    ([{'column': 'income', 'operator': 'greater_than', 'value': 1100000}], 'ix_loan_approval_income'),
+])
+def test_loan_filters_are_served_by_an_index(client, data, filters, index):
+    status, body = explain_loans(client, filters)
+
+    assert status == 200
+    assert index in body['indexes_used']
+    assert body['full_scan'] is False
+    assert 'WHERE' in body['sql']
+
+
+def test_explain_covers_aggregate_queries(client, data):
+    status, body = explain_loans(client, [{'column': 'loan_status', 'value': 'Approved'}],
+                                 aggregates=[{'type': 'avg', 'field': 'income'}], group_by=['loan_status'])
+
+    assert status == 200
+    assert 'avg(loan_approval.income)' in body['sql']
+    assert 'ix_loan_approval_status_credit_score' in body['indexes_used']
+
+
+def test_explain_rejects_invalid_filters(client, data):
+    status, body = explain_loans(client, [{'column': 'loan_id', 'value': 1}])
+
+    assert status == 400
+    assert body['error'] == 'Unsupported column: loan_id'
+
+
+def test_movie_genre_filter_scans_and_has_no_index(client, data):
+    body = client.get('/movies/explain?genre=dra').get_json()
+
+    assert body['params'] == ['%dra%']
+    assert body['full_scan'] is True
+    assert body['indexes_used'] == []
+    assert 'genre' not in {column for index in inspect(db.engine).get_indexes('movies')
+                           for column in index['column_names']}
+
+
+@pytest.mark.parametrize('query, index', [
+    ('release_year=1995&min_rating=7', 'ix_movies_release_year_rating'),
+    ('genre=drama&release_year=1995', 'ix_movies_release_year_rating'),
+    ('min_gross=250', 'ix_movies_gross'),
+])
+def test_movie_filters_are_served_by_an_index(client, data, query, index):
+    body = client.get(f'/movies/explain?{query}').get_json()
+
+    assert index in body['indexes_used']
+    assert body['full_scan'] is False
+
+
+def test_genre_filter_is_a_case_insensitive_partial_match(client, data):
+    body = client.get('/movies/filter?genre=RAM&per_page=100').get_json()
+
+    assert body['total_items'] == 67
+    assert {movie['genre'] for movie in body['data']} == {'Drama'}
+
+
+@pytest.mark.parametrize('line, full_scan', [
+    ('SCAN movies', True),
+    ('SCAN movies USING COVERING INDEX ix_movies_gross', False),
+    ('SEARCH movies USING INDEX ix_movies_gross (gross>?)', False),
+    ('Seq Scan on movies  (cost=0.00..35.50 rows=10 width=4)', True),
+    ('Index Scan using ix_movies_gross on movies', False),
+])
+def test_is_full_scan(line, full_scan):
+    assert is_full_scan(line) is full_scan
@@ -0,0 +1,105 @@
+import json
+import os
+import numpy as np
+import pytest
+from conftest import image_bytes, upload_image
+from Models.dbModel import db
+from Models.image_model import Image
+from Controller.imageBatchController import discard_process_pool, get_process_pool
+from Controller.imageCacheController import get_decoded_image
+from Controller.imageWorkerController import load_source
+from Controller.sharedBufferController import ImageBufferManager, attach_buffer, get_buffer_manager
+
+
+@pytest.fixture
+def buffers(tmp_path):
+    manager = ImageBufferManager(str(tmp_path / 'buffers'))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def pixels():
+    return np.random.default_rng(0).integers(0, 256, (20, 30, 3), dtype=np.uint8)
+
+
+def test_shared_arrays_are_mapped_read_only(buffers, pixels):
+    handle = buffers.share(pixels)
+
+    view = attach_buffer(handle)
+
+    assert np.array_equal(view, pixels)
+    assert handle.shape == pixels.shape and np.dtype(handle.dtype) == np.uint8
+    with pytest.raises(ValueError):
+        view[0, 0, 0] = 1
+
+
+def test_workers_can_write_allocated_buffers(buffers):
+    handle, _ = buffers.allocate((4, 4), np.float32)
+
+    attach_buffer(handle, writable=True)[1] = 2.5
+
+    assert buffers.view(handle)[1].tolist() == [2.5] * 4
+    assert buffers.view(handle).dtype == np.float32
+
+
+def test_released_buffers_are_deleted(buffers, pixels):
+    handle = buffers.share(pixels)
+    view = attach_buffer(handle)
+
+    buffers.release(handle)
+    buffers.release(handle)
+
+    assert not os.path.exists(handle.path)
+    assert len(buffers) == 0
+    assert np.array_equal(view, pixels)  # Views attached before the release stay valid
+    with pytest.raises(FileNotFoundError):
+        attach_buffer(handle)
+
+
+def test_close_releases_every_buffer(buffers, pixels):
+    handles = [buffers.share(pixels) for _ in range(3)]
+
+    buffers.close()
+
+    assert len(buffers) == 0
+    assert not any(os.path.exists(handle.path) for handle in handles)
+
+
+def test_worker_processes_read_the_shared_pixels(app, buffers, pixels):
+    app.config['IMAGE_PROCESS_WORKERS'] = 1
+    try:
+        loaded = get_process_pool().submit(load_source, buffers.share(pixels)).result(timeout=60)
+    finally:
+        discard_process_pool()
+
+    assert np.array_equal(loaded, pixels)
+
+
+def test_one_manager_per_directory(app, tmp_path):
+    app.config['IMAGE_BUFFER_DIR'] = str(tmp_path / 'shm')
+
+    assert get_buffer_manager() is get_buffer_manager()
+    assert get_buffer_manager().directory == str(tmp_path / 'shm')
+    assert os.path.isdir(tmp_path / 'shm')
+
+
+def test_batches_release_their_buffers(app, client, tmp_path):
+    app.config['IMAGE_BUFFER_DIR'] = str(tmp_path / 'shm')
+    app.config['IMAGE_PROCESS_WORKERS'] = 2
+    image_ids = [upload_image(client, image_bytes(seed=i), f'image{i}.png') for i in range(3)]
+    for image_id in image_ids:
+        image = db.session.get(Image, image_id)
+        get_decoded_image(image.public_id, image.url)
+
+    try:
+        stream = client.post('/images/batch_process', json={'image_ids': image_ids, 'operations': [{'op': 'histogram'}]})
+        summary = json.loads(stream.get_data(as_text=True).splitlines()[-1])['summary']
+        histograms = client.post('/images/histograms', json={'image_ids': image_ids}).get_json()
+    finally:
+        discard_process_pool()
+
+    assert summary['processed'] == 3
+    assert histograms['computed'] == 3
+    assert len(get_buffer_manager()) == 0
+    assert os.listdir(tmp_path / 'shm') == []
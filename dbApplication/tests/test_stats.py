@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from conftest import add_loans, loan_rows
+from Models.dbModel import db
+from Models.loan_models import LoanApproval
+from Controller import statsCacheController
+from Controller.statsCacheController import QuantileSketch
+
+COLUMNS = ['income', 'loan_amount', 'credit_score', 'asset_value']
+
+
+def post_stats(client, **payload):
+    response = client.post('/loan_approval/stats', json=payload)
+    return response.status_code, response.get_json()
+
+
+@pytest.mark.parametrize('column', COLUMNS)
+def test_sketch_statistics_match_the_exact_ones(client, column):
+    add_loans(loan_rows(200))
+
+    _, approximate = post_stats(client, column_name=column)
+    _, exact = post_stats(client, column_name=column, exact=True)
+
+    assert approximate.pop('approximate') is True
+    assert approximate.pop('count') == 200
+    assert approximate.pop('outliers_truncated') is False
+    assert approximate == exact
+
+
+def test_exact_sketch_quantiles_are_numpy_percentiles():
+    values = np.random.default_rng(1).normal(size=999)
+    sketch = QuantileSketch(k=1024)
+    sketch.update(values)
+
+    np.testing.assert_allclose(sketch.quantiles([0, 0.25, 0.5, 0.75, 1]),
+                               np.percentile(values, [0, 25, 50, 75, 100]))
+
+
+def test_compacted_sketch_stays_within_its_rank_error():
+    values = np.random.default_rng(2).uniform(size=100000)
+    sketch = QuantileSketch(k=256, seed=3)
+    for batch in np.array_split(values, 20):
+        sketch.update(batch)
+
+    assert len(sketch.levels) > 1
+    estimates = sketch.quantiles([0.1, 0.5, 0.9])
+    assert np.abs(np.searchsorted(np.sort(values), estimates) / len(values) - [0.1, 0.5, 0.9]).max() < 0.02
+
+
+def test_mode_is_the_most_frequent_value(client):
+    add_loans(loan_rows(10))
+    for loan_id in (4, 5, 6):
+        db.session.get(LoanApproval, loan_id).credit_score = 777
+    db.session.commit()
+
+    _, body = post_stats(client, column_name='credit_score')
+
+    assert body['approximate'] is True
+    assert body['mode'] == 777
+
+
+def test_summary_follows_committed_writes(client):
+    add_loans(loan_rows(50))
+    assert post_stats(client, column_name='income')[1]['count'] == 50
+
+    add_loans(loan_rows(10, start=51))
+    db.session.delete(db.session.get(LoanApproval, 1))
+    db.session.commit()
+
+    _, body = post_stats(client, column_name='income')
+    incomes = [row[0] for row in db.session.query(LoanApproval.income)]
+    assert body['count'] == 59
+    assert body['mean'] == round(np.mean(incomes), 1)
+
+
+def test_building_a_summary_leaves_the_request_session_alone(app):
+    add_loans(loan_rows(5))
+    db.session.add(LoanApproval(loan_id=99, income=1.0, loan_amount=1.0, credit_score=1, loan_status='Approved',
+                                asset_value=1.0))
+
+    summary = statsCacheController.build_summary('loan_approval', 'income')
+    db.session.rollback()
+
+    assert summary.count == 5
+    assert db.session.get(LoanApproval, 99) is None
+
+
+@pytest.mark.parametrize('payload, status, error', [
+    ({}, 400, "Please provide a 'column_name' in the request body"),
+    ({'column_name': 'nope'}, 400, "Column 'nope' does not exist in the LoanApproval table"),
+])
+def test_invalid_requests_are_rejected(client, payload, status, error):
+    assert post_stats(client, **payload) == (status, {'error': error})
+
+
+def test_too_few_values(client):
+    add_loans(loan_rows(1))
+
+    assert post_stats(client, column_name='income') == (400, {'error': 'Not enough data points to compute statistics'})
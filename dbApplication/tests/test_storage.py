@@ -0,0 +1,115 @@
+import hashlib
+import os
+import pytest
+from conftest import image_bytes, upload_image
+from Controller import storageController
+from Controller.storageController import LocalStorage, StorageBackend, get_storage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path / 'store'))
+
+
+def objects(storage):
+    return sorted(name for _, _, names in os.walk(storage.objects) for name in names)
+
+
+def test_put_get_stat(storage):
+    stored = storage.put(b'first', 'photo.PNG')
+
+    digest = hashlib.sha256(b'first').hexdigest()
+    assert stored['key'].endswith('.png')
+    assert stored['url'] == f"/images/files/{stored['key']}?v={digest[:16]}"
+    assert storage.get(stored['key']) == b'first'
+    assert storage.stat(stored['key']) == stored
+
+
+def test_identical_uploads_share_one_object(storage):
+    first = storage.put(b'same', 'a.png')
+    second = storage.put(b'same', 'b.png')
+
+    assert first['key'] != second['key']
+    assert objects(storage) == [hashlib.sha256(b'same').hexdigest()]
+
+    storage.delete(first['key'])
+    assert storage.get(second['key']) == b'same'
+    storage.delete(second['key'])
+    assert objects(storage) == []
+    assert storage.stat(second['key']) is None
+
+
+def test_replacing_a_key_changes_its_url_and_releases_the_old_object(storage):
+    first = storage.put(b'version 1', key='photo')
+
+    second = storage.put(b'version 2', key='photo')
+
+    assert second['url'] != first['url']
+    assert storage.get('photo') == b'version 2'
+    assert objects(storage) == [hashlib.sha256(b'version 2').hexdigest()]
+
+
+def test_keys_are_resolved_without_hashing(storage, monkeypatch):
+    storage.put(b'content', key='photo')
+    monkeypatch.setattr(storageController.hashlib, 'sha256', None)
+
+    assert storage.stat('photo')['size'] == 7
+    storage.delete('photo')
+    assert objects(storage) == []
+
+
+def test_missing_or_stale_digests_are_recomputed(storage):
+    stored = storage.put(b'content', key='photo')
+    os.remove(storage.digest_path('photo'))
+    assert storage.stat('photo') == stored
+
+    with open(storage.digest_path('photo'), 'w') as digest_file:
+        digest_file.write(hashlib.sha256(b'other').hexdigest())
+    assert storage.stat('photo') == stored
+    with open(storage.digest_path('photo')) as digest_file:
+        assert digest_file.read() == hashlib.sha256(b'content').hexdigest()
+
+
+def test_unknown_keys(storage):
+    assert storage.stat('missing') is None
+    storage.delete('missing')
+    with pytest.raises(FileNotFoundError):
+        storage.get('missing')
+
+
+@pytest.mark.parametrize('key', ['', '../escape', '.hidden', 'a/b'])
+def test_invalid_keys_are_rejected(storage, key):
+    with pytest.raises(ValueError):
+        storage.stat(key)
+
+
+def test_stored_files_are_served(client):
+    upload_image(client, image_bytes(image_format='JPEG'), 'photo.jpg')
+    url = client.get('/images/fetch_images').get_json()['images'][0]['url']
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert response.data == image_bytes(image_format='JPEG')
+
+
+@pytest.mark.parametrize('key, status', [('missing.png', 404), ('.hidden', 400)])
+def test_serving_unknown_or_invalid_keys(client, key, status):
+    assert client.get(f'/images/files/{key}').status_code == status
+
+
+def test_unknown_backend(app):
+    app.config['IMAGE_STORAGE_BACKEND'] = 's3'
+
+    with pytest.raises(ValueError, match='Unknown image storage backend: s3'):
+        get_storage()
+
+
+def test_incomplete_backends_cannot_be_created():
+    class WriteOnlyStorage(StorageBackend):
+        def put(self, data, filename=None, key=None):
+            return {}
+
+    with pytest.raises(TypeError, match='get'):
+        WriteOnlyStorage()
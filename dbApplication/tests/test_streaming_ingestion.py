@@ -0,0 +1,116 @@
+import io
+import pytest
+from conftest import csv_upload, loan_csv, loan_rows, movie_csv
+from Models.dbModel import db
+from Models.loan_models import LoanApproval
+from Models.movies_model import Movies
+from Controller.ingestionController import read_csv_header, stream_csv_into_table
+from Controller.loan_approvalController import LOAN_CSV_COLUMNS, clean_loan_frame
+from Routes.route_utils import is_flag_requested
+
+
+def test_loan_stream_upload_commits_chunk_by_chunk(client):
+    rows = loan_rows(9) + [(10, 'bad', 1, 1, 'Approved', 1)]
+    response = client.post('/upload_csv', data=csv_upload(loan_csv(rows), stream='true', chunk_size='4'))
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['chunks'], body['rows_read'], body['rows_inserted'], body['rows_dropped']) == (3, 10, 9, 1)
+    assert body['rejected_by_column'] == {'income': 1}
+    assert LoanApproval.query.count() == 9
+
+
+def test_raw_csv_body_is_streamed(client):
+    response = client.post('/upload_csv?chunk_size=2', data=loan_csv(loan_rows(5)), content_type='text/csv')
+
+    assert response.status_code == 201
+    assert response.get_json()['chunks'] == 3
+    assert LoanApproval.query.count() == 5
+
+
+def test_movie_stream_upload(client):
+    response = client.post('/movies/upload_csv', data=csv_upload(movie_csv(12), stream='1', chunk_size='5'))
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['chunks'], body['rows_inserted']) == (3, 12)
+    assert Movies.query.count() == 12
+
+
+def test_movie_raw_csv_body_is_streamed(client):
+    response = client.post('/movies/upload_csv', data=movie_csv(3), content_type='text/csv')
+
+    assert response.status_code == 201
+    assert Movies.query.count() == 3
+
+
+@pytest.mark.parametrize('url', ['/upload_csv', '/movies/upload_csv'])
+@pytest.mark.parametrize('flag', ['stream', 'async'])
+def test_stream_and_async_uploads_without_file_part_are_rejected(client, url, flag):
+    response = client.post(url, data={flag: 'true'})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'No file part'
+
+
+@pytest.mark.parametrize('url', ['/upload_csv', '/movies/upload_csv'])
+@pytest.mark.parametrize('filename, error', [
+    ('', 'No selected file'),
+    ('data.txt', 'Invalid file format, please upload a CSV file'),
+])
+def test_stream_uploads_validate_the_file_name(client, url, filename, error):
+    response = client.post(url, data=csv_upload(b'a\n1\n', filename, stream='true'))
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_missing_column_is_reported_before_any_row_is_written(client):
+    content = b'loan_id,income,loan_amount,credit_score,loan_status\n1,2,3,4,Approved\n'
+    response = client.post('/upload_csv', data=content, content_type='text/csv')
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['error'] == 'Missing required column: asset_value'
+    assert body['rows_read'] == 0
+    assert LoanApproval.query.count() == 0
+
+
+def test_failed_chunk_keeps_the_committed_chunks(app):
+    # loan 3 appears twice, the second chunk violates the primary key
+    content = loan_csv(loan_rows(4) + loan_rows(1, start=3))
+    with pytest.raises(Exception):
+        stream_csv_into_table(io.BytesIO(content), LoanApproval, LOAN_CSV_COLUMNS, clean_loan_frame, chunk_size=4)
+    db.session.rollback()
+
+    assert LoanApproval.query.count() == 4
+
+
+def test_progress_is_reported_after_every_chunk(app):
+    reports = []
+    progress, error = stream_csv_into_table(io.BytesIO(loan_csv(loan_rows(5))), LoanApproval, LOAN_CSV_COLUMNS,
+                                            clean_loan_frame, chunk_size=2,
+                                            on_chunk=lambda progress: reports.append(progress['rows_inserted']))
+
+    assert error is None
+    assert reports == [2, 4, 5]
+    assert progress['chunks'] == 3
+
+
+def test_read_csv_header_strips_bom_and_spaces():
+    stream = io.BytesIO('﻿loan_id, income ,loan_status\n1,2,3\n'.encode('utf-8'))
+
+    assert read_csv_header(stream) == ['loan_id', 'income', 'loan_status']
+    assert stream.readline() == b'1,2,3\n'
+
+
+@pytest.mark.parametrize('query, expected', [('?stream=true', True), ('?stream=1', True), ('?stream=YES', True),
+                                             ('?stream=no', False), ('', False)])
+def test_is_flag_requested(app, query, expected):
+    with app.test_request_context(f'/upload_csv{query}', method='POST'):
+        assert is_flag_requested('stream') is expected
+
+
+def test_form_flag_wins_over_query_argument(app):
+    with app.test_request_context('/upload_csv?stream=true', method='POST', data={'stream': 'false'}):
+        assert is_flag_requested('stream') is False
@@ -0,0 +1,78 @@
+import pandas as pd
+from conftest import csv_upload, loan_csv, loan_rows
+from Models.dbModel import db
+from Models.loan_models import LoanApproval
+from Controller.ingestionController import upsert_dataframe
+from Controller.loan_approvalController import LOAN_CSV_COLUMNS, LOAN_KEY_COLUMNS
+
+
+def changed(row, **values):
+    columns = dict(zip(LOAN_CSV_COLUMNS, row))
+    columns.update(values)
+    return tuple(columns.values())
+
+
+def test_reupload_in_upsert_mode_resyncs_existing_rows(client):
+    rows = loan_rows(5)
+    client.post('/upload_csv', data=csv_upload(loan_csv(rows)))
+
+    updated = [rows[0], changed(rows[1], income=1.5), rows[2], changed(rows[3], loan_status='Rejected'), rows[4]]
+    response = client.post('/upload_csv', data=csv_upload(loan_csv(updated + loan_rows(2, start=6)), mode='upsert'))
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['rows_inserted'], body['rows_updated'], body['rows_unchanged']) == (2, 2, 3)
+    assert body['message'] == '2 loans added, 2 updated and 3 unchanged'
+    assert LoanApproval.query.count() == 7
+    assert db.session.get(LoanApproval, 2).income == 1.5
+    assert db.session.get(LoanApproval, 4).loan_status == 'Rejected'
+
+
+def test_plain_reupload_fails_on_the_primary_key(client):
+    client.post('/upload_csv', data=csv_upload(loan_csv(loan_rows(2))))
+
+    response = client.post('/upload_csv', data=csv_upload(loan_csv(loan_rows(2))))
+
+    assert response.status_code == 500
+    assert LoanApproval.query.count() == 2
+
+
+def test_stream_upsert_counts_across_chunks(client):
+    client.post('/upload_csv', data=csv_upload(loan_csv(loan_rows(4))))
+    rows = [changed(row, asset_value=1.0) for row in loan_rows(3)] + loan_rows(3, start=4)
+
+    response = client.post('/upload_csv?mode=upsert&chunk_size=2', data=loan_csv(rows), content_type='text/csv')
+
+    body = response.get_json()
+    assert response.status_code == 201
+    assert (body['chunks'], body['rows_inserted'], body['rows_updated'], body['rows_unchanged']) == (3, 2, 3, 1)
+    assert [loan.asset_value for loan in LoanApproval.query.order_by(LoanApproval.loan_id).limit(3)] == [1.0] * 3
+
+
+def test_last_occurrence_of_a_duplicate_key_wins(app):
+    rows = loan_rows(2)
+    frame = pd.DataFrame(rows + [changed(rows[0], income=42.0)], columns=LOAN_CSV_COLUMNS)
+
+    counts = upsert_dataframe(LoanApproval, frame, LOAN_CSV_COLUMNS, LOAN_KEY_COLUMNS)
+    db.session.commit()
+
+    assert counts == {'rows_inserted': 2, 'rows_updated': 0, 'rows_unchanged': 0, 'duplicate_keys_skipped': 1,
+                      'batches': 1}
+    assert db.session.get(LoanApproval, 1).income == 42.0
+
+
+def test_upsert_batches_stay_below_the_bind_parameter_limit(app):
+    frame = pd.DataFrame(loan_rows(12000), columns=LOAN_CSV_COLUMNS)
+
+    counts = upsert_dataframe(LoanApproval, frame, LOAN_CSV_COLUMNS, LOAN_KEY_COLUMNS, chunk_size=100000)
+    db.session.commit()
+
+    assert counts['batches'] == 3
+    assert LoanApproval.query.count() == 12000
+
+
+def test_unsupported_upload_mode_is_rejected(client):
+    response = client.post('/upload_csv', data=csv_upload(loan_csv(loan_rows(1)), mode='replace'))
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unsupported mode: replace'